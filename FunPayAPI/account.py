@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import html
 import math
-from typing import TYPE_CHECKING, Literal, Any, Optional, IO
+from typing import TYPE_CHECKING, Literal, Any, Optional, IO, Generator
 
 import FunPayAPI.common.enums
 from FunPayAPI.common.utils import parse_currency, RegularExpressions
@@ -13,22 +13,39 @@ if TYPE_CHECKING:
 
 from requests_toolbelt import MultipartEncoder
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
+from threading import Thread
 import requests
+import hashlib
 import logging
 import random
 import string
 import json
 import time
+import os
 import re
 
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from . import types
-from .common import exceptions, utils, enums
+from .common import exceptions, utils, enums, metrics
+from .common.tracing import TRACER
+from .common.images import ImageCache
 
 logger = logging.getLogger("FunPayAPI.account")
+CATEGORIES_CACHE_VERSION = 1
+"""Версия формата кэша дерева категорий (увеличивается при изменении формата)."""
 PRIVATE_CHAT_ID_RE = re.compile(r"users-\d+-\d+$")
+PROFILE_LOT_RE = re.compile(r'<a\s[^>]*\bclass="tc-item\b[^>]*>.*?</a>', re.S)
+"""HTML виджета лота на странице пользователя (тег a.tc-item, вложенных тегов a в нем нет)."""
+PROFILE_LOT_ID_RE = re.compile(r'offer\?id=([^"&\s]+)')
+PROFILE_LOT_DIV_RE = re.compile(r'<div\s[^>]*\bclass="([^"]*)"[^>]*>')
+"""Открывающий тег блока виджета лота (группа - классы блока)."""
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+FUNPAY_URL = "https://funpay.com"
+"""Адрес FunPay по умолчанию (см. Account.base_url)."""
 
 
 class Account:
@@ -49,11 +66,27 @@ class Account:
 
     :param locale: текущий язык аккаунта, опционально.
     :type locale: :obj:`Literal["ru", "en", "uk"]` or :obj:`None`
+
+    :param keep_html: сохранять ли HTML код в объектах (чатах, сообщениях, заказах, лотах, профилях), опционально.
+    :type keep_html: :obj:`bool`
+
+    :param categories_cache: путь до файла кэша дерева категорий и подкатегорий, опционально.
+    :type categories_cache: :obj:`str` or :obj:`None`
+
+    :param base_url: адрес FunPay (например, адрес локального тестового сервера; пустая строка - https://funpay.com),
+        опционально.
+    :type base_url: :obj:`str`
+
+    :param images_cache: путь до файла кэша ID выгруженных изображений (None - кэш хранится только в памяти),
+        опционально.
+    :type images_cache: :obj:`str` or :obj:`None`
     """
 
     def __init__(self, golden_key: str, user_agent: str | None = None,
                  requests_timeout: int | float = 10, proxy: Optional[dict] = None,
-                 locale: Literal["ru", "en", "uk"] | None = None):
+                 locale: Literal["ru", "en", "uk"] | None = None, keep_html: bool = False,
+                 categories_cache: str | None = None, base_url: str = FUNPAY_URL,
+                 images_cache: str | None = None):
         self.golden_key: str = golden_key
         """Токен (golden_key) аккаунта."""
         self.user_agent: str | None = user_agent
@@ -62,6 +95,14 @@ class Account:
         """Тайм-аут ожидания ответа на запросы."""
         self.proxy = proxy
         """Прокси"""
+        self.keep_html: bool = keep_html
+        """Сохранять ли HTML код в объектах. Если False - атрибут html объектов равен None (экономит память)."""
+        self.categories_cache: str | None = categories_cache
+        """Путь до файла кэша дерева категорий и подкатегорий (None - не кэшировать)."""
+        self.base_url: str = (base_url or FUNPAY_URL).rstrip("/")
+        """Адрес FunPay, на который отправляются запросы (ссылки на https://funpay.com перенаправляются на него)."""
+        self.images_cache: ImageCache = ImageCache(images_cache)
+        """Кэш ID выгруженных изображений (одинаковые изображения выгружаются на FunPay один раз)."""
         self.html: str | None = None
         """HTML основной страницы FunPay."""
         self.app_data: dict | None = None
@@ -181,10 +222,10 @@ class Account:
         """
         def update_locale(redirect_url: str):
             for locale in ("en", "uk"):
-                if redirect_url.startswith(f"https://funpay.com/{locale}/"):
+                if redirect_url.startswith(f"{self.base_url}/{locale}/"):
                     self.__locale = locale
                     return
-            if redirect_url.startswith(f"https://funpay.com"):
+            if redirect_url.startswith(self.base_url):
                 self.__locale = "ru"
 
         if self.is_funpay_api_method(api_method):
@@ -224,6 +265,7 @@ class Account:
             self.__update_cookies(response)
             if response.status_code == 429:
                 self.last_429_err_time = time.time()
+                metrics.HTTP_429.inc()
                 time.sleep(min(2 ** i, 30))
                 continue
             elif not (300 <= response.status_code < 400) or 'Location' not in response.headers:
@@ -255,7 +297,7 @@ class Account:
         """
         if not self.is_initiated:
             self.locale = self.__subcategories_parse_locale
-        response = self.method("get", "https://funpay.com/", {}, {},
+        response = self.method("get", f"{self.base_url}/", {}, {},
                                update_phpsessid, raise_not_200=True)
         if not self.is_initiated:
             self.locale = self.__default_locale
@@ -286,10 +328,10 @@ class Account:
         if update_phpsessid or not self.phpsessid:
             self.phpsessid = cookies.get("PHPSESSID", self.phpsessid)
         if not self.is_initiated:
-            self.__setup_categories(html_response)
+            self.__init_categories(parser, html_response)
 
         self.last_update = int(time.time())
-        self.html = html_response
+        self.html = html_response if self.keep_html else None
         self.__initiated = True
         return self
 
@@ -309,10 +351,19 @@ class Account:
             "x-requested-with": "XMLHttpRequest"
         }
         payload["csrf_token"] = self.csrf_token
+        metrics.RUNNER_SLOTS.observe(len(payload.get("objects", [])))
         payload["objects"] = json.dumps(payload.get("objects", []))
         payload["request"] = False if not payload.get("request") else json.dumps(payload["request"])
-        response = self.method("post", "runner/", headers, payload, raise_not_200=True)
-
+        start = time.perf_counter()
+        try:
+            with TRACER.span("runner_request"):
+                response = self.method("post", "runner/", headers, payload, raise_not_200=True)
+        except:
+            metrics.RUNNER_REQUESTS.inc("error")
+            raise
+        finally:
+            metrics.RUNNER_REQUEST_SECONDS.observe(time.perf_counter() - start)
+        metrics.RUNNER_REQUESTS.inc("success")
         return response
 
     def get_payload_data(self, chats_data: dict[int | str, str | None] | None | list [int | str] = None,
@@ -477,7 +528,8 @@ class Account:
                     k_reviews = "".join([i for i in k_reviews.text if i.isdigit()])
                 k_reviews = int(k_reviews) if k_reviews else 0
                 user_id = int(seller_body.find("span", class_="pseudo-a")["data-href"].split("/")[-2])
-                seller = types.SellerShortcut(user_id, username, online, rating_stars, k_reviews, seller_key)
+                seller = types.SellerShortcut(user_id, username, online, rating_stars, k_reviews,
+                                              seller_key if self.keep_html else None)
                 sellers[seller_key] = seller
             else:
                 seller = sellers[seller_key]
@@ -487,7 +539,7 @@ class Account:
 
             lot_obj = types.LotShortcut(offer_id, server, side, description, amount, price, currency, subcategory_obj,
                                         seller,
-                                        auto, promo, attributes, str(offer))
+                                        auto, promo, attributes, str(offer) if self.keep_html else None)
             result.append(lot_obj)
         return result
 
@@ -543,7 +595,7 @@ class Account:
             amount = int(amount) if amount and amount.isdigit() else None
             active = "warning" not in offer.get("class", [])
             lot_obj = types.MyLotShortcut(offer_id, server, side, description, amount, price, currency, subcategory_obj,
-                                          auto, active, str(offer))
+                                          auto, active, str(offer) if self.keep_html else None)
             result.append(lot_obj)
         return result
 
@@ -761,10 +813,12 @@ class Account:
         return self.parse_chats_histories(chats_data, objects)
 
 
-    def upload_image(self, image: str | IO[bytes], type_: Literal["chat", "offer"] = "chat") -> int:
+    def upload_image(self, image: str | bytes | IO[bytes], type_: Literal["chat", "offer"] = "chat",
+                     use_cache: bool = True) -> int:
         """
         Выгружает изображение на сервер FunPay для дальнейшей отправки в качестве сообщения.
         Для отправки изображения в чат рекомендуется использовать метод :meth:`FunPayAPI.account.Account.send_image`.
+        Если такое же изображение уже выгружалось, возвращает ID из кэша (:attr:`images_cache`) без выгрузки.
 
         :param image: путь до изображения или представление изображения в виде байтов.
         :type image: :obj:`str` or :obj:`bytes`
@@ -772,6 +826,9 @@ class Account:
         :param type_: куда грузим изображение? ("chat" / "offer").
         :type type_: :obj:`str` `chat` or `offer`
 
+        :param use_cache: брать ли ID из кэша? (False - выгрузить заново и обновить кэш).
+        :type use_cache: :obj:`bool`, опционально
+
         :return: ID изображения на серверах FunPay.
         :rtype: :obj:`int`
         """
@@ -784,9 +841,15 @@ class Account:
         if isinstance(image, str):
             with open(image, "rb") as f:
                 img = f.read()
+        elif hasattr(image, "read"):
+            img = image.read()
         else:
             img = image
 
+        key = self.images_cache.key(img, type_)
+        if use_cache and (image_id := self.images_cache.get(key)) is not None:
+            return image_id
+
         fields = {
             'file': ("Отправлено_с_помощью_бота_FunPay_Cardinal.png", img, "image/png"),
             'file_id': "0"
@@ -814,6 +877,7 @@ class Account:
 
         if not (document_id := response.json().get("fileId")):
             raise exceptions.ImageUploadError(response, None)
+        self.images_cache.set(key, int(document_id))
         return int(document_id)
 
     def send_message(self, chat_id: int | str, text: Optional[str] = None, chat_name: Optional[str] = None,
@@ -866,7 +930,9 @@ class Account:
 
         chats_data = None if leave_as_unread else {chat_id: chat_name}
 
-        response = self.abuse_runner(chats_data=chats_data, request=request)
+        # Спан заканчивается, когда FunPay подтвердил отправку сообщения.
+        with TRACER.span("Account.send_message"):
+            response = self.abuse_runner(chats_data=chats_data, request=request)
         json_response = response.json()
         if not (resp := json_response.get("response")):
             raise exceptions.MessageNotDeliveredError(response, None, chat_id)
@@ -897,7 +963,7 @@ class Account:
             </div>
             """
             message_obj = types.Message(0, message_text, chat_id, chat_name, interlocutor_id, self.username, self.id,
-                                        fake_html, None,
+                                        fake_html if self.keep_html else None, None,
                                         None)
         else:
             tag = obj["tag"]
@@ -923,7 +989,7 @@ class Account:
                 raise e
             message_obj = types.Message(int(mes["id"]), message_text, chat_id, chat_name, interlocutor_id,
                                         self.username, self.id,
-                                        mes["html"], image_link, image_name, tag=tag)
+                                        mes["html"] if self.keep_html else None, image_link, image_name, tag=tag)
         if self.runner and is_private_chat and isinstance(chat_id, int):
             if add_to_ignore_list and message_obj.id:
                 self.runner.mark_as_by_bot(chat_id, message_obj.id)
@@ -931,7 +997,7 @@ class Account:
                 self.runner.update_last_message(chat_id, message_obj.id, message_obj.text)
         return message_obj
 
-    def send_image(self, chat_id: int, image: int | str | IO[bytes], chat_name: Optional[str] = None,
+    def send_image(self, chat_id: int, image: int | str | bytes | IO[bytes], chat_name: Optional[str] = None,
                    interlocutor_id: Optional[int] = None,
                    add_to_ignore_list: bool = True, update_last_saved_message: bool = False,
                    leave_as_unread: bool = False) -> types.Message:
@@ -943,7 +1009,8 @@ class Account:
 
         :param image: ID изображения / путь до изображения / изображение в виде байтов.
             Если передан путь до изображения или представление изображения в виде байтов, сначала оно будет выгружено
-            с помощью метода :meth:`FunPayAPI.account.Account.upload_image`.
+            с помощью метода :meth:`FunPayAPI.account.Account.upload_image` (ID берется из кэша, если изображение
+            уже выгружалось; если отправить изображение с ID из кэша не удалось, оно выгружается заново).
         :type image: :obj:`int` or :obj:`str` or :obj:`bytes`
 
         :param chat_name: Название чата (никнейм собеседника). Нужен для возвращаемого объекта.
@@ -967,12 +1034,35 @@ class Account:
         if not self.is_initiated:
             raise exceptions.AccountNotInitiatedError()
 
-        if not isinstance(image, int):
-            image = self.upload_image(image, type_="chat")
-        result = self.send_message(chat_id, None, chat_name, interlocutor_id,
-                                   image, add_to_ignore_list, update_last_saved_message,
-                                   leave_as_unread)
-        return result
+        if isinstance(image, int):
+            return self.send_message(chat_id, None, chat_name, interlocutor_id,
+                                     image, add_to_ignore_list, update_last_saved_message,
+                                     leave_as_unread)
+
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                image = f.read()
+        elif hasattr(image, "read"):
+            image = image.read()
+        key = self.images_cache.key(image, "chat")
+        cached = key in self.images_cache.images
+        image_id = self.upload_image(image, type_="chat")
+        flood_err_times = (self.last_flood_err_time, self.last_multiuser_flood_err_time)
+        try:
+            return self.send_message(chat_id, None, chat_name, interlocutor_id,
+                                     image_id, add_to_ignore_list, update_last_saved_message,
+                                     leave_as_unread)
+        except (exceptions.MessageNotDeliveredError, exceptions.ImageUploadError):
+            # Ошибка флуда не связана с изображением.
+            if not cached or flood_err_times != (self.last_flood_err_time, self.last_multiuser_flood_err_time):
+                raise
+        # ID из кэша устарел: выгружаем изображение заново.
+        logger.warning(f"Не удалось отправить изображение {image_id} из кэша, выгружаю изображение заново.")
+        self.images_cache.invalidate(key)
+        image_id = self.upload_image(image, type_="chat", use_cache=False)
+        return self.send_message(chat_id, None, chat_name, interlocutor_id,
+                                 image_id, add_to_ignore_list, update_last_saved_message,
+                                 leave_as_unread)
 
     def send_review(self, order_id: str, text: str, rating: Literal[1, 2, 3, 4, 5] = 5) -> str:
         """
@@ -1151,7 +1241,7 @@ class Account:
             "game_id": category_id,
             "node_id": subcategory.id
         }
-        response = self.method("post", "https://funpay.com/lots/raise", headers, payload, raise_not_200=True)
+        response = self.method("post", f"{self.base_url}/lots/raise", headers, payload, raise_not_200=True)
         json_response = response.json()
         return json_response
 
@@ -1222,6 +1312,7 @@ class Account:
     def get_user(self, user_id: int, locale: Literal["ru", "en", "uk"] | None = None) -> types.UserProfile:
         """
         Парсит страницу пользователя.
+        Виджеты лотов индексируются по ID и подкатегориям, а объекты лотов создаются только при обращении к ним.
 
         :param user_id: ID пользователя.
         :type user_id: :obj:`int`
@@ -1238,6 +1329,12 @@ class Account:
             self.locale = self.__default_locale
         html_response = response.content.decode()
         parser = BeautifulSoup(html_response, "lxml")
+        # HTML виджетов лотов вырезается из ответа одним проходом: лоты разбираются только при обращении к ним.
+        offers_html = {}
+        for i in PROFILE_LOT_RE.finditer(html_response):
+            offer_id = PROFILE_LOT_ID_RE.search(i.group(0))
+            if offer_id:
+                offers_html[offer_id.group(1)] = i.group(0)
 
         username = parser.find("div", {"class": "user-link-name"})
         if not username:
@@ -1249,10 +1346,10 @@ class Account:
         user_status = parser.find("span", {"class": "media-user-status"})
         user_status = user_status.text if user_status else ""
         avatar_link = parser.find("div", {"class": "avatar-photo"}).get("style").split("(")[1].split(")")[0]
-        avatar_link = avatar_link if avatar_link.startswith("https") else f"https://funpay.com{avatar_link}"
+        avatar_link = avatar_link if avatar_link.startswith("https") else f"{self.base_url}{avatar_link}"
         banned = bool(parser.find("span", {"class": "label label-danger"}))
         user_obj = types.UserProfile(user_id, username, avatar_link, "Онлайн" in user_status or "Online" in user_status,
-                                     banned, html_response)
+                                     banned, html_response if self.keep_html else None)
 
         subcategories_divs = parser.find_all("div", {"class": "offer-list-title-container"})
 
@@ -1269,35 +1366,57 @@ class Account:
                 continue
 
             offers = i.parent.find_all("a", {"class": "tc-item"})
-            currency = None
+            if not offers:
+                continue
+            currency = parse_currency(offers[0].find("div", {"class": "tc-price"}).find("span", class_="unit").text)
+            if self.currency != currency:
+                self.currency = currency
+            # Объекты лотов создаются только при обращении к ним (см. UserProfile.add_lazy_lot).
+            # Профиль хранит только HTML виджета лота (а не дерево страницы), виджет разбирается при создании лота.
             for j in offers:
                 offer_id = j["href"].split("id=")[1]
-                description = j.find("div", {"class": "tc-desc-text"})
-                description = description.text if description else None
-                server = j.find("div", class_="tc-server")
-                server = server.text if server else None
-                side = j.find("div", class_="tc-side")
-                side = side.text if side else None
-                auto = j.find("i", class_="auto-dlv-icon") is not None
-                tc_price = j.find("div", {"class": "tc-price"})
-                tc_amount = j.find("div", class_="tc-amount")
-                amount = tc_amount.text.replace(" ", "") if tc_amount else None
-                amount = int(amount) if amount and amount.isdigit() else None
-                if subcategory_obj.type is types.SubCategoryTypes.COMMON:
-                    price = float(tc_price["data-s"])
-                else:
-                    price = float(tc_price.find("div").text.rsplit(maxsplit=1)[0].replace(" ", ""))
-                if currency is None:
-                    currency = parse_currency(tc_price.find("span", class_="unit").text)
-                    if self.currency != currency:
-                        self.currency = currency
-                lot_obj = types.LotShortcut(offer_id, server, side, description, amount, price, currency,
-                                            subcategory_obj,
-                                            None, auto,
-                                            None, None, str(j))
-                user_obj.add_lot(lot_obj)
+                offer_html = offers_html.get(offer_id) or str(j)
+                offer_id = int(offer_id) if offer_id.isnumeric() else offer_id
+                user_obj.add_lazy_lot(offer_id, subcategory_obj,
+                                      partial(self.__parse_profile_lot, offer_html, offer_id, subcategory_obj,
+                                              currency, self.keep_html))
         return user_obj
 
+    @staticmethod
+    def __parse_profile_lot(offer_html: str, offer_id: int | str, subcategory: types.SubCategory,
+                            currency: types.Currency, keep_html: bool) -> types.LotShortcut:
+        """
+        Создает объект лота из HTML виджета лота со страницы пользователя.
+
+        :param offer_html: HTML виджета лота (тег a.tc-item).
+        :param offer_id: ID лота.
+        :param subcategory: подкатегория лота.
+        :param currency: валюта лотов подкатегории.
+        :param keep_html: сохранять ли HTML виджета в объекте лота.
+
+        :return: объект лота.
+        """
+        # Виджет лота маленький и однотипный: регулярные выражения разбирают его в десятки раз быстрее BeautifulSoup.
+        divs = {}  # {класс: (открывающий тег, текст до первого закрывающего тега div)}
+        for i in PROFILE_LOT_DIV_RE.finditer(offer_html):
+            content = offer_html[i.end():offer_html.find("</div>", i.end())]
+            for j in i.group(1).split():
+                divs.setdefault(j, (i.group(0), html.unescape(HTML_TAG_RE.sub("", content))))
+        description = divs["tc-desc-text"][1] if "tc-desc-text" in divs else None
+        server = divs["tc-server"][1] if "tc-server" in divs else None
+        side = divs["tc-side"][1] if "tc-side" in divs else None
+        auto = "auto-dlv-icon" in offer_html
+        tc_price_tag, tc_price = divs["tc-price"]
+        data_s = re.search(r'\bdata-s="([^"]*)"', tc_price_tag)
+        if subcategory.type is types.SubCategoryTypes.COMMON and data_s:
+            price = float(data_s.group(1))
+        else:
+            price = float(tc_price.rsplit(maxsplit=1)[0].replace(" ", ""))
+        amount = divs["tc-amount"][1].replace(" ", "") if "tc-amount" in divs else None
+        amount = int(amount) if amount and amount.isdigit() else None
+        return types.LotShortcut(offer_id, server, side, description, amount, price, currency, subcategory,
+                                 None, auto, None, None, offer_html if keep_html else None)
+
     def get_chat(self, chat_id: int, with_history: bool = True,
                  locale: Literal["ru", "en", "uk"] | None = None) -> types.Chat:
         """
@@ -1382,7 +1501,7 @@ class Account:
             "include": include
         }
 
-        r = self.method("post", "https://funpay.com/api/orders/get", headers=headers,
+        r = self.method("post", f"{self.base_url}/api/orders/get", headers=headers,
                     payload=json.dumps(payload), raise_not_200=True)
         d = r.json()
         if d.get("status") != "SUCCESS" or "data" not in d:
@@ -1412,7 +1531,9 @@ class Account:
                   state: Optional[Literal["closed", "paid", "refunded"]] = None, game: Optional[int] = None,
                   section: Optional[str] = None, server: Optional[int] = None,
                   side: Optional[int] = None, locale: Literal["ru", "en", "uk"] | None = None,
-                  subcategories: dict[str, tuple[types.SubCategoryTypes, int]] | None = None, **more_filters) -> \
+                  subcategories: dict[str, tuple[types.SubCategoryTypes, int]] | None = None,
+                  known_orders: dict[str, types.OrderShortcut] | None = None,
+                  **more_filters) -> \
             tuple[str | None, list[types.OrderShortcut], Literal["ru", "en", "uk"],
             dict[str, types.SubCategory]]:
         """
@@ -1457,6 +1578,14 @@ class Account:
         :param side: ID стороны (платформы).
         :type side: :obj:`int`, опционально.
 
+        :param subcategories: словарь подкатегорий из предыдущего вызова. Если передан, список игр и разделов
+            со страницы не парсится (кроме случая, когда в заказе встретился неизвестный раздел).
+        :type subcategories: :obj:`dict` of :obj:`str` to :class:`FunPayAPI.types.SubCategory`, опционально
+
+        :param known_orders: уже известные заказы {ID заказа: объект заказа}. Заказы с тем же статусом не парсятся,
+            вместо них в результат попадают переданные объекты.
+        :type known_orders: :obj:`dict` {:obj:`str`: :class:`FunPayAPI.types.OrderShortcut`}, опционально
+
         :param more_filters: доп. фильтры.
 
 		:return: (
@@ -1483,7 +1612,7 @@ class Account:
         filters = {name: filters[name] for name in filters if filters[name]}
         filters.update(more_filters)
 
-        link = "https://funpay.com/orders/trade?"
+        link = f"{self.base_url}/orders/trade?"
         for name in filters:
             link += f"{name}={filters[name]}&"
         link = link[:-1]
@@ -1508,24 +1637,14 @@ class Account:
         next_order_id = next_order_id.get("value") if next_order_id else None
 
         order_divs = parser.find_all("a", {"class": "tc-item"})
+        subcategories_parsed = False
         if not start_from:
-            subcategories = dict()
             app_data = json.loads(parser.find("body").get("data-app-data"))
             locale = app_data.get("locale")
             self.csrf_token = app_data.get("csrf-token") or self.csrf_token
-            games_options = parser.find("select", attrs={"name": "game"})
-            if games_options:
-                games_options = games_options.find_all(lambda x: x.name == "option" and x.get("value"))
-                for game_option in games_options:
-                    game_name = game_option.text
-                    sections_list = json.loads(game_option.get("data-data"))
-                    for key, section_name in sections_list:
-                        section_type, section_id = key.split("-")
-                        section_type = types.SubCategoryTypes.COMMON if section_type == "lot" else types.SubCategoryTypes.CURRENCY
-                        section_id = int(section_id)
-                        subcategories[f"{game_name}, {section_name}"] = self.get_subcategory(section_type, section_id)
-            else:
-                subcategories = None
+            if subcategories is None:
+                subcategories = self.__parse_sales_subcategories(parser)
+                subcategories_parsed = True
         if not order_divs:
             return None, [], locale, subcategories
 
@@ -1548,6 +1667,10 @@ class Account:
             order_id = div.find("div", {"class": "tc-order"}).text[1:]
             if order_id in exclude_ids:
                 continue
+            if known_orders is not None and (known_order := known_orders.get(order_id)) is not None \
+                    and known_order.status is order_status:
+                sales.append(known_order)
+                continue
 
             description = div.find("div", {"class": "order-desc"}).find("div").text
             tc_price = div.find("div", {"class": "tc-price"}).text
@@ -1559,6 +1682,11 @@ class Account:
             buyer_username = buyer_div.text
             buyer_id = int(buyer_div.get("data-href")[:-1].split("/users/")[1])
             subcategory_name = div.find("div", {"class": "text-muted"}).text
+            if subcategories is not None and subcategory_name not in subcategories \
+                    and not start_from and not subcategories_parsed:
+                # Появился новый раздел - переданный словарь подкатегорий устарел.
+                subcategories = self.__parse_sales_subcategories(parser)
+                subcategories_parsed = True
             subcategory = None
             if subcategories:
                 subcategory = subcategories.get(subcategory_name)
@@ -1568,11 +1696,35 @@ class Account:
             id1, id2 = sorted([buyer_id, self.id])
             chat_id = f"users-{id1}-{id2}"
             order_obj = types.OrderShortcut(order_id, description, price, currency, buyer_username, buyer_id, chat_id,
-                                            order_status, order_date, subcategory_name, subcategory, str(div))
+                                            order_status, order_date, subcategory_name, subcategory,
+                                            str(div) if self.keep_html else None)
             sales.append(order_obj)
 
         return next_order_id, sales, locale, subcategories
 
+    def __parse_sales_subcategories(self, parser: BeautifulSoup) -> dict[str, types.SubCategory] | None:
+        """
+        Парсит список игр и разделов со страницы https://funpay.com/orders/trade
+
+        :param parser: парсер страницы продаж.
+
+        :return: словарь подкатегорий {"Игра, Раздел": подкатегория} или None, если списка нет на странице.
+        """
+        games_options = parser.find("select", attrs={"name": "game"})
+        if not games_options:
+            return None
+        subcategories = dict()
+        games_options = games_options.find_all(lambda x: x.name == "option" and x.get("value"))
+        for game_option in games_options:
+            game_name = game_option.text
+            sections_list = json.loads(game_option.get("data-data"))
+            for key, section_name in sections_list:
+                section_type, section_id = key.split("-")
+                section_type = types.SubCategoryTypes.COMMON if section_type == "lot" else types.SubCategoryTypes.CURRENCY
+                section_id = int(section_id)
+                subcategories[f"{game_name}, {section_name}"] = self.get_subcategory(section_type, section_id)
+        return subcategories
+
     def get_sells(self, start_from: str | None = None, include_paid: bool = True, include_closed: bool = True,
                   include_refunded: bool = True, exclude_ids: list[str] | None = None,
                   id: Optional[str] = None, buyer: Optional[str] = None,
@@ -1585,6 +1737,71 @@ class Account:
                                                         side, None, None, **more_filters)
         return start_from, orders
 
+    def iter_sales(self, start_from: str | None = None, until_date: datetime | None = None,
+                   stop_statuses: list[types.OrderStatuses] | None = None, delay: float = 1, attempts: int = 3,
+                   **filters) -> Generator[types.OrderShortcut, None, None]:
+        """
+        Генератор, постранично проходящий по списку продаж (https://funpay.com/orders/trade).
+        Пока вызывающий код обрабатывает текущую страницу, следующая страница запрашивается и парсится в
+        отдельном потоке. Если генератор закрыт раньше времени (break), следующие страницы не запрашиваются.
+
+        :param start_from: ID заказа, с которого начать список (ID заказа должен быть без '#'!).
+        :type start_from: :obj:`str`, опционально
+
+        :param until_date: остановиться на первом заказе, созданном раньше этой даты (заказы идут от новых к старым).
+        :type until_date: :class:`datetime.datetime`, опционально
+
+        :param stop_statuses: остановиться на первом заказе с одним из этих статусов.
+        :type stop_statuses: :obj:`list` of :class:`FunPayAPI.common.enums.OrderStatuses`, опционально
+
+        :param delay: минимальная задержка между запросами страниц (в секундах).
+        :type delay: :obj:`int` or :obj:`float`, опционально
+
+        :param attempts: кол-во попыток получить страницу.
+        :type attempts: :obj:`int`, опционально
+
+        :param filters: фильтры для :meth:`FunPayAPI.account.Account.get_sales` (state, game, buyer и т.д.).
+
+        :return: генератор заказов (от новых к старым).
+        :rtype: :obj:`Generator` of :class:`FunPayAPI.types.OrderShortcut`
+        """
+        last_request_time = 0
+        subcategories = None
+
+        def get_page(page_start_from: str | None) -> tuple[str | None, list[types.OrderShortcut]]:
+            nonlocal last_request_time, subcategories
+            for attempt in range(attempts):
+                time.sleep(max(0.0, last_request_time + delay - time.time()))
+                last_request_time = time.time()
+                try:
+                    next_order_id, orders, _, page_subcategories = self.get_sales(page_start_from,
+                                                                                  subcategories=subcategories,
+                                                                                  **filters)
+                    if page_subcategories is not None:
+                        subcategories = page_subcategories
+                    return next_order_id, orders
+                except:
+                    if attempt == attempts - 1:
+                        raise
+                    logger.debug("TRACEBACK", exc_info=True)
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SalesPrefetch")
+        try:
+            next_order_id, orders = get_page(start_from)
+            while True:
+                next_page = executor.submit(get_page, next_order_id) if next_order_id else None
+                for order in orders:
+                    if until_date is not None and order.date < until_date:
+                        return
+                    if stop_statuses and order.status in stop_statuses:
+                        return
+                    yield order
+                if next_page is None:
+                    return
+                next_order_id, orders = next_page.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def add_chats(self, chats: list[types.ChatShortcut]):
         """
         Сохраняет чаты.
@@ -1872,7 +2089,7 @@ class Account:
         :return: Кортеж, содержащий коэффициент обмена и текущую валюту аккаунта.
         :rtype: :obj:`tuple[float, types.Currency]`
         """
-        r = self.method("post", "https://funpay.com/account/switchCurrency",
+        r = self.method("post", f"{self.base_url}/account/switchCurrency",
                         {"accept": "*/*", "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
                          "x-requested-with": "XMLHttpRequest"},
                         {"cy": currency.code, "csrf_token": self.csrf_token, "confirmed": "false"},
@@ -2050,13 +2267,121 @@ class Account:
         """
         return self.__initiated
 
-    def __setup_categories(self, html: str):
+    def __init_categories(self, parser: BeautifulSoup, html_response: str):
+        """
+        Инициализирует дерево категорий и подкатегорий.
+        Если указан файл кэша, дерево загружается из него. Если при этом отпечаток блока со списком игр изменился,
+        дерево парсится заново в отдельном потоке и кэш перезаписывается.
+
+        :param parser: парсер основной страницы.
+        :param html_response: HTML основной страницы.
+        """
+        start_time = time.time()
+        fingerprint = self.__categories_fingerprint(html_response)
+        cache = self.__load_categories_cache() if self.categories_cache else None
+        if cache is None:
+            self.__setup_categories(parser, fingerprint)
+            logger.debug(f"Дерево категорий распарсено за {time.time() - start_time:.3f} сек.")
+            return
+
+        self.__set_categories(cache["categories"])
+        logger.debug(f"Дерево категорий загружено из кэша за {time.time() - start_time:.3f} сек.")
+        if cache["fingerprint"] != fingerprint:
+            logger.debug("Список игр на FunPay изменился. Обновляю дерево категорий в фоне.")
+            Thread(target=self.__setup_categories, args=(parser, fingerprint), daemon=True).start()
+
+    @staticmethod
+    def __categories_fingerprint(html_response: str) -> str | None:
+        """
+        Вычисляет отпечаток блока со списком игр (promo-game-list) без парсинга страницы.
+
+        :param html_response: HTML основной страницы.
+
+        :return: отпечаток блока или None, если блок не найден.
+        """
+        start = html_response.find("promo-game-list")
+        if start == -1:
+            return None
+        end = html_response.find("</ul>", html_response.rfind("promo-game-item"))
+        return hashlib.sha1(html_response[start:end if end != -1 else None].encode()).hexdigest()
+
+    def __load_categories_cache(self) -> dict | None:
+        """
+        Загружает дерево категорий из файла кэша.
+
+        :return: {"fingerprint": отпечаток, "categories": список категорий} или None, если кэша нет / он устарел.
+        """
+        if not os.path.exists(self.categories_cache):
+            return None
+        try:
+            with open(self.categories_cache, "r", encoding="utf-8") as f:
+                data = json.loads(f.read())
+            if data.get("version") != CATEGORIES_CACHE_VERSION:
+                return None
+            categories = []
+            for cat_id, cat_name, cat_position, subcategories in data["categories"]:
+                category = types.Category(cat_id, cat_name, position=cat_position)
+                for sub_id, sub_name, sub_type, sub_position in subcategories:
+                    category.add_subcategory(types.SubCategory(sub_id, sub_name, types.SubCategoryTypes(sub_type),
+                                                               category, sub_position))
+                categories.append(category)
+            return {"fingerprint": data["fingerprint"], "categories": categories}
+        except:
+            logger.warning("Не удалось загрузить кэш дерева категорий.")
+            logger.debug("TRACEBACK", exc_info=True)
+            return None
+
+    def __save_categories_cache(self, categories: list[types.Category], fingerprint: str | None):
+        """
+        Сохраняет дерево категорий в файл кэша.
+
+        :param categories: список категорий.
+        :param fingerprint: отпечаток блока со списком игр.
+        """
+        data = {
+            "version": CATEGORIES_CACHE_VERSION,
+            "fingerprint": fingerprint,
+            "categories": [[i.id, i.name, i.position, [[j.id, j.name, j.type.value, j.position]
+                                                       for j in i.get_subcategories()]] for i in categories]
+        }
+        try:
+            folder = os.path.dirname(self.categories_cache)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            with open(self.categories_cache, "w", encoding="utf-8") as f:
+                f.write(json.dumps(data, ensure_ascii=False))
+        except:
+            logger.warning("Не удалось сохранить кэш дерева категорий.")
+            logger.debug("TRACEBACK", exc_info=True)
+
+    def __set_categories(self, categories: list[types.Category]):
+        """
+        Заменяет дерево категорий и подкатегорий.
+
+        :param categories: список категорий (с подкатегориями).
+        """
+        sorted_categories = {}
+        subcategories = []
+        sorted_subcategories = {
+            types.SubCategoryTypes.COMMON: {},
+            types.SubCategoryTypes.CURRENCY: {}
+        }
+        for category in categories:
+            sorted_categories[category.id] = category
+            for subcategory in category.get_subcategories():
+                subcategories.append(subcategory)
+                sorted_subcategories[subcategory.type][subcategory.id] = subcategory
+        subcategories.sort(key=lambda x: x.position)
+        self.__categories, self.__sorted_categories = categories, sorted_categories
+        self.__subcategories, self.__sorted_subcategories = subcategories, sorted_subcategories
+
+    def __setup_categories(self, parser: BeautifulSoup, fingerprint: str | None = None):
         """
         Парсит категории и подкатегории с основной страницы и добавляет их в свойства класса.
 
-        :param html: HTML страница.
+        :param parser: парсер основной страницы.
+        :param fingerprint: отпечаток блока со списком игр (для кэша).
         """
-        parser = BeautifulSoup(html, "lxml")
         games_table = parser.find_all("div", {"class": "promo-game-list"})
         if not games_table:
             return
@@ -2065,6 +2390,7 @@ class Account:
         games_divs = games_table.find_all("div", {"class": "promo-game-item"})
         if not games_divs:
             return
+        categories = []
         game_position = 0
         subcategory_position = 0
         for i in games_divs:
@@ -2093,17 +2419,18 @@ class Account:
                     sobj = types.SubCategory(sid, name, stype, regional_games[j_game_id], subcategory_position)
                     subcategory_position += 1
                     regional_games[j_game_id].add_subcategory(sobj)
-                    self.__subcategories.append(sobj)
-                    self.__sorted_subcategories[stype][sid] = sobj
 
-            for gid in regional_games:
-                self.__categories.append(regional_games[gid])
-                self.__sorted_categories[gid] = regional_games[gid]
+            categories.extend(regional_games.values())
+
+        self.__set_categories(categories)
+        if self.categories_cache:
+            self.__save_categories_cache(categories, fingerprint)
 
     def __parse_messages(self, json_messages: dict, chat_id: int | str,
                          interlocutor_id: Optional[int] = None, interlocutor_username: Optional[str] = None,
                          from_id: int = 0, is_private: bool | None = None, tag: str | None = None) -> list[types.Message]:
         messages = []
+        parsers = []
         ids = {self.id: self.username, 0: "FunPay"}
         badges = {}
         mb_chat_is_private = (is_private or interlocutor_id or interlocutor_username
@@ -2165,7 +2492,8 @@ class Account:
                 #     by_vertex = True
 
             message_obj = types.Message(i["id"], message_text, chat_id, interlocutor_username, interlocutor_id,
-                                        None, author_id, i["html"], image_link, image_name,
+                                        None, author_id, i["html"] if self.keep_html else None,
+                                        image_link, image_name,
                                         determine_msg_type=False,
                                         tag=tag)
             message_obj.by_bot = by_bot
@@ -2173,13 +2501,13 @@ class Account:
             message_obj.type = types.MessageTypes.NON_SYSTEM if author_id != 0 else message_obj.get_message_type()
 
             messages.append(message_obj)
+            parsers.append(parser)
 
-        for i in messages:
+        for i, parser in zip(messages, parsers):
             i.author = ids.get(i.author_id)
             i.chat_name = interlocutor_username
             i.interlocutor_id = interlocutor_id
             i.badge = badges.get(i.author_id) if badges.get(i.author_id) != 0 else None
-            parser = BeautifulSoup(i.html, "lxml")
             if i.badge:
                 i.is_employee = True
                 if i.badge in ("поддержка", "підтримка", "support"):
@@ -2350,26 +2678,36 @@ class Account:
             self.__set_locale = new_locale
 
     def normalize_url(self, api_method: str, locale: Literal["ru", "en", "uk"] | None = None) -> str:
+        """
+        Формирует полную ссылку на метод API / страницу с учетом языка и :attr:`base_url`.
 
+        :param api_method: метод API / полная ссылка.
+        :param locale: язык.
+
+        :return: полная ссылка.
+        """
         api_method = api_method.lstrip("/")
+        if self.base_url != FUNPAY_URL and api_method.startswith(FUNPAY_URL):
+            api_method = self.base_url + api_method[len(FUNPAY_URL):]
         if api_method.startswith("api/"):
-            return f"https://funpay.com/{api_method}"
-        if "funpay.com/api/" in api_method:
+            return f"{self.base_url}/{api_method}"
+        if api_method.startswith(f"{self.base_url}/api/"):
             return api_method
 
-        api_method = "https://funpay.com/" if api_method == "https://funpay.com" else api_method
-        url = api_method if api_method.startswith("https://funpay.com/") else "https://funpay.com/" + api_method
+        base = f"{self.base_url}/"
+        api_method = base if api_method == self.base_url else api_method
+        url = api_method if api_method.startswith(base) else base + api_method
         locales = ("en", "uk")
         for loc in locales:
-            url = url.replace(f"https://funpay.com/{loc}/", "https://funpay.com/", 1)
+            url = url.replace(f"{base}{loc}/", base, 1)
         if not locale:
             locale = self.locale
         if locale in locales:
-            return url.replace(f"https://funpay.com/", f"https://funpay.com/{locale}/", 1)
+            return url.replace(base, f"{base}{locale}/", 1)
         return url
 
-    @staticmethod
-    def is_funpay_api_method(api_method: str):
-        if "funpay.com/api/" in api_method or api_method.startswith("api/"):
+    def is_funpay_api_method(self, api_method: str):
+        if "funpay.com/api/" in api_method or api_method.startswith("api/") or \
+                api_method.startswith(f"{self.base_url}/api/"):
             return True
         return False
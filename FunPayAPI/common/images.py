@@ -0,0 +1,117 @@
+"""
+В данном модуле написан кэш выгруженных изображений: {тип:SHA-256 содержимого: ID изображения на FunPay}.
+Одинаковые изображения (например, картинка в тексте автовыдачи) выгружаются на FunPay только один раз.
+Если отправка сообщения с ID из кэша не удалась, запись удаляется и изображение выгружается заново
+(см. :meth:`FunPayAPI.account.Account.send_image`).
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import logging
+import json
+import os
+
+
+logger = logging.getLogger("FunPayAPI.images")
+
+
+class ImageCache(object):
+    """
+    Кэш ID выгруженных изображений.
+
+    :param path: путь до файла кэша (None - кэш хранится только в памяти).
+    :param max_size: макс. кол-во записей (при переполнении удаляются самые старые).
+    """
+    def __init__(self, path: str | None = None, max_size: int = 10000):
+        self.path = path
+        self.max_size = max_size
+        self.lock = Lock()
+        self.images: OrderedDict[str, int] = OrderedDict()
+        """Записи кэша {тип:хэш: ID изображения}."""
+        self.hits: int = 0
+        """Кол-во выгрузок, которых удалось избежать."""
+        self.misses: int = 0
+        """Кол-во выгрузок изображений, которых не было в кэше."""
+        self.load()
+
+    @staticmethod
+    def key(image: bytes, type_: str) -> str:
+        """
+        :return: ключ записи кэша для изображения.
+        """
+        return f"{type_}:{hashlib.sha256(image).hexdigest()}"
+
+    def get(self, key: str) -> int | None:
+        """
+        :return: ID изображения на FunPay или None, если изображения нет в кэше.
+        """
+        with self.lock:
+            image_id = self.images.get(key)
+            if image_id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return image_id
+
+    def set(self, key: str, image_id: int):
+        """
+        Сохраняет ID выгруженного изображения.
+        """
+        with self.lock:
+            self.images[key] = image_id
+            self.images.move_to_end(key)
+            while len(self.images) > self.max_size:
+                self.images.popitem(last=False)
+        self.save()
+
+    def invalidate(self, key: str):
+        """
+        Удаляет устаревший ID изображения.
+        """
+        with self.lock:
+            if self.images.pop(key, None) is None:
+                return
+        self.save()
+
+    def stats(self) -> dict:
+        """
+        :return: кол-во записей, попаданий и промахов кэша.
+        """
+        return {"images": len(self.images), "hits": self.hits, "misses": self.misses}
+
+    def load(self):
+        """
+        Загружает кэш из файла.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.loads(f.read())
+            with self.lock:
+                self.images = OrderedDict((k, int(v)) for k, v in data.items())
+        except:
+            logger.warning("Не удалось загрузить кэш изображений.")
+            logger.debug("TRACEBACK", exc_info=True)
+
+    def save(self):
+        """
+        Сохраняет кэш в файл.
+        """
+        if not self.path:
+            return
+        try:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            with self.lock:
+                data = json.dumps(self.images)
+            with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(f"{self.path}.tmp", self.path)
+        except:
+            logger.warning("Не удалось сохранить кэш изображений.")
+            logger.debug("TRACEBACK", exc_info=True)
@@ -0,0 +1,201 @@
+"""
+В данном модуле написаны простые метрики (счетчики, gauge, гистограммы) в формате Prometheus.
+Обновление метрики - это захват блокировки и сложение, поэтому метрики можно не отключать.
+"""
+
+from __future__ import annotations
+from typing import Callable, Iterable
+
+from bisect import bisect_left
+from threading import Lock
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+"""Границы бакетов гистограмм времени (в секундах) по умолчанию."""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{escape_label(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric(object):
+    """
+    Базовый класс метрики.
+
+    :param name: название метрики.
+    :param documentation: описание метрики.
+    :param labels: названия меток.
+    :param registry: реестр, в котором нужно зарегистрировать метрику.
+    """
+    type_ = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 registry: Registry | None = None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.lock = Lock()
+        self.children: dict[tuple[str, ...], list] = {}
+        """Значения метрики ({значения меток: значение})."""
+        (REGISTRY if registry is None else registry).register(self)
+
+    def new_value(self) -> list:
+        return [0]
+
+    def get_child(self, key: tuple[str, ...]) -> list:
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self.new_value())
+        return child
+
+    def clear(self):
+        """
+        Удаляет все значения метрики.
+        """
+        with self.lock:
+            self.children = {}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_}"]
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.children.items()]
+        for key, value in items:
+            lines.append(f"{self.name}{format_labels(self.label_names, key)} {format_value(value[0])}")
+        return lines
+
+
+class Counter(Metric):
+    """
+    Счетчик (только увеличивается).
+    """
+    type_ = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        child = self.get_child(labels)
+        with self.lock:
+            child[0] += amount
+
+
+class Gauge(Metric):
+    """
+    Произвольное значение.
+    """
+    type_ = "gauge"
+
+    def set(self, value: float, *labels):
+        child = self.get_child(labels)
+        with self.lock:
+            child[0] = value
+
+    def inc(self, *labels, amount: float = 1):
+        child = self.get_child(labels)
+        with self.lock:
+            child[0] += amount
+
+
+class Histogram(Metric):
+    """
+    Гистограмма (кол-во наблюдений по бакетам, сумма и кол-во наблюдений).
+
+    :param buckets: верхние границы бакетов.
+    """
+    type_ = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS, registry: Registry | None = None):
+        self.buckets = tuple(sorted(buckets))
+        super(Histogram, self).__init__(name, documentation, labels, registry)
+
+    def new_value(self) -> list:
+        # [кол-во в каждом бакете (последний - +Inf)..., сумма, кол-во]
+        return [0] * (len(self.buckets) + 1) + [0, 0]
+
+    def observe(self, value: float, *labels):
+        child = self.get_child(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            child[index] += 1
+            child[-2] += value
+            child[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_}"]
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.children.items()]
+        for key, value in items:
+            total = 0
+            for bound, amount in zip(self.buckets + (float("inf"),), value):
+                total += amount
+                le = f'le="{format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, le)} {total}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {format_value(value[-2])}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {value[-1]}")
+        return lines
+
+
+class Registry(object):
+    """
+    Реестр метрик.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], None]] = []
+        """Функции, обновляющие метрики перед выгрузкой (например, остатки товаров)."""
+
+    def register(self, metric: Metric):
+        with self.lock:
+            self.metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """
+        Добавляет функцию, которая вызывается перед каждой выгрузкой метрик.
+        """
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        :return: все метрики в текстовом формате Prometheus.
+        """
+        with self.lock:
+            collectors, metrics = list(self.collectors), list(self.metrics)
+        for collector in collectors:
+            try:
+                collector()
+            except:
+                pass
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+"""Реестр метрик по умолчанию."""
+
+
+# Метрики FunPayAPI
+RUNNER_REQUESTS = Counter("funpay_runner_requests_total", "Кол-во запросов к runner/.", ("result",))
+RUNNER_REQUEST_SECONDS = Histogram("funpay_runner_request_seconds", "Время выполнения запроса к runner/.")
+RUNNER_SLOTS = Histogram("funpay_runner_slots_used", "Кол-во объектов в одном запросе к runner/.",
+                         buckets=(1, 2, 3, 4, 5, 6, 7, 8, 9, 10))
+HTTP_429 = Counter("funpay_http_429_total", "Кол-во ответов 429 на запросы Account.method.")
+RUNNER_POLLS = Counter("funpay_runner_polls_total", "Кол-во запросов Runner.listen (фактическая частота опроса).")
+RUNNER_DETECTION_SECONDS = Histogram("funpay_runner_detection_seconds",
+                                     "Примерное время от события на FunPay до его обнаружения (половина интервала).",
+                                     buckets=(0.5, 1, 2, 3, 4, 5, 7.5, 10, 15, 30, 60))
@@ -0,0 +1,220 @@
+"""
+В данном модуле написана легковесная трассировка: каждое событие Runner'а получает трейс (ID + список спанов),
+в который записываются время запроса к runner/, разбора ответа, выполнения хэндлеров, отправки сообщений и
+уведомлений Telegram. Завершенные трейсы хранятся в кольцевом буфере, из которого можно выгрузить N самых медленных.
+"""
+
+from __future__ import annotations
+from typing import Callable
+
+from collections import deque
+from threading import Lock, local
+import functools
+import uuid
+import time
+
+
+class Span(object):
+    """
+    Отрезок времени внутри трейса.
+
+    :param name: название спана.
+    :param start: время начала.
+    :param end: время окончания.
+    """
+    __slots__ = ("name", "start", "end")
+
+    def __init__(self, name: str, start: float, end: float):
+        self.name = name
+        self.start = start
+        self.end = end
+
+
+class Trace(object):
+    """
+    Трейс: все спаны, относящиеся к одному событию.
+
+    :param name: название трейса (например, тип события).
+    :param start: время начала (по умолчанию - текущее).
+    :param attrs: доп. данные (тег Runner'а, ID чата и т.д.).
+    """
+    __slots__ = ("id", "name", "start", "end", "spans", "attrs")
+
+    def __init__(self, name: str, start: float | None = None, attrs: dict | None = None):
+        self.id: str = uuid.uuid4().hex[:16]
+        """ID трейса."""
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end: float | None = None
+        """Время завершения трейса (после выполнения всех хэндлеров события)."""
+        self.spans: list[Span] = []
+        self.attrs = attrs or {}
+
+    def add(self, name: str, start: float, end: float | None = None):
+        """
+        Добавляет спан (можно вызывать и после завершения трейса, например из потока уведомлений Telegram).
+        """
+        self.spans.append(Span(name, start, time.time() if end is None else end))
+
+    @property
+    def duration(self) -> float:
+        """
+        :return: время от начала трейса до окончания последнего спана (в секундах).
+        """
+        end = self.end or time.time()
+        for i in self.spans:
+            end = max(end, i.end)
+        return end - self.start
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "start": round(self.start, 3),
+                "duration": round(self.duration, 4), "attrs": self.attrs,
+                "spans": [{"name": i.name, "offset": round(i.start - self.start, 4),
+                           "duration": round(i.end - i.start, 4)}
+                          for i in sorted(self.spans, key=lambda i: i.start)]}
+
+
+class SpanContext(object):
+    """
+    Контекстный менеджер, записывающий спан в трейс.
+    """
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.trace.add(self.name, self.start)
+        return False
+
+
+class NullContext(object):
+    """
+    Контекстный менеджер, который ничего не делает (если в текущем потоке нет трейса).
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_CONTEXT = NullContext()
+
+
+class Tracer(object):
+    """
+    Кольцевой буфер завершенных трейсов + текущий трейс потока.
+
+    :param size: размер буфера (0 - трассировка выключена).
+    """
+    def __init__(self, size: int = 1000):
+        self.lock = Lock()
+        self.traces: deque[Trace] = deque(maxlen=max(size, 1))
+        self.enabled = size > 0
+        self.local = local()
+
+    def resize(self, size: int):
+        """
+        Изменяет размер буфера (0 - выключает трассировку).
+        """
+        with self.lock:
+            self.traces = deque(self.traces, maxlen=max(size, 1))
+            self.enabled = size > 0
+
+    def start(self, name: str, start: float | None = None, **attrs) -> Trace | None:
+        """
+        Создает трейс.
+
+        :return: трейс или None, если трассировка выключена.
+        """
+        if not self.enabled:
+            return None
+        return Trace(name, start, attrs)
+
+    def finish(self, trace: Trace | None):
+        """
+        Завершает трейс и сохраняет его в буфер.
+        """
+        if trace is None:
+            return
+        trace.end = time.time()
+        with self.lock:
+            self.traces.append(trace)
+
+    def current(self) -> Trace | None:
+        """
+        :return: трейс, активный в текущем потоке.
+        """
+        return getattr(self.local, "trace", None)
+
+    def activate(self, trace: Trace | None) -> ActiveTrace:
+        """
+        Делает трейс активным в текущем потоке (контекстный менеджер).
+        """
+        return ActiveTrace(self, trace)
+
+    def span(self, name: str):
+        """
+        Записывает спан в трейс, активный в текущем потоке (контекстный менеджер). Если трейса нет, ничего не делает.
+        """
+        trace = getattr(self.local, "trace", None)
+        return NULL_CONTEXT if trace is None else SpanContext(trace, name)
+
+    def wrap(self, func: Callable) -> Callable:
+        """
+        Оборачивает функцию так, чтобы она выполнялась с трейсом текущего потока (для Thread(target=...)).
+        """
+        trace = getattr(self.local, "trace", None)
+        if trace is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.activate(trace):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def slowest(self, amount: int = 10) -> list[dict]:
+        """
+        :param amount: кол-во трейсов.
+
+        :return: самые медленные трейсы из буфера (от самого медленного).
+        """
+        with self.lock:
+            traces = list(self.traces)
+        traces.sort(key=lambda i: i.duration, reverse=True)
+        return [i.as_dict() for i in traces[:amount]]
+
+
+class ActiveTrace(object):
+    """
+    Контекстный менеджер, делающий трейс активным в текущем потоке.
+    """
+    __slots__ = ("tracer", "trace", "previous")
+
+    def __init__(self, tracer: Tracer, trace: Trace | None):
+        self.tracer = tracer
+        self.trace = trace
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = getattr(self.tracer.local, "trace", None)
+        self.tracer.local.trace = self.trace
+        return self.trace
+
+    def __exit__(self, *args):
+        self.tracer.local.trace = self.previous
+        return False
+
+
+TRACER = Tracer()
+"""Трассировщик по умолчанию."""
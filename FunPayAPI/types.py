@@ -4,7 +4,8 @@
 from __future__ import annotations
 
 import re
-from typing import Literal, overload, Optional
+from threading import RLock
+from typing import Literal, overload, Optional, Callable
 
 import FunPayAPI.common.enums
 from .common.utils import RegularExpressions
@@ -17,6 +18,8 @@ class BaseOrderInfo:
     Класс, представляющий информацию о заказе.
     """
 
+    __slots__ = ("_order", "_order_attempt_made", "_order_attempt_error")
+
     def __init__(self):
         self._order: Order | None = None
         """Объект заказа"""
@@ -42,13 +45,16 @@ class ChatShortcut(BaseOrderInfo):
     :param unread: флаг "непрочитанности" (`True`, если чат не прочитан (оранжевый). `False`, если чат прочитан).
     :type unread: :obj:`bool`
 
-    :param html: HTML код виджета чата.
-    :type html: :obj:`str`
+    :param html: HTML код виджета чата (None, если не сохраняется, см. Account.keep_html).
+    :type html: :obj:`str` or :obj:`None`
 
     :param determine_msg_type: определять ли тип последнего сообщения?
     :type determine_msg_type: :obj:`bool`, опционально
     """
 
+    __slots__ = ("id", "name", "last_message_text", "last_by_bot", "last_by_vertex", "unread", "node_msg_id",
+                 "user_msg_id", "last_message_type", "html")
+
     def __init__(self, id_: int, name: str, last_message_text: str, node_msg_id: int, user_msg_id: int,
                  unread: bool, html: str, determine_msg_type: bool = True):
         self.id: int = id_
@@ -69,7 +75,7 @@ class ChatShortcut(BaseOrderInfo):
         """ID последнего прочитанного сообщения."""
         self.last_message_type: MessageTypes | None = None if not determine_msg_type else self.get_last_message_type()
         """Тип последнего сообщения."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код виджета чата."""
         BaseOrderInfo.__init__(self)
 
@@ -129,6 +135,8 @@ class BuyerViewing:
     Данный класс представляет поле "Покупатель смотрит"
     """
 
+    __slots__ = ("buyer_id", "link", "text", "tag", "html", "is_viewing_lot")
+
     def __init__(self, buyer_id: int, link: str | None, text: str | None, tag: str | None, html: str | None = None):
         """
         :param buyer_id: ID покупателя.
@@ -223,8 +231,8 @@ class Message(BaseOrderInfo):
     :param author_id: ID автора сообщения.
     :type author_id: :obj:`int`
 
-    :param html: HTML код сообщения.
-    :type html: :obj:`str`
+    :param html: HTML код сообщения (None, если не сохраняется, см. Account.keep_html).
+    :type html: :obj:`str` or :obj:`None`
 
     :param image_link: ссылка на изображение из сообщения (если есть).
     :type image_link: :obj:`str` or :obj:`None`, опционально
@@ -233,9 +241,14 @@ class Message(BaseOrderInfo):
     :type determine_msg_type: :obj:`bool`, опционально
     """
 
+    __slots__ = ("id", "text", "chat_id", "chat_name", "interlocutor_id", "buyer_viewing", "type", "author",
+                 "author_id", "html", "image_link", "image_name", "by_bot", "by_vertex", "badge", "is_employee",
+                 "is_support", "is_moderation", "is_arbitration", "is_autoreply", "initiator_username",
+                 "initiator_id", "i_am_seller", "i_am_buyer", "tag")
+
     def __init__(self, id_: int, text: str | None, chat_id: int | str, chat_name: str | None,
                  interlocutor_id: int | None,
-                 author: str | None, author_id: int, html: str,
+                 author: str | None, author_id: int, html: str | None,
                  image_link: str | None = None, image_name: str | None = None,
                  determine_msg_type: bool = True, badge_text: Optional[str] = None, tag: Optional[str] = None):
         self.id: int = id_
@@ -256,7 +269,7 @@ class Message(BaseOrderInfo):
         """Автор сообщения."""
         self.author_id: int = author_id
         """ID автора сообщения."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML-код сообщения."""
         self.image_link: str | None = image_link
         """Ссылка на изображение в сообщении (если оно есть)."""
@@ -380,17 +393,20 @@ class OrderShortcut(BaseOrderInfo):
     :param subcategory: подкатегория, к которой относится заказ.
     :type subcategory: :class:`FunPayAPI.types.SubCategory` or :obj:`None`
 
-    :param html: HTML код виджета заказа.
-    :type html: :obj:`str`
+    :param html: HTML код виджета заказа (None, если не сохраняется, см. Account.keep_html).
+    :type html: :obj:`str` or :obj:`None`
 
     :param dont_search_amount: не искать кол-во товара.
     :type dont_search_amount: :obj:`bool`, опционально
     """
 
+    __slots__ = ("id", "description", "price", "currency", "amount", "buyer_username", "buyer_id", "chat_id",
+                 "status", "date", "subcategory_name", "subcategory", "html")
+
     def __init__(self, id_: str, description: str, price: float, currency: Currency,
                  buyer_username: str, buyer_id: int, chat_id: int | str, status: OrderStatuses,
                  date: datetime.datetime, subcategory_name: str, subcategory: SubCategory | None,
-                 html: str, dont_search_amount: bool = False):
+                 html: str | None, dont_search_amount: bool = False):
         self.id: str = id_ if not id_.startswith("#") else id_[1:]
         """ID заказа."""
         self.description: str = description
@@ -415,7 +431,7 @@ class OrderShortcut(BaseOrderInfo):
         """Название подкатегории, к которой относится заказ."""
         self.subcategory: SubCategory | None = subcategory
         """Подкатегория, к которой относится заказ."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код виджета заказа."""
         BaseOrderInfo.__init__(self)
 
@@ -1102,13 +1118,46 @@ class LotPage:
         return f"https://funpay.com/users/{self.seller_id}/"
 
 
+class RaiseResponse:
+    """
+    Данный класс описывает результат попытки поднятия лотов одной категории (игры).
+
+    :param complete: подняты ли лоты.
+    :type complete: :obj:`bool`
+
+    :param wait: через сколько секунд можно повторно поднимать лоты.
+    :type wait: :obj:`int`
+
+    :param raised_subcategories: подкатегории, лоты которых были подняты (или которые пытались поднять).
+    :type raised_subcategories: :obj:`list` of :class:`FunPayAPI.types.SubCategory`
+
+    :param funpay_response: сообщение FunPay.
+    :type funpay_response: :obj:`str` or :obj:`None`
+    """
+
+    __slots__ = ("complete", "wait", "raised_subcategories", "funpay_response")
+
+    def __init__(self, complete: bool, wait: int, raised_subcategories: list[SubCategory],
+                 funpay_response: str | None):
+        self.complete: bool = complete
+        """Подняты ли лоты."""
+        self.wait: int = wait
+        """Через сколько секунд можно повторно поднимать лоты."""
+        self.raised_subcategories: list[SubCategory] = raised_subcategories
+        """Подкатегории, лоты которых были подняты (или которые пытались поднять)."""
+        self.funpay_response: str | None = funpay_response
+        """Сообщение FunPay."""
+
+
 class SellerShortcut:
     """
     Класс, описывающий объект пользователя из таблицы предложений.
     """
 
+    __slots__ = ("id", "username", "online", "stars", "reviews", "html")
+
     def __init__(self, id_: int, username: str, online: bool, stars: None | int, reviews: int,
-                 html: str):
+                 html: str | None):
         self.id: int = id_
         """ID пользователя."""
         self.username: str = username
@@ -1119,7 +1168,7 @@ class SellerShortcut:
         """Количество звезд."""
         self.reviews: int = reviews
         """Количество отзывов."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код страницы пользователя."""
 
     @property
@@ -1152,15 +1201,18 @@ class LotShortcut:
     :param subcategory: подкатегория лота.
     :type subcategory: :class:`FunPayAPI.types.SubCategory`
 
-    :param html: HTML код виджета лота.
-    :type html: :obj:`str`
+    :param html: HTML код виджета лота (None, если не сохраняется, см. Account.keep_html).
+    :type html: :obj:`str` or :obj:`None`
     """
 
+    __slots__ = ("id", "server", "side", "description", "title", "amount", "price", "currency", "seller", "auto",
+                 "promo", "attributes", "subcategory", "html", "public_link")
+
     def __init__(self, id_: int | str, server: str | None, side: str | None,
                  description: str | None, amount: int | None, price: float, currency: Currency,
                  subcategory: SubCategory | None,
                  seller: SellerShortcut | None, auto: bool, promo: bool | None, attributes: dict[str, int | str] | None,
-                 html: str):
+                 html: str | None):
         self.id: int | str = id_
         if isinstance(self.id, str) and self.id.isnumeric():
             self.id = int(self.id)
@@ -1189,7 +1241,7 @@ class LotShortcut:
         """Атрибуты лота (только для лотов из таблицы)"""
         self.subcategory: SubCategory = subcategory
         """Подкатегория лота."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML-код виджета лота."""
         self.public_link: str = f"https://funpay.com/chips/offer?id={self.id}" \
             if self.subcategory.type is SubCategoryTypes.CURRENCY else f"https://funpay.com/lots/offer?id={self.id}"
@@ -1221,14 +1273,17 @@ class MyLotShortcut:
     :param subcategory: подкатегория лота.
     :type subcategory: :class:`FunPayAPI.types.SubCategory`
 
-    :param html: HTML код виджета лота.
-    :type html: :obj:`str`
+    :param html: HTML код виджета лота (None, если не сохраняется, см. Account.keep_html).
+    :type html: :obj:`str` or :obj:`None`
     """
 
+    __slots__ = ("id", "server", "side", "description", "title", "amount", "price", "currency", "auto",
+                 "subcategory", "active", "html", "public_link")
+
     def __init__(self, id_: int | str, server: str | None, side: str | None,
                  description: str | None, amount: int | None, price: float, currency: Currency,
                  subcategory: SubCategory | None, auto: bool, active: bool,
-                 html: str):
+                 html: str | None):
         self.id: int | str = id_
         if isinstance(self.id, str) and self.id.isnumeric():
             self.id = int(self.id)
@@ -1253,7 +1308,7 @@ class MyLotShortcut:
         """Подкатегория лота."""
         self.active: bool = active
         """Активен ли лот?"""
-        self.html: str = html
+        self.html: str | None = html
         """HTML-код виджета лота."""
         self.public_link: str = f"https://funpay.com/chips/offer?id={self.id}" \
             if self.subcategory.type is SubCategoryTypes.CURRENCY else f"https://funpay.com/lots/offer?id={self.id}"
@@ -1264,6 +1319,9 @@ class UserProfile:
     """
     Данный класс представляет пользователя FunPay.
 
+    Лоты могут добавляться "лениво" (:meth:`add_lazy_lot`): объект лота создается только при первом обращении к нему,
+    а ID лотов и подкатегории доступны без создания объектов (:meth:`get_lots_ids`, :meth:`get_subcategories`).
+
     :param id_: ID пользователя.
     :type id_: :obj:`int`
 
@@ -1279,11 +1337,14 @@ class UserProfile:
     :param banned: заблокирован ли пользователь?
     :type banned: :obj:`bool`
 
-    :param html: HTML код страницы пользователя.
-    :type html: :obj:`str`
+    :param html: HTML код страницы пользователя (None, если не сохраняется, см. Account.keep_html).
+    :type html: :obj:`str` or :obj:`None`
     """
 
-    def __init__(self, id_: int, username: str, profile_photo: str, online: bool, banned: bool, html: str):
+    __slots__ = ("id", "username", "profile_photo", "online", "banned", "html", "__lots_ids",
+                 "__sorted_by_subcategory_lots", "__sorted_by_subcategory_type_lots", "__pending_lots", "__lock")
+
+    def __init__(self, id_: int, username: str, profile_photo: str, online: bool, banned: bool, html: str | None):
         self.id: int = id_
         """ID пользователя."""
         self.username: str = username
@@ -1294,7 +1355,7 @@ class UserProfile:
         """Онлайн ли пользователь."""
         self.banned: bool = banned
         """Заблокирован ли пользователь."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код страницы пользователя."""
         self.__lots_ids: dict[int | str, LotShortcut] = {}
         """Все лоты пользователя в виде словаря {ID: лот}}"""
@@ -1304,6 +1365,37 @@ class UserProfile:
             SubCategoryTypes.COMMON: {},
             SubCategoryTypes.CURRENCY: {}
         }
+        self.__pending_lots: dict[int | str, Callable[[], LotShortcut]] = {}
+        """Еще не созданные лоты {ID: функция, создающая объект лота}. Пока лот не создан, в словарях выше
+        на его месте хранится None."""
+        self.__lock = RLock()
+
+    def __build_lot(self, lot_id: int | str):
+        """
+        Создает объект "ленивого" лота (если он еще не создан) и кладет его на место заглушки.
+
+        :param lot_id: ID лота.
+        """
+        with self.__lock:
+            factory = self.__pending_lots.pop(lot_id, None)
+            if factory is None:
+                return
+            lot = factory()
+            self.__lots_ids[lot_id] = lot
+            self.__sorted_by_subcategory_lots[lot.subcategory][lot_id] = lot
+            self.__sorted_by_subcategory_type_lots[lot.subcategory.type][lot_id] = lot
+
+    def __build_lots(self, lots_ids=None):
+        """
+        Создает объекты всех "ленивых" лотов (или только переданных).
+
+        :param lots_ids: ID лотов.
+        """
+        if not self.__pending_lots:
+            return
+        with self.__lock:
+            for lot_id in list(self.__pending_lots if lots_ids is None else lots_ids):
+                self.__build_lot(lot_id)
 
     def get_lot(self, lot_id: int | str) -> LotShortcut | None:
         """
@@ -1316,7 +1408,8 @@ class UserProfile:
         :rtype: :class:`FunPayAPI.types.LotShortcut` or :obj:`None`
         """
         if isinstance(lot_id, str) and lot_id.isnumeric():
-            return self.__lots_ids.get(int(lot_id))
+            lot_id = int(lot_id)
+        self.__build_lot(lot_id)
         return self.__lots_ids.get(lot_id)
 
     def get_lots(self) -> list[LotShortcut]:
@@ -1326,8 +1419,43 @@ class UserProfile:
         :return: список всех лотов пользователя.
         :rtype: :obj:`list` of :class:`FunPayAPI.types.LotShortcut`
         """
+        self.__build_lots()
         return list(self.__lots_ids.values())
 
+    def get_lots_ids(self) -> list[int | str]:
+        """
+        Возвращает список ID всех лотов пользователя (без создания объектов лотов).
+
+        :return: список ID всех лотов пользователя.
+        :rtype: :obj:`list` of :obj:`int` or :obj:`str`
+        """
+        return list(self.__lots_ids)
+
+    def get_subcategories(self) -> list[SubCategory]:
+        """
+        Возвращает список подкатегорий, в которых есть лоты пользователя (без создания объектов лотов).
+
+        :return: список подкатегорий.
+        :rtype: :obj:`list` of :class:`FunPayAPI.types.SubCategory`
+        """
+        return list(self.__sorted_by_subcategory_lots)
+
+    def get_lots_diff(self, previous: UserProfile) -> tuple[list[int | str], list[int | str]]:
+        """
+        Сравнивает активные лоты с предыдущим профилем (на странице профиля отображаются только активные лоты).
+        Объекты лотов не создаются.
+
+        :param previous: предыдущий профиль того же пользователя.
+        :type previous: :class:`FunPayAPI.types.UserProfile`
+
+        :return: ID лотов, ставших активными, и ID лотов, ставших неактивными.
+        :rtype: :obj:`tuple` (:obj:`list` of :obj:`int` or :obj:`str`, :obj:`list` of :obj:`int` or :obj:`str`)
+        """
+        previous_ids = previous.get_lots_ids()
+        current_ids = self.get_lots_ids()
+        previous_set, current_set = set(previous_ids), set(current_ids)
+        return [i for i in current_ids if i not in previous_set], [i for i in previous_ids if i not in current_set]
+
     @overload
     def get_sorted_lots(self, mode: Literal[1]) -> dict[int | str, LotShortcut]:
         ...
@@ -1356,6 +1484,7 @@ class UserProfile:
             :obj:`dict` {:class:`FunPayAPI.types.SubCategory`: :obj:`dict` {:obj:`int` or :obj:`str`: :class:`FunPayAPI.types.LotShortcut`}} (`mode==2`) \n
             :obj:`dict` {:class:`FunPayAPI.common.enums.SubCategoryTypes`: :obj:`dict` {:obj:`int` or :obj:`str`: :class:`FunPayAPI.types.LotShortcut`}} (`mode==3`)
         """
+        self.__build_lots()
         if mode == 1:
             return self.__lots_ids
         elif mode == 2:
@@ -1369,11 +1498,13 @@ class UserProfile:
 
         :param lot: объект лота.
         """
-        self.__lots_ids[lot.id] = lot
-        if lot.subcategory not in self.__sorted_by_subcategory_lots:
-            self.__sorted_by_subcategory_lots[lot.subcategory] = {}
-        self.__sorted_by_subcategory_lots[lot.subcategory][lot.id] = lot
-        self.__sorted_by_subcategory_type_lots[lot.subcategory.type][lot.id] = lot
+        with self.__lock:
+            self.__pending_lots.pop(lot.id, None)
+            self.__lots_ids[lot.id] = lot
+            if lot.subcategory not in self.__sorted_by_subcategory_lots:
+                self.__sorted_by_subcategory_lots[lot.subcategory] = {}
+            self.__sorted_by_subcategory_lots[lot.subcategory][lot.id] = lot
+            self.__sorted_by_subcategory_type_lots[lot.subcategory.type][lot.id] = lot
 
     def add_lot(self, lot: LotShortcut):
         """
@@ -1385,6 +1516,26 @@ class UserProfile:
             return
         self.update_lot(lot)
 
+    def add_lazy_lot(self, lot_id: int | str, subcategory: SubCategory, factory: Callable[[], LotShortcut]):
+        """
+        Добавляет лот, объект которого будет создан только при первом обращении к нему.
+
+        :param lot_id: ID лота.
+        :type lot_id: :obj:`int` or :obj:`str`
+
+        :param subcategory: подкатегория лота.
+        :type subcategory: :class:`FunPayAPI.types.SubCategory`
+
+        :param factory: функция без аргументов, возвращающая объект лота.
+        """
+        with self.__lock:
+            if lot_id in self.__lots_ids:
+                return
+            self.__pending_lots[lot_id] = factory
+            self.__lots_ids[lot_id] = None
+            self.__sorted_by_subcategory_lots.setdefault(subcategory, {})[lot_id] = None
+            self.__sorted_by_subcategory_type_lots[subcategory.type][lot_id] = None
+
     def get_common_lots(self) -> list[LotShortcut]:
         """
         Возвращает список стандартных лотов со страницы пользователя.
@@ -1392,6 +1543,7 @@ class UserProfile:
         :return: Список стандартных лотов со страницы пользователя.
         :rtype: :obj:`list` of :class:`FunPayAPI.types.LotShortcut`
         """
+        self.__build_lots(self.__sorted_by_subcategory_type_lots[SubCategoryTypes.COMMON])
         return list(self.__sorted_by_subcategory_type_lots[SubCategoryTypes.COMMON].values())
 
     def get_currency_lots(self) -> list[LotShortcut]:
@@ -1401,6 +1553,7 @@ class UserProfile:
         :return: список лотов-валют со страницы пользователя.
         :rtype: :obj:`list` of :class:`FunPayAPI.types.LotShortcut`
         """
+        self.__build_lots(self.__sorted_by_subcategory_type_lots[SubCategoryTypes.CURRENCY])
         return list(self.__sorted_by_subcategory_type_lots[SubCategoryTypes.CURRENCY].values())
 
     def __str__(self):
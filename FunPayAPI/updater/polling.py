@@ -0,0 +1,129 @@
+"""
+В данном модуле написан адаптивный интервал опроса FunPay для :meth:`FunPayAPI.updater.runner.Runner.listen`.
+После активности (новые сообщения, заказы, запросы "Покупатель смотрит") интервал сразу уменьшается до минимального,
+а если активности нет дольше quiet_time секунд, он постепенно увеличивается до максимального.
+После ошибки 429 интервал не бывает меньше базового (requestsDelay).
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from threading import Condition
+import time
+
+from ..common import metrics
+
+
+class AdaptivePollInterval(object):
+    """
+    Адаптивный интервал между запросами Runner'а.
+
+    :param base_delay: базовый интервал (в секундах).
+    :param min_delay: мин. интервал (по умолчанию - базовый).
+    :param max_delay: макс. интервал (по умолчанию - базовый).
+    :param growth: во сколько раз увеличивается интервал после каждого запроса без активности.
+    :param quiet_time: через сколько секунд без активности начинать увеличивать интервал.
+    """
+    def __init__(self, base_delay: float = 6.0, min_delay: float | None = None, max_delay: float | None = None,
+                 growth: float = 1.25, quiet_time: float = 60):
+        self.condition = Condition()
+        self.base_delay = base_delay
+        self.min_delay = base_delay
+        self.max_delay = base_delay
+        self.growth = growth
+        self.quiet_time = quiet_time
+        self.delay: float = base_delay
+        """Текущий интервал (без учета паузы после ошибки 429)."""
+        self.last_activity: float = time.time()
+        """Время последней активности."""
+        self.__polls: deque[float] = deque(maxlen=100)
+        """Время последних запросов (для вычисления фактической частоты опроса)."""
+        self.__latency: float | None = None
+        """Среднее (EMA) время обнаружения события (половина интервала между запросами)."""
+        self.__woken = False
+        self.configure(base_delay, min_delay, max_delay)
+
+    def configure(self, base_delay: float, min_delay: float | None = None, max_delay: float | None = None):
+        """
+        Изменяет границы интервала.
+        """
+        with self.condition:
+            self.base_delay = base_delay
+            self.min_delay = base_delay if min_delay is None else min(min_delay, base_delay)
+            self.max_delay = base_delay if max_delay is None else max(max_delay, base_delay)
+            self.delay = min(max(self.delay, self.min_delay), self.max_delay)
+
+    def activity(self, now: float | None = None):
+        """
+        Отмечает активность: интервал уменьшается до минимального, ожидание следующего запроса прерывается.
+        """
+        with self.condition:
+            self.last_activity = time.time() if now is None else now
+            if self.delay > self.min_delay:
+                self.delay = self.min_delay
+                self.__woken = True
+                self.condition.notify_all()
+
+    def poll(self, had_events: bool, now: float | None = None) -> float:
+        """
+        Отмечает выполненный запрос и пересчитывает интервал.
+
+        :param had_events: были ли получены события (кроме Initial-событий).
+        :param now: время запроса.
+
+        :return: новый интервал.
+        """
+        now = time.time() if now is None else now
+        metrics.RUNNER_POLLS.inc()
+        with self.condition:
+            if had_events and self.__polls:
+                # Событие произошло где-то между прошлым и текущим запросом: в среднем - в середине интервала.
+                latency = (now - self.__polls[-1]) / 2
+                self.__latency = latency if self.__latency is None else self.__latency * 0.8 + latency * 0.2
+                metrics.RUNNER_DETECTION_SECONDS.observe(latency)
+            self.__polls.append(now)
+        if had_events:
+            self.activity(now)
+        with self.condition:
+            if not had_events and now - self.last_activity > self.quiet_time:
+                self.delay = min(self.delay * self.growth, self.max_delay)
+            return self.delay
+
+    def get_delay(self, last_429_err_time: float, now: float | None = None) -> float:
+        """
+        :param last_429_err_time: время последней ошибки 429 аккаунта.
+
+        :return: интервал до следующего запроса с учетом паузы после ошибки 429
+            (в течение 60 секунд после ошибки интервал не меньше базового).
+        """
+        now = time.time() if now is None else now
+        with self.condition:
+            if now - last_429_err_time <= 60:
+                return max(self.delay, self.base_delay)
+            return self.delay
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Ждет до следующего запроса (ожидание прерывается при активности).
+
+        :return: True, если ожидание прервано активностью (интервал уменьшился), иначе False.
+        """
+        if timeout <= 0:
+            return False
+        deadline = time.time() + timeout
+        with self.condition:
+            self.__woken = False
+            while not self.__woken and (remaining := deadline - time.time()) > 0:
+                self.condition.wait(remaining)
+            return self.__woken
+
+    def stats(self) -> dict:
+        """
+        :return: текущий интервал, фактическая частота опроса (запросов в минуту) и среднее время обнаружения события.
+        """
+        with self.condition:
+            polls = list(self.__polls)
+            delay, latency = self.delay, self.__latency
+        rate = (len(polls) - 1) / (polls[-1] - polls[0]) * 60 if len(polls) > 1 and polls[-1] > polls[0] else 0
+        return {"delay": round(delay, 2), "polls_per_min": round(rate, 2),
+                "detection_latency": None if latency is None else round(latency, 2)}
@@ -16,10 +16,16 @@ import logging
 from bs4 import BeautifulSoup
 
 from ..common import exceptions
+from ..common.tracing import TRACER
+from .polling import AdaptivePollInterval
+from .state import ChatStateStore, ChatStateView, LastMessagesView, LRUDict
 from .events import *
 
 logger = logging.getLogger("FunPayAPI.runner")
 
+MAX_CHAT_BOOKMARKS = 10
+"""Сколько последних ответов chat_bookmarks хранить между итерациями listen."""
+
 
 class Runner:
     """
@@ -66,25 +72,39 @@ class Runner:
 
 
         self.saved_orders: dict[str, types.OrderShortcut] | None = None
-        """Сохраненные состояния заказов ({ID заказа: экземпляр types.OrderShortcut})."""
+        """Сохраненные состояния заказов с первой страницы продаж ({ID заказа: экземпляр types.OrderShortcut})."""
+        self.old_paid_orders: dict[str, types.OrderShortcut] = {}
+        """Оплаченные заказы, ушедшие с первой страницы продаж (их статус проверяется по счетчику оплаченных)."""
+        self.__untracked_paid: int | None = None
+        """Кол-во оплаченных заказов, неизвестных Runner'у (разница счетчика FunPay и известных оплаченных)."""
+
+        self.last_orders_parse_time: float = 0
+        """Время (в секундах) обработки последнего события заказов."""
+
+        self.__sales_subcategories: dict[str, types.SubCategory] | None = None
+        """Кэш словаря подкатегорий со страницы продаж (см. Account.get_sales)."""
+
+        self.state: ChatStateStore = ChatStateStore()
+        """Хранилище состояния чатов (ограничено по памяти, см. FunPayAPI.updater.state).
+        Словари ниже - представления этого хранилища."""
 
-        self.runner_last_messages: dict[int, list[int, int, str | None]] = {}
+        self.runner_last_messages: LastMessagesView = LastMessagesView(self.state)
         """ID последний сообщений {ID чата: [ID последего сообщения чата, ID последнего прочитанного сообщения чата, 
         текст последнего сообщения или None, если это изображение]}."""
 
-        self.by_bot_ids: dict[int, list[int]] = {}
+        self.by_bot_ids: ChatStateView = ChatStateView(self.state, "by_bot_ids")
         """ID сообщений, отправленных с помощью self.account.send_message ({ID чата: [ID сообщения, ...]})."""
 
-        self.last_messages_ids: dict[int, int] = {}
+        self.last_messages_ids: ChatStateView = ChatStateView(self.state, "last_message_id")
         """ID последних сообщений в чатах ({ID чата: ID последнего сообщения})."""
 
-        self.chat_node_tags: dict[int, str] = {}
+        self.chat_node_tags: ChatStateView = ChatStateView(self.state, "node_tag")
         """Теги прочитанных чатов ({ID чата: тег})"""
 
-        self.users_ids: dict[int, int] = {}
+        self.users_ids: ChatStateView = ChatStateView(self.state, "interlocutor_id")
         """id чата - id собеседника"""
 
-        self.buyers_viewing: dict[int, types.BuyerViewing] = {}
+        self.buyers_viewing: LRUDict = LRUDict(1000)
         """Что смотрит покупатель? ({ID покупателя: что смотрит}"""
 
         self.runner_len: int = 10
@@ -102,6 +122,8 @@ class Runner:
         self.__chat_bookmarks: list[dict] = []
         self.__chat_nodes: dict[int, tuple[dict, int]] = {}
         self.__chat_bookmarks_time = 0
+        self.poll_interval: AdaptivePollInterval = AdaptivePollInterval()
+        """Адаптивный интервал между запросами :meth:`listen` (границы задаются в :meth:`listen`)."""
         self.account.runner = self
 
     def __add_payload(self, payload: dict):
@@ -269,6 +291,8 @@ class Runner:
                         elif obj["type"] == "chat_bookmarks" and (data := obj.get("data")) and data.get("order"):
                             if not is_listener_request:
                                 self.__chat_bookmarks.append(obj)
+                                # Список очищается в listen, но если listen не запущен, храним только последние.
+                                del self.__chat_bookmarks[:-MAX_CHAT_BOOKMARKS]
                         elif (self.make_msg_requests and
                               (obj["type"] == "chat_node" and (data := obj.get("data")) and
                                (node := data.get("node")) and
@@ -277,12 +301,17 @@ class Runner:
                             if (last_msg_id > self.last_messages_ids.get(node_id, 0) and
                                     (node_id not in self.__chat_nodes or last_msg_id > self.__chat_nodes[node_id][-1])):
                                 self.__chat_nodes[node_id] = (obj, last_msg_id)
+                                # Новое сообщение замечено в ответе на другой запрос: опрашиваем FunPay чаще.
+                                self.poll_interval.activity()
+                        elif obj["type"] == "c-p-u" and obj.get("data"):
+                            self.poll_interval.activity()
                 except:
                     logger.warning("Что-то пошло не так во время разбора ответа Runner")
                     logger.debug("TRACEBACK", exc_info=True)
             except:
                 logger.error("Бабах")
                 logger.debug("TRACEBACK", exc_info=True)
+                time.sleep(1)
 
 
 
@@ -383,7 +412,8 @@ class Runner:
 
             chat_with = chat.find("div", {"class": "media-user-name"}).text
             chat_obj = types.ChatShortcut(chat_id, chat_with, last_msg_text, node_msg_id,
-                                          user_msg_id, unread, str(chat))
+                                          user_msg_id, unread,
+                                          str(chat) if self.account.keep_html else None)
             if last_msg_text_or_none is not None:
                 chat_obj.last_by_bot = by_bot
                 chat_obj.last_by_vertex = by_vertex
@@ -540,11 +570,14 @@ class Runner:
         if not self.make_order_requests:
             return events
 
+        start_time = time.time()
         attempts = 3
         while attempts:
             attempts -= 1
             try:
-                orders_list = self.account.get_sales()[1]  # todo добавить возможность реакции на подтверждение очень старых заказов
+                # Сравнивается вся первая страница, но известные заказы с тем же статусом не парсятся.
+                _, orders_list, _, self.__sales_subcategories = \
+                    self.account.get_sales(subcategories=self.__sales_subcategories, known_orders=self.saved_orders)
                 break
             except exceptions.RequestFailedError as e:
                 logger.error(e)
@@ -557,17 +590,73 @@ class Runner:
             return events
 
         now_orders = {}
+        parsed_amount = 0
         for order in orders_list:
             now_orders[order.id] = order
             if self.saved_orders is None:
                 events.append(InitialOrderEvent(self.__last_order_event_tag, order))
-            elif order.id not in self.saved_orders:
+                continue
+            if (saved_order := self.saved_orders.get(order.id)) is order:
+                continue
+            parsed_amount += 1
+            if saved_order is None and (saved_order := self.old_paid_orders.get(order.id)) is None:
                 events.append(NewOrderEvent(self.__last_order_event_tag, order))
                 if order.status == types.OrderStatuses.CLOSED:
                     events.append(OrderStatusChangedEvent(self.__last_order_event_tag, order))
-            elif order.status != self.saved_orders[order.id].status:
+            elif order.status != saved_order.status:
                 events.append(OrderStatusChangedEvent(self.__last_order_event_tag, order))
+        if self.saved_orders is not None:
+            for order_id, order in self.saved_orders.items():
+                if order_id not in now_orders and order.status is types.OrderStatuses.PAID:
+                    self.old_paid_orders[order_id] = order
+            for order_id in now_orders:
+                self.old_paid_orders.pop(order_id, None)
+        events.extend(self.confirm_paid_orders(now_orders, int(obj["data"]["seller"])))
         self.saved_orders = now_orders
+
+        self.last_orders_parse_time = time.time() - start_time
+        logger.debug(f"Событие заказов обработано за {self.last_orders_parse_time:.3f} сек. "
+                     f"(заказов на странице: {len(now_orders)}, разобрано: {parsed_amount}).")
+        return events
+
+    def confirm_paid_orders(self, orders: dict[str, types.OrderShortcut],
+                            paid_amount: int) -> list[OrderStatusChangedEvent]:
+        """
+        Если разница между счетчиком оплаченных заказов FunPay и кол-вом известных Runner'у оплаченных заказов
+        уменьшилась, значит статус изменился у оплаченного заказа, ушедшего с первой страницы продаж
+        (см. :attr:`old_paid_orders`). Такие заказы проверяются через
+        :meth:`FunPayAPI.account.Account.get_orders_by_ids` (по 10 заказов за запрос).
+
+        :param orders: заказы с первой страницы продаж ({ID заказа: экземпляр types.OrderShortcut}).
+        :param paid_amount: кол-во оплаченных заказов из orders_counters.
+
+        :return: список событий изменения статуса заказа.
+        """
+        window_paid = sum(i.status is types.OrderStatuses.PAID for i in orders.values())
+        untracked = paid_amount - window_paid - len(self.old_paid_orders)
+        changed = 0 if self.__untracked_paid is None else self.__untracked_paid - untracked
+        events = []
+        unchecked = list(self.old_paid_orders.values()) if changed > 0 else []
+        for index in range(0, len(unchecked), 10):
+            if len(events) >= changed:
+                break
+            batch = unchecked[index:index + 10]
+            try:
+                full_orders = self.account.get_orders_by_ids(*[i.id for i in batch], include_details=False,
+                                                             include_review=False)
+            except:
+                logger.error("Не удалось проверить статусы заказов.")
+                logger.debug("TRACEBACK", exc_info=True)
+                break
+            for order in batch:
+                full_order = full_orders.get(order.id)
+                if full_order is None or full_order.status is order.status:
+                    continue
+                order.status = full_order.status
+                del self.old_paid_orders[order.id]
+                events.append(OrderStatusChangedEvent(self.__last_order_event_tag, order))
+        # Если изменился статус заказа, неизвестного Runner'у, найти его нельзя - просто запоминаем новую разницу.
+        self.__untracked_paid = paid_amount - window_paid - len(self.old_paid_orders)
         return events
 
     def update_last_message(self, chat_id: int, message_id: int, message_text: str | None):
@@ -595,13 +684,11 @@ class Runner:
         :param message_id: ID сообщения.
         :type message_id: :obj:`int`
         """
-        if self.by_bot_ids.get(chat_id) is None:
-            self.by_bot_ids[chat_id] = [message_id]
-        else:
-            self.by_bot_ids[chat_id].append(message_id)
+        self.by_bot_ids[chat_id] = (self.by_bot_ids.get(chat_id) or []) + [message_id]
 
     def listen(self, requests_delay: int | float = 6.0,
-               ignore_exceptions: bool = True) -> Generator[InitialChatEvent | ChatsListChangedEvent |
+               ignore_exceptions: bool = True, min_delay: int | float | None = None,
+               max_delay: int | float | None = None) -> Generator[InitialChatEvent | ChatsListChangedEvent |
                                                             LastChatMessageChangedEvent | NewMessageEvent |
                                                             InitialOrderEvent | OrdersListChangedEvent | NewOrderEvent |
                                                             OrderStatusChangedEvent]:
@@ -614,6 +701,12 @@ class Runner:
         :param ignore_exceptions: игнорировать ошибки?
         :type ignore_exceptions: :obj:`bool`, опционально
 
+        :param min_delay: мин. задержка после активности (по умолчанию - requests_delay).
+        :type min_delay: :obj:`int` or :obj:`float` or :obj:`None`, опционально
+
+        :param max_delay: макс. задержка при отсутствии активности (по умолчанию - requests_delay).
+        :type max_delay: :obj:`int` or :obj:`float` or :obj:`None`, опционально
+
         :return: генератор событий FunPay.
         :rtype: :obj:`Generator` of :class:`FunPayAPI.updater.events.InitialChatEvent`,
             :class:`FunPayAPI.updater.events.ChatsListChangedEvent`,
@@ -623,13 +716,15 @@ class Runner:
             :class:`FunPayAPI.updater.events.NewOrderEvent`,
             :class:`FunPayAPI.updater.events.OrderStatusChangedEvent`
         """
-
+        self.poll_interval.configure(requests_delay, min_delay, max_delay)
         while True:
             start_time = time.time()
+            had_events = False
             try:
                 if not (self.__orders_counters and self.__chat_bookmarks):
                     updates_objects = self.get_updates()["objects"]
                     is_request_made = True
+                    request_time = time.time()
                 else:
                     updates_objects = [self.__orders_counters,]
                     chat_bookmarks = self.__chat_bookmarks[::-1]
@@ -641,12 +736,23 @@ class Runner:
                         chat_ids.update(cb_ids)
                         updates_objects.append(cb)
                     is_request_made = False
+                    request_time = None
                 self.__orders_counters = None
                 self.__chat_bookmarks = []
+                parse_start = time.time()
                 events = self.parse_updates(updates_objects)
+                parse_end = time.time()
+                if TRACER.enabled:
+                    # Запрос и разбор ответа общие для всех событий цикла, поэтому записываются в трейс каждого.
+                    for event in events:
+                        event.trace = TRACER.start(event.type.name, start_time, runner_tag=event.runner_tag)
+                        if request_time:
+                            event.trace.add("runner_request", start_time, request_time)
+                        event.trace.add("parse", parse_start, parse_end)
                 if is_request_made and not events:
                     # если сделали запрос и не получили эвентов, то сохраненные чаты нам больше не понадобятся
                     self.__chat_nodes = {}
+                had_events = any(i.type not in (EventTypes.INITIAL_CHAT, EventTypes.INITIAL_ORDER) for i in events)
                 for event in events:
                     yield event
             except Exception as e:
@@ -656,10 +762,14 @@ class Runner:
                     logger.error("Произошла ошибка при получении событий. "
                                  "(ничего страшного, если это сообщение появляется нечасто).")
                     logger.debug("TRACEBACK", exc_info=True)
-            iteration_time = time.time() - start_time
-            if time.time() - self.account.last_429_err_time > 60:
-                rt = requests_delay - iteration_time
-                if rt > 0:
-                    time.sleep(rt)
-            else:
-                time.sleep(requests_delay)
+            self.poll_interval.poll(had_events, start_time)
+            iteration_end = time.time()
+            # Ожидание прерывается (и пересчитывается), если во время него обнаружена активность.
+            while True:
+                delay = self.poll_interval.get_delay(self.account.last_429_err_time)
+                if time.time() - self.account.last_429_err_time > 60:
+                    rt = start_time + delay - time.time()
+                else:
+                    rt = iteration_end + delay - time.time()
+                if not self.poll_interval.wait(rt):
+                    break
@@ -0,0 +1,279 @@
+"""
+В данном модуле написано хранилище состояния чатов Runner'а (ID последних сообщений, теги, ID собеседников и т.д.).
+Состояние каждого чата - одна запись со __slots__ (вместо записей в 5 разных словарях), хранилище ограничено по памяти:
+при превышении лимита удаляются чаты, которые дольше всех не менялись (LRU). Удаление холодного чата безопасно -
+ID сообщений на FunPay растут глобально, поэтому при новом сообщении в таком чате старые сообщения отсекаются
+по мин. ID последнего сообщения среди оставшихся чатов (см. Runner.generate_new_message_events).
+Горячие чаты можно сохранить в снапшот и восстановить при следующем запуске.
+"""
+
+from __future__ import annotations
+from typing import Any, Iterator
+
+from collections import OrderedDict
+from threading import RLock
+import json
+import sys
+import os
+
+
+class ChatState(object):
+    """
+    Состояние одного чата.
+    """
+    __slots__ = ("last_message_id", "node_msg_id", "user_msg_id", "last_text", "node_tag", "interlocutor_id",
+                 "by_bot_ids")
+
+    def __init__(self):
+        self.last_message_id: int | None = None
+        """ID последнего обработанного сообщения (для получения новых сообщений)."""
+        self.node_msg_id: int | None = None
+        """ID последнего сообщения чата из списка чатов."""
+        self.user_msg_id: int | None = None
+        """ID последнего прочитанного сообщения чата из списка чатов."""
+        self.last_text: str | None = None
+        """Текст последнего сообщения из списка чатов (None, если это изображение)."""
+        self.node_tag: str | None = None
+        """Тег чата."""
+        self.interlocutor_id: int | None = None
+        """ID собеседника."""
+        self.by_bot_ids: list[int] | None = None
+        """ID сообщений, отправленных с помощью Account.send_message."""
+
+    def size(self) -> int:
+        """
+        :return: примерный объем памяти, занимаемый записью (в байтах).
+        """
+        size = sys.getsizeof(self)
+        for i in (self.last_message_id, self.node_msg_id, self.user_msg_id, self.last_text, self.node_tag,
+                  self.interlocutor_id):
+            if i is not None:
+                size += sys.getsizeof(i)
+        if self.by_bot_ids is not None:
+            size += sys.getsizeof(self.by_bot_ids) + 32 * len(self.by_bot_ids)
+        return size
+
+
+class ChatStateStore(object):
+    """
+    Хранилище состояния чатов с ограничением по памяти.
+
+    :param max_bytes: макс. объем памяти, занимаемый записями (в байтах, 0 - без ограничения).
+    """
+    snapshot_fields = ("last_message_id", "node_tag", "interlocutor_id")
+    """Поля, сохраняемые в снапшот (ID последнего сообщения в списке чатов не сохраняется, чтобы после перезапуска
+    для всех чатов первой страницы генерировались InitialChatEvent)."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = RLock()
+        self.chats: OrderedDict[int, ChatState] = OrderedDict()
+        """Записи чатов (от давно не менявшихся к недавно изменившимся)."""
+        self.sizes: dict[int, int] = {}
+        self.bytes: int = 0
+        """Примерный объем памяти, занимаемый записями."""
+        self.evicted: int = 0
+        """Кол-во удаленных (холодных) чатов."""
+
+    def __len__(self) -> int:
+        return len(self.chats)
+
+    def get(self, chat_id: int) -> ChatState | None:
+        return self.chats.get(chat_id)
+
+    def update(self, chat_id: int, **fields):
+        """
+        Изменяет поля записи чата (создает запись, если ее нет) и помечает чат как недавно изменившийся.
+        """
+        with self.lock:
+            record = self.chats.get(chat_id)
+            if record is None:
+                record = self.chats[chat_id] = ChatState()
+            else:
+                self.chats.move_to_end(chat_id)
+            for key, value in fields.items():
+                setattr(record, key, value)
+            self.resize(chat_id, record)
+
+    def resize(self, chat_id: int, record: ChatState):
+        """
+        Пересчитывает размер записи и удаляет холодные чаты, если превышен лимит памяти.
+        """
+        with self.lock:
+            size = record.size()
+            self.bytes += size - self.sizes.get(chat_id, 0)
+            self.sizes[chat_id] = size
+            while self.max_bytes and self.bytes > self.max_bytes and len(self.chats) > 1:
+                old_id, _ = self.chats.popitem(last=False)
+                self.bytes -= self.sizes.pop(old_id, 0)
+                self.evicted += 1
+
+    def clear_field(self, chat_id: int, field: str):
+        with self.lock:
+            if (record := self.chats.get(chat_id)) is not None:
+                setattr(record, field, None)
+                self.resize(chat_id, record)
+
+    def set_max_bytes(self, max_bytes: int):
+        """
+        Изменяет лимит памяти (лишние записи удаляются при следующем изменении).
+        """
+        self.max_bytes = max_bytes
+
+    def stats(self) -> dict:
+        """
+        :return: кол-во чатов, занимаемая память, лимит памяти и кол-во удаленных чатов.
+        """
+        return {"chats": len(self.chats), "bytes": self.bytes, "max_bytes": self.max_bytes, "evicted": self.evicted}
+
+    def snapshot(self) -> dict[str, list]:
+        """
+        :return: снапшот горячих чатов в формате struct-of-arrays ({"chats": [ID], "поле": [значения]}).
+        """
+        with self.lock:
+            items = list(self.chats.items())
+        result = {"chats": [i[0] for i in items]}
+        for field in self.snapshot_fields:
+            result[field] = [getattr(i[1], field) for i in items]
+        return result
+
+    def restore(self, snapshot: dict[str, list]):
+        """
+        Восстанавливает чаты из снапшота (не перезаписывает уже известные чаты).
+        """
+        with self.lock:
+            # Чаты добавляются в начало очереди (как самые холодные), поэтому снапшот обходится от горячих к холодным.
+            for index, chat_id in reversed(list(enumerate(snapshot.get("chats", [])))):
+                if chat_id in self.chats:
+                    continue
+                fields = {i: snapshot[i][index] for i in self.snapshot_fields if i in snapshot}
+                self.chats[chat_id] = ChatState()
+                self.chats.move_to_end(chat_id, last=False)
+                for key, value in fields.items():
+                    setattr(self.chats[chat_id], key, value)
+                self.resize(chat_id, self.chats[chat_id])
+
+    def save(self, path: str):
+        """
+        Сохраняет снапшот в файл.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Восстанавливает чаты из файла снапшота.
+
+        :return: True, если снапшот загружен.
+        """
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            self.restore(json.load(f))
+        return True
+
+
+class ChatStateView(object):
+    """
+    Словарь {ID чата: значение поля} поверх хранилища (для совместимости с кодом, работающим со словарями Runner'а).
+
+    :param store: хранилище.
+    :param field: название поля ChatState.
+    """
+    def __init__(self, store: ChatStateStore, field: str):
+        self.store = store
+        self.field = field
+
+    def get(self, chat_id: int, default: Any = None) -> Any:
+        record = self.store.chats.get(chat_id)
+        if record is None:
+            return default
+        value = getattr(record, self.field)
+        return default if value is None else value
+
+    def __getitem__(self, chat_id: int) -> Any:
+        value = self.get(chat_id)
+        if value is None:
+            raise KeyError(chat_id)
+        return value
+
+    def __setitem__(self, chat_id: int, value: Any):
+        self.store.update(chat_id, **{self.field: value})
+
+    def __delitem__(self, chat_id: int):
+        if chat_id not in self:
+            raise KeyError(chat_id)
+        self.store.clear_field(chat_id, self.field)
+
+    def __contains__(self, chat_id: int) -> bool:
+        return self.get(chat_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def pop(self, chat_id: int, default: Any = None) -> Any:
+        value = self.get(chat_id)
+        if value is not None:
+            self.store.clear_field(chat_id, self.field)
+            return value
+        return default
+
+    def keys(self) -> list[int]:
+        return [k for k, v in list(self.store.chats.items()) if getattr(v, self.field) is not None]
+
+    def values(self) -> list[Any]:
+        return [i for i in (getattr(v, self.field) for v in list(self.store.chats.values())) if i is not None]
+
+    def items(self) -> list[tuple[int, Any]]:
+        return [(k, getattr(v, self.field)) for k, v in list(self.store.chats.items())
+                if getattr(v, self.field) is not None]
+
+
+class LastMessagesView(ChatStateView):
+    """
+    Словарь {ID чата: [ID последнего сообщения, ID последнего прочитанного сообщения, текст или None]}
+    (Runner.runner_last_messages).
+    """
+    def __init__(self, store: ChatStateStore):
+        super(LastMessagesView, self).__init__(store, "node_msg_id")
+
+    def get(self, chat_id: int, default: Any = None) -> Any:
+        record = self.store.chats.get(chat_id)
+        if record is None or record.node_msg_id is None:
+            return default
+        return [record.node_msg_id, record.user_msg_id, record.last_text]
+
+    def __setitem__(self, chat_id: int, value: list):
+        node_msg_id, user_msg_id, text = value
+        self.store.update(chat_id, node_msg_id=node_msg_id, user_msg_id=user_msg_id, last_text=text)
+
+    def values(self) -> list[Any]:
+        return [i[1] for i in self.items()]
+
+    def items(self) -> list[tuple[int, Any]]:
+        return [(k, [v.node_msg_id, v.user_msg_id, v.last_text]) for k, v in list(self.store.chats.items())
+                if v.node_msg_id is not None]
+
+
+class LRUDict(OrderedDict):
+    """
+    Словарь с ограничением кол-ва элементов: при переполнении удаляются давно не менявшиеся элементы.
+
+    :param max_size: макс. кол-во элементов.
+    """
+    def __init__(self, max_size: int = 1000):
+        super(LRUDict, self).__init__()
+        self.max_size = max_size
+
+    def __setitem__(self, key, value):
+        super(LRUDict, self).__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
@@ -0,0 +1,274 @@
+"""
+В данном модуле написан супервизор мульти-аккаунтного режима.
+Каждый доп. аккаунт описывается папкой accounts/<название>/ с конфигами _main.cfg, auto_response.cfg и
+auto_delivery.cfg (формат такой же, как у основного аккаунта), storage доп. аккаунта - accounts/<название>/storage.
+Все аккаунты работают в одном процессе: у них общие пул потоков, пул HTTP-соединений, ЧС и Telegram бот
+основного аккаунта (уведомления доп. аккаунтов помечаются названием аккаунта). Плагины и ПУ Telegram
+работают только с основным аккаунтом.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+    from tg_bot.bot import TGBot
+    from telebot.types import Message
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from types import ModuleType, FunctionType, BuiltinFunctionType
+from threading import Thread, Lock
+import logging
+import time
+import gc
+import os
+import sys
+
+from tg_bot import utils
+import Utils.config_loader as cfg_loader
+
+
+logger = logging.getLogger("FPC.accounts_supervisor")
+
+ACCOUNTS_DIR = "accounts"
+SESSIONS_CHECK_INTERVAL = 60
+"""Как часто проверять, не пора ли обновить данные доп. аккаунтов (в секундах)."""
+MAX_SIZE_OBJECTS = 1_000_000
+"""Макс. кол-во объектов, обходимых при оценке памяти одного аккаунта."""
+
+
+def has_accounts(accounts_dir: str = ACCOUNTS_DIR) -> bool:
+    """
+    Проверяет, есть ли доп. аккаунты.
+
+    :param accounts_dir: папка с доп. аккаунтами.
+    """
+    if not os.path.isdir(accounts_dir):
+        return False
+    return any(os.path.exists(os.path.join(accounts_dir, i, "_main.cfg")) for i in os.listdir(accounts_dir))
+
+
+def estimate_size(root: object, exclude: set[int]) -> int:
+    """
+    Оценивает объем памяти, занимаемый объектом и всеми объектами, на которые он ссылается.
+    Модули, классы, функции и объекты из exclude (общие для всех аккаунтов) не учитываются.
+
+    :param root: объект.
+    :param exclude: ID объектов, которые не нужно учитывать (и обходить).
+
+    :return: примерный объем памяти (в байтах).
+    """
+    seen = set(exclude)
+    stack = [root]
+    size = 0
+    while stack and len(seen) < MAX_SIZE_OBJECTS + len(exclude):
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (ModuleType, type, FunctionType, BuiltinFunctionType)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj, 0)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+class AccountTelegram(object):
+    """
+    Telegram бот основного аккаунта для доп. аккаунта: уведомления помечаются названием аккаунта,
+    клавиатуры (ответить, открыть чат и т.д.) не отправляются, т.к. кнопки ПУ работают с основным аккаунтом.
+
+    :param telegram: Telegram бот основного аккаунта.
+    :param name: название доп. аккаунта.
+    """
+    def __init__(self, telegram: TGBot, name: str):
+        self.telegram = telegram
+        self.name = name
+        self.init_messages = []
+        """Сообщения о запуске (у доп. аккаунтов не редактируются)."""
+
+    def __getattr__(self, item):
+        return getattr(self.telegram, item)
+
+    def tag(self, text: str | None) -> str:
+        """
+        Помечает текст уведомления названием аккаунта.
+        """
+        return f"👤 <b>{utils.escape(self.name)}</b>\n{text or ''}"
+
+    def send_notification(self, text: str | None, keyboard=None,
+                          notification_type: str = utils.NotificationTypes.other, photo: bytes | None = None):
+        self.telegram.send_notification(self.tag(text), None, notification_type, photo)
+
+    def send_grouped_notification(self, text: str, keyboard=None,
+                                  notification_type: str = utils.NotificationTypes.other,
+                                  group_key: str | None = None, group_title: str | None = None):
+        self.telegram.send_grouped_notification(self.tag(text), None, notification_type,
+                                                f"{self.name}:{group_key or text}",
+                                                f"[{self.name}] {group_title}" if group_title else None)
+
+
+class AccountsSupervisor(object):
+    """
+    Супервизор доп. аккаунтов.
+
+    :param main: экземпляр кардинала основного аккаунта.
+    :param workers: размер общего пула потоков.
+    :param pool_size: макс. кол-во HTTP-соединений к одному хосту в общем пуле.
+    """
+    def __init__(self, main: Cardinal, workers: int = 8, pool_size: int = 20):
+        self.main = main
+        main.supervisor = self
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="accounts")
+        """Общий пул потоков (обновление сессий)."""
+        self.adapter = HTTPAdapter(max_retries=main.account.session.get_adapter("https://").max_retries,
+                                   pool_connections=10, pool_maxsize=pool_size)
+        """Общий пул HTTP-соединений."""
+        self.__mount(main)
+        self.accounts: dict[str, Cardinal] = {}
+        """Доп. аккаунты ({название: экземпляр кардинала})."""
+        self.lock = Lock()
+        self.__last_stats: dict[str, tuple[float, int]] = {}
+        """Время и кол-во event'ов на момент прошлой статистики ({название: (время, кол-во)})."""
+        self.__next_session_update: dict[str, float] = {}
+
+        # Команда /accounts регистрируется после создания Telegram бота, но до установки меню команд.
+        def register_telegram_command(cardinal: Cardinal, *args):
+            self.__register_telegram_command(cardinal)
+        register_telegram_command.plugin_uuid = None
+        main.pre_init_handlers.append(register_telegram_command)
+
+    def __mount(self, cardinal: Cardinal):
+        cardinal.account.session.mount("https://", self.adapter)
+        cardinal.account.session.mount("http://", self.adapter)
+
+    def load(self, accounts_dir: str = ACCOUNTS_DIR) -> int:
+        """
+        Загружает конфиги доп. аккаунтов и создает их экземпляры кардинала.
+
+        :param accounts_dir: папка с доп. аккаунтами.
+
+        :return: кол-во загруженных аккаунтов.
+        """
+        from cardinal import Cardinal
+
+        for name in sorted(os.listdir(accounts_dir)):
+            folder = os.path.join(accounts_dir, name)
+            if not os.path.exists(os.path.join(folder, "_main.cfg")):
+                continue
+            try:
+                for path in ("auto_response.cfg", "auto_delivery.cfg"):
+                    if not os.path.exists(os.path.join(folder, path)):
+                        with open(os.path.join(folder, path), "w", encoding="utf-8"):
+                            ...
+                main_cfg = cfg_loader.load_main_config(os.path.join(folder, "_main.cfg"))
+                ar_cfg = cfg_loader.load_auto_response_config(os.path.join(folder, "auto_response.cfg"))
+                raw_ar_cfg = cfg_loader.load_raw_auto_response_config(os.path.join(folder, "auto_response.cfg"))
+                storage_dir = os.path.join(folder, "storage").replace("\\", "/")
+                for i in ("cache", "products", "images"):
+                    os.makedirs(f"{storage_dir}/{i}", exist_ok=True)
+                ad_cfg = cfg_loader.load_auto_delivery_config(os.path.join(folder, "auto_delivery.cfg"),
+                                                              f"{storage_dir}/products")
+                cardinal = Cardinal(main_cfg, ad_cfg, ar_cfg, raw_ar_cfg, self.main.VERSION,
+                                    name=name, storage_dir=storage_dir)
+            except:
+                logger.error(f"Не удалось загрузить доп. аккаунт $YELLOW{name}$RESET. Аккаунт пропущен.")
+                logger.debug("TRACEBACK", exc_info=True)
+                continue
+            cardinal.supervisor = self
+            cardinal.block_list = self.main.block_list
+            self.__mount(cardinal)
+            self.accounts[name] = cardinal
+        logger.info(f"$MAGENTAЗагружено доп. аккаунтов: $YELLOW{len(self.accounts)}$MAGENTA.")
+        return len(self.accounts)
+
+    def start(self):
+        """
+        Инициализирует доп. аккаунты и запускает их (вызывать после инициализации основного аккаунта).
+        Инициализация выполняется в отдельном потоке для каждого аккаунта, а не в общем пуле: она может долго
+        повторять запросы и не должна занимать потоки, обновляющие сессии.
+        """
+        for name, cardinal in self.accounts.items():
+            if self.main.telegram:
+                cardinal.telegram = AccountTelegram(self.main.telegram, name)
+            Thread(target=self.__start_account, args=(cardinal,), name=f"account-init-{name}", daemon=True).start()
+        Thread(target=self.__update_sessions_loop, daemon=True).start()
+
+    def __start_account(self, cardinal: Cardinal):
+        try:
+            cardinal.init()
+        except:
+            logger.error(f"Не удалось инициализировать доп. аккаунт $YELLOW{cardinal.name}$RESET.")
+            logger.debug("TRACEBACK", exc_info=True)
+            return
+        with self.lock:
+            self.__next_session_update[cardinal.name] = time.time() + 3600
+            self.__last_stats[cardinal.name] = (time.time(), 0)
+        # Цикл обработки event'ов блокирующий, поэтому у каждого аккаунта свой поток.
+        Thread(target=cardinal.run, name=f"account-{cardinal.name}", daemon=True).start()
+        logger.info(f"$MAGENTAДоп. аккаунт $YELLOW{cardinal.name}$MAGENTA ({cardinal.account.username}) запущен.")
+
+    def __update_sessions_loop(self):
+        """
+        Обновляет данные доп. аккаунтов в общем пуле потоков (вместо отдельного потока у каждого аккаунта).
+        """
+        while True:
+            time.sleep(SESSIONS_CHECK_INTERVAL)
+            now = time.time()
+            with self.lock:
+                due = [i for i, t in self.__next_session_update.items() if t <= now]
+                for name in due:
+                    self.__next_session_update[name] = float("inf")
+            for name in due:
+                self.executor.submit(self.__update_session, self.accounts[name])
+
+    def __update_session(self, cardinal: Cardinal):
+        result = cardinal.update_session()
+        with self.lock:
+            self.__next_session_update[cardinal.name] = time.time() + (3600 if result else 60)
+
+    def stats(self) -> list[dict]:
+        """
+        Собирает статистику по всем аккаунтам: кол-во event'ов, event'ов в минуту (с прошлого вызова)
+        и примерный объем памяти, занимаемый объектами аккаунта.
+
+        :return: статистика аккаунтов (основной аккаунт - первый).
+        """
+        cardinals = [self.main] + list(self.accounts.values())
+        shared = {id(self), id(self.adapter), id(self.executor), id(self.main.telegram), id(self.main.block_list)}
+        shared.update(id(i) for i in cardinals)
+        now = time.time()
+        result = []
+        for cardinal in cardinals:
+            name = cardinal.name or "main"
+            with self.lock:
+                last_time, last_count = self.__last_stats.get(name, (cardinal.start_time, 0))
+                self.__last_stats[name] = (now, cardinal.events_count)
+            exclude = shared - {id(cardinal)}
+            result.append({
+                "name": name,
+                "username": cardinal.account.username,
+                "events": cardinal.events_count,
+                "events_per_min": round((cardinal.events_count - last_count) / max(now - last_time, 1) * 60, 2),
+                "memory": estimate_size(cardinal, exclude)
+            })
+        return result
+
+    def __register_telegram_command(self, cardinal: Cardinal):
+        """
+        Регистрирует команду /accounts в Telegram боте основного аккаунта.
+        """
+        if not cardinal.telegram:
+            return
+        cardinal.telegram.msg_handler(self.send_stats, commands=["accounts"])
+        cardinal.telegram.add_command_to_menu("accounts", "статистика аккаунтов (мульти-аккаунтный режим)")
+
+    def send_stats(self, m: Message):
+        """
+        Отправляет статистику аккаунтов в Telegram (команда /accounts).
+        """
+        lines = []
+        for i in self.stats():
+            lines.append(f"👤 <b>{utils.escape(i['name'])}</b> (<code>{utils.escape(str(i['username']))}</code>)\n"
+                         f"    Event'ов: <code>{i['events']}</code> "
+                         f"(<code>{i['events_per_min']}</code>/мин.)\n"
+                         f"    Память: <code>~{i['memory'] / 1048576:.1f} MB</code>")
+        self.main.telegram.bot.send_message(m.chat.id, "\n\n".join(lines) or "Нет аккаунтов.")
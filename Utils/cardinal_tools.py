@@ -8,14 +8,30 @@ import FunPayAPI.types
 from datetime import datetime
 import Utils.exceptions
 import itertools
-import psutil
 import json
 import sys
 import os
 import re
 
 
-PHOTO_RE = re.compile(r'\$photo=[\d]+')
+PHOTO_RE = re.compile(r'\$photo=(?:\d+|[^\s$]+\.(?i:png|jpe?g|gif)\b)')
+
+
+def resolve_image_path(path: str, images_dir: str) -> str | None:
+    """
+    Проверяет, что путь из $photo=... указывает на файл внутри папки изображений аккаунта.
+    Текст сообщения может содержать данные покупателя ($message_text и т.д.), поэтому файлы вне папки не отправляются.
+
+    :param path: путь до изображения.
+    :param images_dir: папка изображений аккаунта (Cardinal.images_dir).
+
+    :return: абсолютный путь до изображения или None, если файл находится вне папки изображений.
+    """
+    images_dir = os.path.realpath(images_dir)
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([images_dir, real_path]) != images_dir:
+        return None
+    return real_path
 
 
 def count_products(products_file_path: str) -> int:
@@ -96,25 +112,30 @@ def load_disabled_plugins() -> list[str]:
             return []
 
 
-def cache_old_users(old_users: dict):
+def cache_old_users(old_users: dict, storage_dir: str = "storage"):
     """
     Сохраняет в кэш список пользователей, которые уже писали на аккаунт.
+
+    :param old_users: список никнеймов пользователей.
+    :param storage_dir: папка storage аккаунта.
     """
-    if not os.path.exists("storage/cache"):
-        os.makedirs("storage/cache")
-    with open(f"storage/cache/old_users.json", "w", encoding="utf-8") as f:
+    if not os.path.exists(f"{storage_dir}/cache"):
+        os.makedirs(f"{storage_dir}/cache")
+    with open(f"{storage_dir}/cache/old_users.json", "w", encoding="utf-8") as f:
         f.write(json.dumps(old_users, ensure_ascii=False))
 
 
-def load_old_users() -> list[str]:
+def load_old_users(storage_dir: str = "storage") -> list[str]:
     """
     Загружает из кэша список пользователей, которые уже писали на аккаунт.
 
+    :param storage_dir: папка storage аккаунта.
+
     :return: список никнеймов пользователей.
     """
-    if not os.path.exists(f"storage/cache/old_users.json"):
+    if not os.path.exists(f"{storage_dir}/cache/old_users.json"):
         return []
-    with open(f"storage/cache/old_users.json", "r", encoding="utf-8") as f:
+    with open(f"{storage_dir}/cache/old_users.json", "r", encoding="utf-8") as f:
         users = f.read()
     return json.loads(users)
 
@@ -138,7 +159,7 @@ def create_greetings(account: FunPayAPI.account.Account):
     lines = [
         f"* {greetings}, $CYAN{account.username}.",
         f"* Ваш ID: $YELLOW{account.id}.",
-        f"* Ваш текущий баланс: $YELLOW{account.balance}{currency}.",
+        f"* Ваш текущий баланс: $YELLOW{account.total_balance}{currency}.",
         f"* Текущие незавершенные сделки: $YELLOW{account.active_sales}.",
         f"* Удачной торговли!"
     ]
@@ -329,6 +350,7 @@ def restart_program():
     python = sys.executable
     os.execl(python, python, *sys.argv)
     try:
+        import psutil
         process = psutil.Process()
         for handler in process.open_files():
             os.close(handler.fd)
@@ -343,6 +365,7 @@ def shut_down():
     Полное отключение FPC.
     """
     try:
+        import psutil
         process = psutil.Process()
         process.terminate()
     except:
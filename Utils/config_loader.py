@@ -209,11 +209,12 @@ def load_raw_auto_response_config(config_path: str):
     return create_config_obj(config_path)
 
 
-def load_auto_delivery_config(config_path: str):
+def load_auto_delivery_config(config_path: str, products_dir: str = "storage/products"):
     """
     Парсит и проверяет на правильность конфиг автовыдачи.
 
     :param config_path: путь до конфига автовыдачи.
+    :param products_dir: папка с товарными файлами.
 
     :return: спарсеный конфиг товаров для автовыдачи.
     """
@@ -237,9 +238,9 @@ def load_auto_delivery_config(config_path: str):
             raise ConfigParseError(config_path, lot_title, e)
 
         # Проверяем, существует ли файл.
-        if not os.path.exists(f"storage/products/{products_file_name}"):
+        if not os.path.exists(f"{products_dir}/{products_file_name}"):
             raise ConfigParseError(config_path, lot_title,
-                                   ProductsFileNotFoundError(f"storage/products/{products_file_name}"))
+                                   ProductsFileNotFoundError(f"{products_dir}/{products_file_name}"))
 
         # Проверяем, есть ли хотя бы 1 переменная $product в тексте response.
         if "$product" not in lot_response:
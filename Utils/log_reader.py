@@ -0,0 +1,171 @@
+"""
+В данном модуле написаны функции для выгрузки лог-файла: сжатие в gzip и чтение хвоста лога
+(последние N строк / промежуток времени) без загрузки всего файла в память.
+"""
+
+from __future__ import annotations
+
+import shutil
+import gzip
+import os
+import re
+
+
+LINE_TIME_RE = re.compile(rb"^\[(\d{2}):(\d{2}):(\d{2})\]")
+"""Время в начале строки лога (см. :class:`Utils.logger.FileLoggerFormatter`)."""
+
+BLOCK_SIZE = 64 * 1024
+"""Размер блока при чтении файла."""
+
+
+def parse_time(text: str) -> int:
+    """
+    Парсит время формата ЧЧ:ММ или ЧЧ:ММ:СС.
+
+    :param text: строка со временем.
+
+    :return: кол-во секунд с начала суток.
+    """
+    parts = [int(i) for i in text.strip().split(":")]
+    if len(parts) == 2:
+        parts.append(0)
+    if len(parts) != 3 or not (0 <= parts[0] < 24 and 0 <= parts[1] < 60 and 0 <= parts[2] < 60):
+        raise ValueError(text)
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def get_line_time(line: bytes) -> int | None:
+    """
+    :param line: строка лога.
+
+    :return: время строки лога (в секундах с начала суток) или None, если строка не начинается со времени
+        (например, строка трейсбэка).
+    """
+    result = LINE_TIME_RE.match(line)
+    if not result:
+        return None
+    h, m, s = result.groups()
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def find_tail_offset(f, lines_amount: int) -> int:
+    """
+    Находит смещение, с которого начинаются последние N строк файла. Файл читается блоками с конца.
+
+    :param f: файл, открытый в режиме rb.
+    :param lines_amount: кол-во строк.
+
+    :return: смещение от начала файла.
+    """
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    if not position or lines_amount <= 0:
+        return position
+
+    # Последний перевод строки в конце файла не считаем.
+    f.seek(position - 1)
+    newlines = -1 if f.read(1) == b"\n" else 0
+    while position > 0:
+        read_size = min(BLOCK_SIZE, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size)
+        index = len(block)
+        while True:
+            index = block.rfind(b"\n", 0, index)
+            if index == -1:
+                break
+            newlines += 1
+            if newlines == lines_amount:
+                return position + index + 1
+    return 0
+
+
+def find_time_offset(f, seconds: int) -> int:
+    """
+    Бинарным поиском находит смещение первой строки лога, время которой >= переданного.
+
+    :param f: файл, открытый в режиме rb.
+    :param seconds: время (в секундах с начала суток).
+
+    :return: смещение от начала файла.
+    """
+    f.seek(0, os.SEEK_END)
+    low, high = 0, f.tell()
+    while low < high:
+        middle = (low + high) // 2
+        f.seek(middle)
+        if middle:
+            f.readline()  # Пропускаем неполную строку.
+        line_time = None
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if (line_time := get_line_time(line)) is not None:
+                break
+        if line_time is None or line_time >= seconds:
+            high = middle
+        else:
+            low = middle + 1
+
+    f.seek(low)
+    if low:
+        f.readline()
+    return f.tell()
+
+
+def compress_log(path: str, dest: str, start: int = 0, end_time: int | None = None) -> int:
+    """
+    Сжимает лог-файл (или его часть) в gzip. Файл читается построчно / блоками.
+
+    :param path: путь до лог-файла.
+    :param dest: путь до сжатого файла.
+    :param start: смещение, с которого нужно начать.
+    :param end_time: время (в секундах с начала суток), после которого нужно остановиться.
+        Если None - сжимается весь файл до конца.
+
+    :return: размер сжатого файла.
+    """
+    with open(path, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        f_in.seek(start)
+        if end_time is None:
+            shutil.copyfileobj(f_in, f_out, BLOCK_SIZE)
+        else:
+            for line in f_in:
+                line_time = get_line_time(line)
+                if line_time is not None and line_time > end_time:
+                    break
+                f_out.write(line)
+    return os.path.getsize(dest)
+
+
+def export_tail(path: str, dest: str, lines_amount: int) -> int:
+    """
+    Сжимает в gzip последние N строк лог-файла.
+
+    :param path: путь до лог-файла.
+    :param dest: путь до сжатого файла.
+    :param lines_amount: кол-во строк.
+
+    :return: размер сжатого файла.
+    """
+    with open(path, "rb") as f:
+        offset = find_tail_offset(f, lines_amount)
+    return compress_log(path, dest, offset)
+
+
+def export_time_range(path: str, dest: str, start_time: int, end_time: int | None = None) -> int:
+    """
+    Сжимает в gzip строки лог-файла за промежуток времени.
+
+    :param path: путь до лог-файла.
+    :param dest: путь до сжатого файла.
+    :param start_time: начало промежутка (в секундах с начала суток).
+    :param end_time: конец промежутка (в секундах с начала суток). Если None - до конца файла.
+
+    :return: размер сжатого файла.
+    """
+    with open(path, "rb") as f:
+        offset = find_time_offset(f, start_time)
+    return compress_log(path, dest, offset, end_time)
@@ -1,10 +1,22 @@
 """
-В данном модуле написаны форматтеры для логгера.
+В данном модуле написаны форматтеры и хэндлеры для логгера.
+Записи логов передаются через очередь в отдельный поток (QueueListener), поэтому форматирование и запись в файл
+не замедляют потоки, которые пишут логи.
 """
 
+from __future__ import annotations
+
 from colorama import Fore, Back, Style
+from threading import Thread, Lock
 import logging.handlers
 import logging
+import atexit
+import shutil
+import queue
+import time
+import gzip
+import json
+import os
 import re
 
 
@@ -54,17 +66,19 @@ class CLILoggerFormatter(logging.Formatter):
     max_level_name_length = 10
 
     def __init__(self):
-        super(CLILoggerFormatter, self).__init__()
+        super(CLILoggerFormatter, self).__init__(self.log_format, self.time_format)
+        # Форматы для каждого уровня строятся один раз, а не при каждой записи.
+        self.formats = {level: logging.PercentStyle(
+            self.log_format.replace("$RESET", color)
+            .replace("$spaces", " " * (self.max_level_name_length - len(logging.getLevelName(level)))))
+            for level, color in self.colors.items()}
 
-    def format(self, record: logging.LogRecord) -> str:
-        msg = record.getMessage()
-        msg = add_colors(msg)
-        msg = msg.replace("$RESET", self.colors[record.levelno])
-        record.msg = msg
-        log_format = self.log_format.replace("$RESET", self.colors[record.levelno])\
-            .replace("$spaces", " " * (self.max_level_name_length - len(record.levelname)))
-        formatter = logging.Formatter(log_format, self.time_format)
-        return formatter.format(record)
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        color = self.colors.get(record.levelno, "")
+        record.message = add_colors(record.message).replace("$RESET", color)
+        style = self.formats.get(record.levelno) or logging.PercentStyle(
+            self.log_format.replace("$RESET", color).replace("$spaces", " "))
+        return style.format(record)
 
 
 class FileLoggerFormatter(logging.Formatter):
@@ -73,25 +87,292 @@ class FileLoggerFormatter(logging.Formatter):
     """
     log_format = "[%(asctime)s][%(filename)s][%(lineno)d]> %(levelname).1s: %(message)s"
     max_level_name_length = 12
-    clear_expression = re.compile(r"(\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~]))|(\n)|(\r)")
+    clear_expression = re.compile(r"(\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~]))|(\$(?:YELLOW|CYAN|MAGENTA|BLUE|RESET))|(\r)")
     time_format = "%H:%M:%S"
 
     def __init__(self):
-        super(FileLoggerFormatter, self).__init__()
+        super(FileLoggerFormatter, self).__init__(self.log_format, self.time_format)
+
+    @classmethod
+    def clear(cls, msg: str) -> str:
+        """
+        Удаляет из текста коды цветов и переносы строк.
+        """
+        if "$" in msg or "\x1b" in msg or "\r" in msg:
+            msg = cls.clear_expression.sub("", msg)
+        return msg.replace("\n", " ") if "\n" in msg else msg
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = self.clear(record.message)
+        return super(FileLoggerFormatter, self).formatMessage(record)
 
+
+class JSONLinesFormatter(logging.Formatter):
+    """
+    Форматтер для структурированного лога (1 запись = 1 JSON объект в строке).
+    """
     def format(self, record: logging.LogRecord) -> str:
-        msg = record.getMessage()
-        msg = self.clear_expression.sub("", msg)
-        record.msg = msg
-        formatter = logging.Formatter(self.log_format, self.time_format)
-        return formatter.format(record)
+        data = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": FileLoggerFormatter.clear(record.getMessage())
+        }
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class GzipTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    TimedRotatingFileHandler, который сжимает старые лог-файлы в gzip в отдельном потоке,
+    чтобы ротация не блокировала запись логов.
+    """
+    def __init__(self, *args, **kwargs):
+        super(GzipTimedRotatingFileHandler, self).__init__(*args, **kwargs)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self.rotate_and_compress
+
+    @staticmethod
+    def compress(source: str, dest: str):
+        """
+        Сжимает файл source в dest и удаляет source. Файл читается по частям, поэтому память не зависит от размера лога.
+
+        :param source: путь до исходного файла.
+        :param dest: путь до сжатого файла.
+        """
+        try:
+            with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+            os.remove(source)
+        except:
+            if os.path.exists(dest):
+                os.remove(dest)
+
+    def rotate_and_compress(self, source: str, dest: str):
+        """
+        Переименовывает текущий лог-файл (быстро, под блокировкой хэндлера) и сжимает его в отдельном потоке.
+        """
+        if not os.path.exists(source):
+            return
+        tmp = dest[:-3] if dest.endswith(".gz") else f"{dest}.tmp"
+        os.rename(source, tmp)
+        Thread(target=self.compress, args=(tmp, dest), daemon=True).start()
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в потоке, где она создана:
+    форматтеры хэндлеров применяются в потоке QueueListener'а.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Текст сообщения вычисляется сразу, т.к. аргументы могут измениться до обработки записи.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class RepeatedLogFilter(logging.Filter):
+    """
+    Фильтр повторяющихся записей (например, одинаковых ошибок и трейсбеков, пока FunPay недоступен).
+    У каждой записи есть отпечаток (логгер, шаблон сообщения, тип исключения, файл и строка). За окно пропускаются
+    первые burst записей с одинаковым отпечатком, остальные только считаются, а после окончания окна
+    выводится сводка "повторилось еще X раз".
+
+    :param handler: хэндлер, к которому привязан фильтр (через него выводятся сводки).
+    :param window: длина окна (в секундах).
+    :param burst: сколько записей с одинаковым отпечатком пропускать за окно.
+    :param level: мин. уровень фильтруемых записей (записи с трейсбеком фильтруются при любом уровне).
+    """
+    max_fingerprints = 10000
+    """Макс. кол-во отслеживаемых отпечатков (при превышении выводятся сводки по всем отпечаткам)."""
+
+    def __init__(self, handler: logging.Handler, window: float = 60, burst: int = 5, level: int = logging.WARNING):
+        super(RepeatedLogFilter, self).__init__()
+        self.handler = handler
+        self.window = window
+        self.burst = burst
+        self.level = level
+        self.lock = Lock()
+        self.__records: dict[tuple, list] = {}
+        """Окна отпечатков ({отпечаток: [начало окна, кол-во записей, последняя запись]})."""
+        self.__next_flush: float = 0
+
+    @staticmethod
+    def fingerprint(record: logging.LogRecord) -> tuple:
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        return record.name, str(record.msg), exc_type, record.pathname, record.lineno
+
+    def summary(self, amount: int, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Создает запись-сводку о пропущенных записях.
+        """
+        text = FileLoggerFormatter.clear(record.getMessage())
+        if len(text) > 200:
+            text = text[:200] + "..."
+        if record.exc_info and record.exc_info[0]:
+            text += f" ({record.exc_info[0].__name__})"
+        result = logging.LogRecord(record.name, record.levelno, record.pathname, record.lineno,
+                                   f"Запись \"{text}\" повторилась еще {amount} раз(-а) за {self.window:g} сек.",
+                                   None, None, record.funcName)
+        result.repeated_summary = True
+        return result
+
+    def flush(self, now: float | None = None, force: bool = False):
+        """
+        Закрывает окна, которые закончились, и выводит по ним сводки.
+
+        :param now: текущее время.
+        :param force: закрыть все окна.
+        """
+        now = time.time() if now is None else now
+        summaries = []
+        with self.lock:
+            self.__next_flush = now + min(self.window, 10)
+            force = force or len(self.__records) > self.max_fingerprints
+            for key in [k for k, v in self.__records.items() if force or now - v[0] >= self.window]:
+                start, amount, record = self.__records.pop(key)
+                if amount > self.burst:
+                    summaries.append(self.summary(amount - self.burst, record))
+        for record in summaries:
+            self.handler.handle(record)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "repeated_summary", False):
+            return True
+        now = record.created
+        if now >= self.__next_flush:
+            self.flush(now)
+        if record.levelno < self.level and not record.exc_info:
+            return True
+
+        key = self.fingerprint(record)
+        summary = None
+        with self.lock:
+            state = self.__records.get(key)
+            if state is None or now - state[0] >= self.window:
+                if state is not None and state[1] > self.burst:
+                    summary = self.summary(state[1] - self.burst, state[2])
+                self.__records[key] = [now, 1, record]
+                result = True
+            else:
+                state[1] += 1
+                state[2] = record
+                result = state[1] <= self.burst
+        if summary:
+            self.handler.handle(summary)
+        return result
+
+
+LISTENERS: list[logging.handlers.QueueListener] = []
+"""Запущенные потоки записи логов."""
+FILTERS: list[RepeatedLogFilter] = []
+"""Фильтры повторяющихся записей."""
+
+
+def start_queue_logging(logger_names=None):
+    """
+    Переносит хэндлеры логгеров (после logging.config.dictConfig) в потоки QueueListener'ов.
+    Логгеры с одинаковым набором хэндлеров используют общую очередь.
+
+    :param logger_names: названия логгеров (по умолчанию - логгеры из LOGGER_CONFIG).
+    """
+    groups = {}
+    for name in logger_names or LOGGER_CONFIG["loggers"]:
+        log = logging.getLogger(name)
+        if log.handlers and not any(isinstance(i, LogQueueHandler) for i in log.handlers):
+            groups.setdefault(tuple(log.handlers), []).append(log)
+
+    for handlers, loggers in groups.items():
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        LISTENERS.append(listener)
+        queue_handler = LogQueueHandler(log_queue)
+        for log in loggers:
+            log.handlers = [queue_handler]
+    if len(LISTENERS) == len(groups):
+        atexit.register(stop_queue_logging)
+
+
+def stop_queue_logging():
+    """
+    Дописывает оставшиеся в очередях записи и останавливает потоки записи логов.
+    """
+    for i in FILTERS:
+        i.flush(force=True)
+    while LISTENERS:
+        LISTENERS.pop().stop()
+
+
+def add_json_sink(path: str = "logs/log.jsonl", level: int = logging.DEBUG) -> logging.Handler:
+    """
+    Добавляет структурированный лог (JSON lines) ко всем логгерам из LOGGER_CONFIG.
+
+    :param path: путь до файла.
+    :param level: мин. уровень записей.
+
+    :return: хэндлер структурированного лога.
+    """
+    handler = GzipTimedRotatingFileHandler(path, when="midnight", encoding="utf-8")
+    handler.setLevel(level)
+    handler.setFormatter(JSONLinesFormatter())
+    if LISTENERS:
+        for listener in LISTENERS:
+            listener.handlers = listener.handlers + (handler,)
+    else:
+        for name in LOGGER_CONFIG["loggers"]:
+            logging.getLogger(name).addHandler(handler)
+    return handler
+
+
+def active_log_files() -> set[str]:
+    """
+    :return: абсолютные пути до файлов, в которые сейчас пишут хэндлеры логгеров (в т.ч. хэндлеры QueueListener'ов).
+    """
+    handlers = [h for listener in LISTENERS for h in listener.handlers]
+    for log in [logging.getLogger()] + [logging.getLogger(name) for name in logging.root.manager.loggerDict]:
+        handlers.extend(getattr(log, "handlers", []))
+    return {os.path.abspath(h.baseFilename) for h in handlers if isinstance(h, logging.FileHandler)}
+
+
+def add_repeated_log_filter(window: float = 60, burst: int = 5, level: int = logging.WARNING) \
+        -> list[RepeatedLogFilter]:
+    """
+    Добавляет фильтр повторяющихся записей к хэндлерам логгеров из LOGGER_CONFIG.
+    Записи фильтруются до постановки в очередь, поэтому пропущенные записи не форматируются.
+
+    :param window: длина окна (в секундах).
+    :param burst: сколько записей с одинаковым отпечатком пропускать за окно.
+    :param level: мин. уровень фильтруемых записей.
+
+    :return: добавленные фильтры.
+    """
+    handlers = []
+    for name in LOGGER_CONFIG["loggers"]:
+        for handler in logging.getLogger(name).handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+    result = []
+    for handler in handlers:
+        repeated_filter = RepeatedLogFilter(handler, window, burst, level)
+        handler.addFilter(repeated_filter)
+        result.append(repeated_filter)
+    FILTERS.extend(result)
+    return result
 
 
 LOGGER_CONFIG = {
     "version": 1,
     "handlers": {
         "file_handler": {
-            "class": "logging.handlers.TimedRotatingFileHandler",
+            "class": "Utils.logger.GzipTimedRotatingFileHandler",
             "level": "DEBUG",
             "formatter": "file_formatter",
             "filename": "logs/log.log",
@@ -0,0 +1,203 @@
+"""
+В данном модуле написан механизм автовосстановления / автодеактивации лотов.
+Сначала по конфигу автовыдачи и заранее посчитанным остаткам товаров вычисляется, какие лоты нужно восстановить,
+а какие деактивировать, затем только для этих лотов выполняются запросы get_lot_fields / save_offer
+в несколько потоков (с общим ограничением частоты запросов).
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+    from FunPayAPI import Account
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import configparser
+import logging
+import time
+
+from FunPayAPI import types, exceptions
+from FunPayAPI.common.enums import SubCategoryTypes
+from Utils.products_index import ProductsIndex
+
+
+logger = logging.getLogger("FPC.lots_states")
+
+REQUESTS_INTERVAL = 0.25
+"""Мин. интервал между запросами всех потоков (в секундах)."""
+ERROR_429_PAUSE = 10
+"""Пауза после ошибки 429 любого запроса аккаунта (в секундах)."""
+
+
+class RequestsLimiter(object):
+    """
+    Общее для нескольких потоков ограничение частоты запросов.
+
+    :param account: экземпляр аккаунта (учитывается время последней ошибки 429).
+    :param interval: мин. интервал между запросами (в секундах).
+    """
+    def __init__(self, account: Account, interval: float = REQUESTS_INTERVAL):
+        self.account = account
+        self.interval = interval
+        self.lock = Lock()
+        self.__next_time: float = 0
+
+    def wait(self):
+        """
+        Ждет, пока не освободится слот для запроса.
+        """
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.__next_time, self.account.last_429_err_time + ERROR_429_PAUSE)
+            self.__next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def get_lot_config_by_name(config: configparser.ConfigParser, name: str) -> configparser.SectionProxy | None:
+    """
+    Ищет секцию лота в конфиге автовыдачи.
+
+    :param config: конфиг автовыдачи.
+    :param name: название лота.
+
+    :return: секцию конфига или None.
+    """
+    for i in config.sections():
+        if i in name:
+            return config[i]
+    return None
+
+
+def plan_lots_states(cardinal: Cardinal, active_ids: set[int | str]) -> tuple[list[types.LotShortcut],
+                                                                             list[types.LotShortcut]]:
+    """
+    Вычисляет, какие лоты нужно восстановить, а какие деактивировать. Запросов не выполняет.
+
+    :param cardinal: экземпляр кардинала.
+    :param active_ids: ID активных в данный момент лотов.
+
+    :return: лоты, которые нужно восстановить, и лоты, которые нужно деактивировать.
+    """
+    auto_restore = cardinal.MAIN_CFG["FunPay"].getboolean("autoRestore")
+    auto_disable = cardinal.MAIN_CFG["FunPay"].getboolean("autoDisable")
+    products_index = ProductsIndex(cardinal.products_dir)
+    stock = {}  # Остатки товаров {название файла: кол-во товаров} (каждый файл считается 1 раз).
+
+    def has_products(config_obj: configparser.SectionProxy) -> bool:
+        file_name = config_obj.get("productsFileName")
+        if not file_name:
+            return True
+        if file_name not in stock:
+            stock[file_name] = products_index.count(file_name)
+        return bool(stock[file_name])
+
+    to_restore, to_deactivate = [], []
+    for lot in cardinal.profile.get_lots():
+        if lot.subcategory.type is SubCategoryTypes.CURRENCY:
+            continue
+        config_obj = get_lot_config_by_name(cardinal.AD_CFG, lot.description)
+        if lot.id not in active_ids:
+            # Лот деактивирован: восстанавливаем, если включено автовосстановление, оно не выключено в конфиге
+            # автовыдачи и (при включенной автодеактивации) есть товары.
+            if not auto_restore:
+                continue
+            if config_obj is None or (config_obj.get("disableAutoRestore") in ["0", None] and
+                                      (not auto_disable or has_products(config_obj))):
+                to_restore.append(lot)
+        elif config_obj is not None and auto_disable and config_obj.get("disableAutoDisable") in ["0", None] \
+                and not has_products(config_obj):
+            # Лот активен, но товары закончились.
+            to_deactivate.append(lot)
+    return to_restore, to_deactivate
+
+
+def set_lot_state(account: Account, limiter: RequestsLimiter, lot: types.LotShortcut, active: bool,
+                  attempts: int = 3) -> bool:
+    """
+    Активирует / деактивирует лот.
+
+    :param account: экземпляр аккаунта.
+    :param limiter: ограничение частоты запросов.
+    :param lot: лот.
+    :param active: True - активировать лот, False - деактивировать.
+    :param attempts: кол-во попыток.
+
+    :return: результат выполнения.
+    """
+    while attempts:
+        try:
+            limiter.wait()
+            lot_fields = account.get_lot_fields(lot.id)
+            if lot_fields.active != active:
+                lot_fields.active = active
+                limiter.wait()
+                account.save_offer(lot_fields)
+            logger.info(f"{'Восстановил' if active else 'Деактивировал'} лот $YELLOW{lot.description}$RESET.")
+            return True
+        except Exception as e:
+            if isinstance(e, exceptions.RequestFailedError) and e.status_code == 404:
+                logger.error(f"Произошла ошибка при изменении состояния лота $YELLOW{lot.description}$RESET: "
+                             "лот не найден.")
+                return False
+            logger.error(f"Произошла ошибка при изменении состояния лота $YELLOW{lot.description}$RESET.")
+            logger.debug("TRACEBACK", exc_info=True)
+            attempts -= 1
+            time.sleep(2)
+    logger.error(f"Не удалось изменить состояние лота $YELLOW{lot.description}$RESET: превышено кол-во попыток.")
+    return False
+
+
+def apply_lots_states(account: Account, to_restore: list[types.LotShortcut], to_deactivate: list[types.LotShortcut],
+                      workers: int = 4, dry_run: bool = False,
+                      progress: Callable[[int, int], None] | None = None) -> tuple[list[types.LotShortcut],
+                                                                                  list[types.LotShortcut]]:
+    """
+    Восстанавливает / деактивирует лоты в несколько потоков.
+
+    :param account: экземпляр аккаунта.
+    :param to_restore: лоты, которые нужно восстановить.
+    :param to_deactivate: лоты, которые нужно деактивировать.
+    :param workers: макс. кол-во одновременных запросов.
+    :param dry_run: только вывести в лог, какие лоты были бы изменены (без запросов).
+    :param progress: функция, вызываемая после обработки каждого лота (обработано, всего).
+
+    :return: восстановленные и деактивированные лоты.
+    """
+    tasks = [(lot, True) for lot in to_restore] + [(lot, False) for lot in to_deactivate]
+    if not tasks:
+        return [], []
+    if dry_run:
+        for lot, active in tasks:
+            logger.info(f"[DRY RUN] {'Восстановил' if active else 'Деактивировал'} бы лот "
+                        f"$YELLOW{lot.description}$RESET.")
+        return [], []
+
+    logger.info(f"Изменяю состояние лотов: $YELLOW{len(to_restore)}$RESET восстановить, "
+                f"$YELLOW{len(to_deactivate)}$RESET деактивировать.")
+    limiter = RequestsLimiter(account)
+    lock = Lock()
+    done = [0]
+    step = max(1, len(tasks) // 10)  # Прогресс выводится в лог примерно каждые 10%.
+    restored, deactivated = [], []
+
+    def process(lot: types.LotShortcut, active: bool):
+        result = set_lot_state(account, limiter, lot, active)
+        with lock:
+            if result:
+                (restored if active else deactivated).append(lot)
+            done[0] += 1
+            current = done[0]
+        if current % step == 0 or current == len(tasks):
+            logger.info(f"Обработано лотов: $YELLOW{current}/{len(tasks)}$RESET.")
+        if progress:
+            progress(current, len(tasks))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="lots_states") as executor:
+        for lot, active in tasks:
+            executor.submit(process, lot, active)
+    logger.info(f"Состояние лотов изменено: восстановлено $YELLOW{len(restored)}$RESET, "
+                f"деактивировано $YELLOW{len(deactivated)}$RESET, ошибок "
+                f"$YELLOW{len(tasks) - len(restored) - len(deactivated)}$RESET.")
+    return restored, deactivated
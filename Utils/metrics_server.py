@@ -0,0 +1,124 @@
+"""
+В данном модуле написаны метрики кардинала и встроенный HTTP-сервер, отдающий их по адресу /metrics
+в текстовом формате Prometheus. Сервер слушает только локальный адрес (по умолчанию 127.0.0.1).
+Метрики FunPayAPI (запросы к runner/, ошибки 429) описаны в FunPayAPI.common.metrics.
+По адресу /traces?n=10 сервер отдает N самых медленных трейсов событий (JSON, см. FunPayAPI.common.tracing).
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from threading import Thread
+import threading
+import logging
+import json
+
+from FunPayAPI.common.metrics import REGISTRY, Counter, Gauge, Histogram
+from FunPayAPI.common.tracing import TRACER
+from Utils.products_index import ProductsIndex
+
+
+logger = logging.getLogger("FPC.metrics_server")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+EVENTS = Counter("fpc_events_total", "Кол-во обработанных event'ов.", ("account", "type"))
+HANDLER_SECONDS = Histogram("fpc_handler_seconds", "Время выполнения хэндлеров.", ("handler",))
+MESSAGES_SENT = Counter("fpc_messages_sent_total", "Кол-во отправленных сообщений.", ("account", "result"))
+DELIVERY_SECONDS = Histogram("fpc_delivery_seconds", "Время от нового заказа до отправки товара.", ("account",),
+                             buckets=(1, 2.5, 5, 10, 15, 30, 60, 120, 300))
+PRODUCTS_STOCK = Gauge("fpc_products_stock", "Кол-во товаров в товарном файле.", ("account", "file"))
+THREADS = Gauge("fpc_threads", "Кол-во потоков процесса.")
+MEMORY = Gauge("fpc_memory_rss_bytes", "Объем памяти, занимаемый процессом (RSS).")
+
+
+def account_label(cardinal: Cardinal) -> str:
+    """
+    :return: значение метки account для экземпляра кардинала.
+    """
+    return cardinal.name or "main"
+
+
+class MetricsServer(object):
+    """
+    HTTP-сервер, отдающий метрики.
+
+    :param cardinal: экземпляр кардинала основного аккаунта.
+    :param host: адрес, на котором слушает сервер.
+    :param port: порт, на котором слушает сервер.
+    """
+    def __init__(self, cardinal: Cardinal, host: str = "127.0.0.1", port: int = 9100):
+        self.cardinal = cardinal
+        self.host = host
+        self.port = port
+        self.server: ThreadingHTTPServer | None = None
+        import psutil
+        self.process = psutil.Process()
+        REGISTRY.add_collector(self.collect)
+
+    def collect(self):
+        """
+        Обновляет gauge'и, значения которых не отслеживаются в момент изменения (остатки, потоки, память).
+        """
+        THREADS.set(threading.active_count())
+        MEMORY.set(self.process.memory_info().rss)
+        cardinals = [self.cardinal]
+        if self.cardinal.supervisor:
+            cardinals.extend(self.cardinal.supervisor.accounts.values())
+        PRODUCTS_STOCK.clear()
+        for cardinal in cardinals:
+            products_index = ProductsIndex(cardinal.products_dir)
+            for file_name in products_index.files():
+                PRODUCTS_STOCK.set(products_index.count(file_name), account_label(cardinal), file_name)
+
+    def create_handler(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == "/metrics":
+                    body, content_type = REGISTRY.render().encode("utf-8"), CONTENT_TYPE
+                elif url.path == "/traces":
+                    try:
+                        amount = int(parse_qs(url.query).get("n", ["10"])[0])
+                    except ValueError:
+                        amount = 10
+                    body = json.dumps(TRACER.slowest(amount), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics: {format % args}")
+
+        return Handler
+
+    def start(self):
+        """
+        Создает HTTP-сервер и запускает его в отдельном потоке (возбуждает исключение, если порт занят).
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), self.create_handler())
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"$CYANМетрики доступны по адресу $YELLOWhttp://{self.host}:{self.port}/metrics$CYAN "
+                    f"(медленные трейсы - $YELLOW/traces$CYAN).")
+
+    def stop(self):
+        """
+        Останавливает сервер.
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
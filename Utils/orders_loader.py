@@ -0,0 +1,122 @@
+"""
+В данном модуле написан загрузчик полной информации о заказах.
+Запросы заказов, пришедшие почти одновременно (из разных потоков), объединяются в один запрос
+Account.get_orders_by_ids (до 10 заказов), а полученные заказы кэшируются на короткое время.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from FunPayAPI import Account
+
+from concurrent.futures import Future
+from threading import Lock, Timer, Thread
+import logging
+import time
+
+from FunPayAPI import types
+
+
+logger = logging.getLogger("FPC.orders_loader")
+
+BATCH_SIZE = 10
+"""Макс. кол-во заказов в одном запросе api/orders/get."""
+
+
+class OrdersLoader(object):
+    """
+    Загрузчик полной информации о заказах с объединением запросов и кэшем.
+
+    :param account: экземпляр аккаунта.
+    :param window: сколько секунд ждать другие запросы перед отправкой пачки.
+    :param ttl: время жизни заказа в кэше (в секундах).
+    """
+    def __init__(self, account: Account, window: float = 0.2, ttl: float = 60):
+        self.account = account
+        self.window = window
+        self.ttl = ttl
+        self.lock = Lock()
+        self.__pending: dict[str, Future] = {}
+        """Заказы, ожидающие отправки запроса ({ID заказа: future})."""
+        self.__timer: Timer | None = None
+        self.__cache: dict[str, tuple[float, types.Order]] = {}
+        """Кэш заказов ({ID заказа: (время получения, заказ)})."""
+
+    def get_order(self, order_id: str, status: types.OrderStatuses | None = None,
+                  timeout: float = 60) -> types.Order:
+        """
+        Получает полную информацию о заказе (из кэша или в составе ближайшей пачки запросов).
+
+        :param order_id: ID заказа (без '#').
+        :param status: известный статус заказа. Если статус заказа в кэше отличается, заказ запрашивается заново.
+        :param timeout: макс. время ожидания ответа (в секундах).
+
+        :return: объект заказа.
+        """
+        with self.lock:
+            cached = self.__cache.get(order_id)
+            if cached and time.time() - cached[0] < self.ttl and (status is None or cached[1].status is status):
+                return cached[1]
+            future = self.__pending.get(order_id)
+            if future is None:
+                future = Future()
+                self.__pending[order_id] = future
+                if len(self.__pending) >= BATCH_SIZE:
+                    batch = self.__take_pending()
+                    Thread(target=self.__load, args=(batch,), daemon=True).start()
+                elif self.__timer is None:
+                    self.__timer = Timer(self.window, self.__flush)
+                    self.__timer.daemon = True
+                    self.__timer.start()
+        return future.result(timeout)
+
+    def invalidate(self, order_id: str):
+        """
+        Удаляет заказ из кэша (например, если изменился отзыв).
+
+        :param order_id: ID заказа (без '#').
+        """
+        with self.lock:
+            self.__cache.pop(order_id, None)
+
+    def __take_pending(self) -> dict[str, Future]:
+        """
+        Забирает ожидающие заказы (вызывать под self.lock).
+        """
+        batch, self.__pending = self.__pending, {}
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        return batch
+
+    def __flush(self):
+        with self.lock:
+            batch = self.__take_pending()
+        self.__load(batch)
+
+    def __load(self, batch: dict[str, Future]):
+        """
+        Запрашивает заказы пачками по BATCH_SIZE и передает результаты ожидающим потокам.
+        """
+        ids = list(batch)
+        for index in range(0, len(ids), BATCH_SIZE):
+            chunk = ids[index:index + BATCH_SIZE]
+            try:
+                orders = self.account.get_orders_by_ids(*chunk)
+            except Exception as e:
+                logger.debug("TRACEBACK", exc_info=True)
+                for order_id in chunk:
+                    batch[order_id].set_exception(e)
+                continue
+            logger.debug(f"Получена информация о заказах ({len(chunk)} за 1 запрос): {', '.join(chunk)}.")
+            now = time.time()
+            with self.lock:
+                for order_id, order in orders.items():
+                    self.__cache[order_id] = (now, order)
+                for order_id in [i for i, (t, _) in self.__cache.items() if now - t >= self.ttl]:
+                    del self.__cache[order_id]
+            for order_id in chunk:
+                if order_id in orders:
+                    batch[order_id].set_result(orders[order_id])
+                else:
+                    batch[order_id].set_exception(Exception(f"Заказ #{order_id} не найден."))
@@ -0,0 +1,213 @@
+"""
+В данном модуле написан индекс папки с товарными файлами (storage/products).
+Индекс хранит отсортированный список файлов, стабильные числовые ID файлов (используются в callback-данных
+Telegram кнопок) и кол-во товаров в каждом файле, чтобы ПУ не сканировал папку и не читал файлы при каждом нажатии.
+"""
+
+from __future__ import annotations
+
+from threading import RLock
+import logging
+import json
+import os
+
+from Utils import cardinal_tools
+
+
+logger = logging.getLogger("FPC.products_index")
+
+PRODUCTS_DIR = "storage/products"
+IDS_CACHE_PATH = "storage/cache/products_ids.json"
+
+
+class ProductsIndex(object):
+    """
+    Индекс папки с товарными файлами.
+    Список файлов перечитывается только при изменении mtime папки, кол-во товаров в файле пересчитывается
+    после вызова :meth:`invalidate` (его вызывают все места, изменяющие товарные файлы) или при изменении
+    mtime / размера файла (например, если файл отредактирован вручную).
+    Для каждой папки существует только 1 экземпляр класса (у доп. аккаунтов свои папки с товарами).
+
+    :param products_dir: папка с товарными файлами.
+    """
+    instances: dict[str, ProductsIndex] = {}
+    instances_lock = RLock()
+
+    def __new__(cls, products_dir: str = PRODUCTS_DIR):
+        with cls.instances_lock:
+            if products_dir not in cls.instances:
+                cls.instances[products_dir] = super(ProductsIndex, cls).__new__(cls)
+            return cls.instances[products_dir]
+
+    def __init__(self, products_dir: str = PRODUCTS_DIR):
+        if hasattr(self, "lock"):
+            return
+        self.lock = RLock()
+        self.products_dir: str = products_dir
+        """Папка с товарными файлами."""
+        self.ids_cache_path: str = IDS_CACHE_PATH if products_dir == PRODUCTS_DIR else \
+            os.path.join(os.path.dirname(products_dir), "cache", "products_ids.json")
+        """Путь до кэша ID файлов."""
+        self.__dir_mtime: int | None = None
+        """mtime папки на момент последнего сканирования."""
+        self.__files: list[str] = []
+        """Отсортированный список товарных файлов."""
+        self.__files_set: set[str] = set()
+        self.__ids: dict[str, int] = {}
+        """Стабильные ID файлов {название файла: ID}."""
+        self.__names: dict[int, str] = {}
+        """{ID: название файла}"""
+        self.__next_id: int = 0
+        self.__counts: dict[str, tuple[int, int, int]] = {}
+        """Кэш кол-ва товаров {название файла: (mtime файла, размер файла, кол-во товаров)}."""
+        self.__load_ids()
+
+    def __load_ids(self):
+        """
+        Загружает ID файлов из кэша, чтобы ID (а значит и кнопки в старых сообщениях) не менялись после перезапуска.
+        """
+        if not os.path.exists(self.ids_cache_path):
+            return
+        try:
+            with open(self.ids_cache_path, "r", encoding="utf-8") as f:
+                data = json.loads(f.read())
+            self.__ids = {str(k): int(v) for k, v in data["ids"].items()}
+            self.__next_id = max(int(data["next_id"]), max(self.__ids.values(), default=-1) + 1)
+        except:
+            logger.warning("Не удалось загрузить кэш ID товарных файлов. ID будут сгенерированы заново.")
+            logger.debug("TRACEBACK", exc_info=True)
+            self.__ids, self.__next_id = {}, 0
+        self.__names = {v: k for k, v in self.__ids.items()}
+
+    def __save_ids(self):
+        folder = os.path.dirname(self.ids_cache_path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(self.ids_cache_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"next_id": self.__next_id, "ids": self.__ids}, ensure_ascii=False))
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Пересканирует папку с товарами, если изменился ее mtime.
+
+        :param force: пересканировать в любом случае.
+
+        :return: True, если папка была пересканирована.
+        """
+        with self.lock:
+            try:
+                mtime = os.stat(self.products_dir).st_mtime_ns
+            except FileNotFoundError:
+                os.makedirs(self.products_dir)
+                mtime = os.stat(self.products_dir).st_mtime_ns
+            if not force and mtime == self.__dir_mtime:
+                return False
+
+            self.__dir_mtime = mtime
+            self.__files = sorted(i for i in os.listdir(self.products_dir) if i.endswith(".txt"))
+            self.__files_set = set(self.__files)
+            self.__counts = {k: v for k, v in self.__counts.items() if k in self.__files_set}
+
+            changed = False
+            for name in [i for i in self.__ids if i not in self.__files_set]:
+                del self.__names[self.__ids.pop(name)]
+                changed = True
+            for name in self.__files:
+                if name not in self.__ids:
+                    self.__ids[name] = self.__next_id
+                    self.__names[self.__next_id] = name
+                    self.__next_id += 1
+                    changed = True
+            if changed:
+                try:
+                    self.__save_ids()
+                except:
+                    logger.debug("TRACEBACK", exc_info=True)
+            return True
+
+    def invalidate(self, file_name: str | None = None):
+        """
+        Сбрасывает кэш кол-ва товаров указанного файла. Если файл не указан - сбрасывает весь индекс
+        (нужно вызывать после создания / удаления файлов).
+
+        :param file_name: название товарного файла.
+        """
+        with self.lock:
+            if file_name is None:
+                self.__dir_mtime = None
+                self.__counts.clear()
+            else:
+                self.__counts.pop(os.path.basename(file_name), None)
+
+    def files(self) -> list[str]:
+        """
+        :return: отсортированный список товарных файлов.
+        """
+        with self.lock:
+            self.refresh()
+            return self.__files
+
+    def exists(self, file_name: str) -> bool:
+        """
+        :param file_name: название товарного файла.
+
+        :return: существует ли товарный файл.
+        """
+        with self.lock:
+            self.refresh()
+            return file_name in self.__files_set
+
+    def get_id(self, file_name: str) -> int | None:
+        """
+        :param file_name: название товарного файла.
+
+        :return: стабильный ID товарного файла или None, если файл не найден.
+        """
+        with self.lock:
+            self.refresh()
+            return self.__ids.get(file_name)
+
+    def get_name(self, file_id: int) -> str | None:
+        """
+        :param file_id: ID товарного файла.
+
+        :return: название товарного файла или None, если файл не найден.
+        """
+        with self.lock:
+            self.refresh()
+            return self.__names.get(file_id)
+
+    def position(self, file_name: str) -> int:
+        """
+        :param file_name: название товарного файла.
+
+        :return: порядковый номер файла в списке (для вычисления смещения страницы) или 0, если файл не найден.
+        """
+        with self.lock:
+            self.refresh()
+            if file_name not in self.__files_set:
+                return 0
+            return self.__files.index(file_name)
+
+    def count(self, file_name: str) -> int:
+        """
+        Возвращает кол-во товаров в файле (из кэша, если mtime и размер файла не менялись).
+
+        :param file_name: название товарного файла.
+
+        :return: кол-во товаров в файле.
+        """
+        path = f"{self.products_dir}/{file_name}"
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self.lock:
+                self.__counts.pop(file_name, None)
+            return 0
+        with self.lock:
+            cached = self.__counts.get(file_name)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+            amount = cardinal_tools.count_products(path)
+            self.__counts[file_name] = (stat.st_mtime_ns, stat.st_size, amount)
+            return amount
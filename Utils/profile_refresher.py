@@ -0,0 +1,143 @@
+"""
+В данном модуле написан механизм обновления текущего профиля (cardinal.curr_profile) после изменения списка заказов.
+Запросы на обновление, пришедшие подряд (пачка событий OrdersListChangedEvent), объединяются в одно скачивание
+профиля: одновременно выполняется не более 1 запроса, а между запросами выдерживается минимальный интервал.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+
+from concurrent.futures import Future
+from threading import Lock, Thread
+import logging
+import time
+
+from FunPayAPI import types
+
+
+logger = logging.getLogger("FPC.profile_refresher")
+
+MAX_FUTURES = 100
+"""Сколько последних тегов (и их результатов) хранить. Ожидающие обновления теги не удаляются."""
+
+
+class ProfileRefresher(object):
+    """
+    Обновляет cardinal.curr_profile с объединением запросов.
+
+    :param cardinal: экземпляр кардинала.
+    :param debounce: сколько секунд собирать запросы перед скачиванием профиля.
+    :param min_interval: мин. интервал между скачиваниями профиля (в секундах).
+    :param attempts: кол-во попыток скачать профиль.
+    """
+    def __init__(self, cardinal: Cardinal, debounce: float = 1, min_interval: float = 5, attempts: int = 3):
+        self.cardinal = cardinal
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.attempts = attempts
+        self.lock = Lock()
+        self.__futures: dict[str, Future] = {}
+        """Результаты обновлений по тегам событий ({тег: future с профилем})."""
+        self.__pending: list[tuple[str, Future]] = []
+        """Теги (и их future), ожидающие обновления профиля."""
+        self.__running: bool = False
+        """Запущен ли поток обновления."""
+        self.__last_fetch: float = 0
+        """Время окончания последнего скачивания профиля."""
+
+    def request(self, tag: str) -> Future:
+        """
+        Запрашивает обновление профиля после события с переданным тегом (не блокирует поток).
+        Повторный запрос с тем же тегом возвращает тот же future.
+
+        :param tag: тег события Runner'а.
+
+        :return: future, результат которого - профиль, скачанный после события.
+        """
+        with self.lock:
+            if (future := self.__futures.get(tag)) is not None:
+                return future
+            future = Future()
+            self.__futures[tag] = future
+            self.__pending.append((tag, future))
+            # Удаляются только завершенные future: незавершенные ждут потоки, вызвавшие get_profile.
+            for i in list(self.__futures):
+                if len(self.__futures) <= MAX_FUTURES:
+                    break
+                if self.__futures[i].done():
+                    del self.__futures[i]
+            if not self.__running:
+                self.__running = True
+                Thread(target=self.__loop, daemon=True).start()
+        return future
+
+    def get_profile(self, tag: str, timeout: float | None = 120) -> types.UserProfile:
+        """
+        Ждет профиль, скачанный после события с переданным тегом (запрашивает обновление, если его еще не было).
+
+        :param tag: тег события Runner'а.
+        :param timeout: макс. время ожидания (в секундах).
+
+        :return: профиль.
+        """
+        return self.request(tag).result(timeout)
+
+    def __loop(self):
+        while True:
+            time.sleep(self.debounce)
+            with self.lock:
+                delay = self.__last_fetch + self.min_interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            with self.lock:
+                batch, self.__pending = self.__pending, []
+                if not batch:
+                    self.__running = False
+                    return
+
+            profile = self.__fetch(batch[-1][0], len(batch))
+            with self.lock:
+                self.__last_fetch = time.time()
+            for _, future in batch:
+                if future.done():
+                    continue
+                if profile is None:
+                    future.set_exception(Exception("Не удалось получить информацию о лотах."))
+                else:
+                    future.set_result(profile)
+
+    def __fetch(self, tag: str, requests_amount: int) -> types.UserProfile | None:
+        """
+        Скачивает профиль и обновляет cardinal.curr_profile / cardinal.curr_profile_last_tag.
+
+        :param tag: тег последнего события пачки.
+        :param requests_amount: кол-во объединенных запросов (для лога).
+
+        :return: профиль или None, если его не удалось получить.
+        """
+        logger.info(f"Получаю информацию о лотах (объединено запросов: $YELLOW{requests_amount}$RESET)...")
+        previous_profile = self.cardinal.curr_profile
+        attempts = self.attempts
+        while attempts:
+            try:
+                profile = self.cardinal.account.get_user(self.cardinal.account.id)
+                break
+            except:
+                logger.error("Произошла ошибка при получении информации о лотах.")
+                logger.debug("TRACEBACK", exc_info=True)
+                attempts -= 1
+                time.sleep(2)
+        else:
+            logger.error("Не удалось получить информацию о лотах: превышено кол-во попыток.")
+            return None
+
+        self.cardinal.curr_profile = profile
+        self.cardinal.curr_profile_last_tag = tag
+        if previous_profile is not None:
+            activated, deactivated = profile.get_lots_diff(previous_profile)
+            if activated or deactivated:
+                logger.info(f"Изменилось состояние лотов: активировано $YELLOW{len(activated)}$RESET, "
+                            f"деактивировано $YELLOW{len(deactivated)}$RESET.")
+        return profile
@@ -0,0 +1,179 @@
+"""
+В данном модуле написан планировщик поднятия лотов.
+Для каждой категории (игры) хранится время, когда ее лоты можно снова поднять (min-heap по времени),
+все подкатегории одной игры поднимаются одним запросом Account.raise_lots, а поток планировщика
+просыпается ровно тогда, когда подходит время ближайшей категории (или когда изменился профиль / настройки).
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+
+from threading import Condition
+import logging
+import heapq
+import time
+
+from FunPayAPI import types, exceptions
+from FunPayAPI.common.enums import SubCategoryTypes
+from Utils import cardinal_tools
+
+
+logger = logging.getLogger("FPC.raise_scheduler")
+
+REQUESTS_INTERVAL = 0.5
+"""Мин. интервал между запросами на поднятие лотов (в секундах)."""
+ERROR_429_PAUSE = 10
+"""Пауза после ошибки 429 (в секундах). Учитываются ошибки 429 любых запросов аккаунта."""
+ERROR_RETRY = 10
+"""Через сколько секунд повторять попытку после непредвиденной ошибки."""
+DEFAULT_WAIT = 3600
+"""Через сколько секунд повторять попытку, если FunPay не сообщил время ожидания."""
+
+
+class RaiseScheduler(object):
+    """
+    Планировщик поднятия лотов.
+
+    :param cardinal: экземпляр кардинала.
+    """
+    def __init__(self, cardinal: Cardinal):
+        self.cardinal = cardinal
+        self.condition = Condition()
+        self.__heap: list[tuple[float, int]] = []
+        """Очередь категорий (время след. поднятия, ID категории)."""
+        self.__next_time: dict[int, float] = {}
+        """Актуальное время след. поднятия категорий ({ID категории: время}). Устаревшие записи в очереди пропускаются."""
+        self.__subcategories: dict[int, list[types.SubCategory]] = {}
+        """Подкатегории с лотами пользователя ({ID категории: [подкатегории]})."""
+        self.__last_request: float = 0
+        """Время последнего запроса на поднятие лотов."""
+        self.__in_progress: int | None = None
+        """ID категории, которая поднимается в данный момент."""
+
+    def update_profile(self, profile: types.UserProfile):
+        """
+        Обновляет список категорий для поднятия по профилю. Новые категории поднимаются сразу,
+        время поднятия уже известных категорий не меняется.
+
+        :param profile: профиль пользователя.
+        """
+        subcategories = {}
+        for subcat in profile.get_subcategories():
+            if subcat.type is SubCategoryTypes.CURRENCY:
+                continue
+            subcategories.setdefault(subcat.category.id, []).append(subcat)
+
+        with self.condition:
+            self.__subcategories = subcategories
+            now = time.time()
+            for category_id in subcategories:
+                if category_id not in self.__next_time and category_id != self.__in_progress:
+                    self.__schedule(category_id, now)
+            for category_id in [i for i in self.__next_time if i not in subcategories]:
+                del self.__next_time[category_id]
+            self.condition.notify_all()
+
+    def wake(self):
+        """
+        Будит поток планировщика (например, после изменения настройки autoRaise).
+        """
+        with self.condition:
+            self.condition.notify_all()
+
+    def get_next_time(self, category_id: int) -> float | None:
+        """
+        Возвращает время следующей попытки поднятия категории.
+
+        :param category_id: ID категории (игры).
+
+        :return: время (timestamp) или None, если категория не поднимается.
+        """
+        with self.condition:
+            return self.__next_time.get(category_id)
+
+    def __schedule(self, category_id: int, next_time: float):
+        """
+        Планирует поднятие категории (вызывать под self.condition).
+        """
+        self.__next_time[category_id] = next_time
+        heapq.heappush(self.__heap, (next_time, category_id))
+
+    def __wait_next(self) -> tuple[int, list[types.SubCategory]]:
+        """
+        Ждет, пока не подойдет время поднятия ближайшей категории.
+
+        :return: ID категории и ее подкатегории.
+        """
+        with self.condition:
+            while True:
+                if not self.cardinal.MAIN_CFG["FunPay"].getboolean("autoRaise"):
+                    self.condition.wait()
+                    continue
+                # Устаревшие записи (категория перепланирована или больше не поднимается).
+                while self.__heap and self.__next_time.get(self.__heap[0][1]) != self.__heap[0][0]:
+                    heapq.heappop(self.__heap)
+                if not self.__heap:
+                    self.condition.wait()
+                    continue
+
+                due = max(self.__heap[0][0], self.__last_request + REQUESTS_INTERVAL,
+                          self.cardinal.account.last_429_err_time + ERROR_429_PAUSE)
+                delay = due - time.time()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+
+                _, category_id = heapq.heappop(self.__heap)
+                del self.__next_time[category_id]
+                self.__in_progress = category_id
+                self.__last_request = time.time()
+                return category_id, self.__subcategories[category_id]
+
+    def __raise(self, category_id: int, subcategories: list[types.SubCategory]) -> float:
+        """
+        Поднимает все подкатегории категории одним запросом.
+
+        :return: через сколько секунд повторить попытку.
+        """
+        category = subcategories[0].category
+        try:
+            wait = self.cardinal.account.raise_lots(category_id, subcategories)
+        except exceptions.RaiseError as e:
+            wait = e.wait_time or ERROR_RETRY
+            logger.warning(f"Не удалось поднять лоты категории \"{category.name}\". "
+                           f"FunPay говорит подождать еще {cardinal_tools.time_to_str(wait)}.")
+            logger.debug(f"Ответ FunPay: {e.error_message}")
+            result = types.RaiseResponse(False, wait, subcategories, e.error_message)
+        except Exception as e:
+            if isinstance(e, exceptions.RequestFailedError) and e.status_code == 429:
+                logger.warning(f"Ошибка 429 при поднятии категории \"{category.name}\". "
+                               f"Пауза на {ERROR_429_PAUSE} сек...")
+                self.cardinal.account.last_429_err_time = time.time()
+                return ERROR_429_PAUSE
+            logger.error(f"Произошла непредвиденная ошибка при попытке поднять категорию \"{category.name}\" "
+                         f"(следующая попытка для данной категории через {ERROR_RETRY} секунд).")
+            logger.debug("TRACEBACK", exc_info=True)
+            return ERROR_RETRY
+        else:
+            wait = wait or DEFAULT_WAIT
+            for subcat in subcategories:
+                logger.info(f"Поднял лоты подкатегории \"{subcat.fullname}\".")
+            logger.info(f"Все подкатегории, относящиеся к игре {category.name} (ID: {category_id}) подняты!")
+            logger.info(f"Следующая попытка через {cardinal_tools.time_to_str(wait)}.")
+            result = types.RaiseResponse(True, wait, subcategories, None)
+        self.cardinal.run_handlers(self.cardinal.post_lots_raise_handlers, (self.cardinal, result))
+        return wait
+
+    def loop(self):
+        """
+        Запускает бесконечный цикл поднятия лотов.
+        """
+        while True:
+            category_id, subcategories = self.__wait_next()
+            delay = self.__raise(category_id, subcategories)
+            with self.condition:
+                self.__in_progress = None
+                if category_id in self.__subcategories and category_id not in self.__next_time:
+                    self.__schedule(category_id, time.time() + delay)
@@ -0,0 +1,92 @@
+"""
+В данном модуле написан профайлер запуска FPC (режим --profile-startup).
+Профайлер замеряет время импорта модулей и этапов инициализации кардинала и сохраняет отчет в JSON.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from threading import Lock, current_thread
+import logging
+import json
+import time
+import sys
+import os
+
+
+logger = logging.getLogger("FPC.startup_profiler")
+
+REPORT_PATH = "logs/startup_profile.json"
+
+
+class StartupProfiler(object):
+    """
+    Профайлер запуска. Пока не включен (:attr:`enabled`), ничего не замеряет.
+    Класс является singleton'ом.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if not hasattr(cls, "instance"):
+            setattr(cls, "instance", super(StartupProfiler, cls).__new__(cls))
+        return getattr(cls, "instance")
+
+    def __init__(self):
+        if hasattr(self, "lock"):
+            return
+        self.lock = Lock()
+        self.enabled: bool = False
+        """Включен ли профайлер."""
+        self.start_time: float = time.perf_counter()
+        """Время создания профайлера (начало отсчета)."""
+        self.phases: list[dict] = []
+        """Замеры этапов запуска."""
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Замеряет этап запуска: время начала (от старта профайлера), длительность, поток и модули,
+        импортированные за время этапа.
+
+        :param name: название этапа.
+        """
+        if not self.enabled:
+            yield
+            return
+        modules_before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            new_modules = set(sys.modules) - modules_before
+            with self.lock:
+                self.phases.append({
+                    "name": name,
+                    "start": round(start - self.start_time, 4),
+                    "duration": round(end - start, 4),
+                    "thread": current_thread().name,
+                    "new_modules": len(new_modules),
+                    "new_packages": sorted({i.split(".")[0] for i in new_modules})
+                })
+
+    def save(self, path: str = REPORT_PATH):
+        """
+        Сохраняет отчет в JSON.
+
+        :param path: путь до файла отчета.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            report = {
+                "total": round(time.perf_counter() - self.start_time, 4),
+                "python": sys.version.split()[0],
+                "phases": sorted(self.phases, key=lambda x: x["start"])
+            }
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False, indent=2))
+        logger.info(f"$MAGENTAОтчет о запуске сохранен в $YELLOW{path}$MAGENTA "
+                    f"(всего: $YELLOW{report['total']:.2f}$MAGENTA сек.).")
@@ -0,0 +1,3 @@
+"""
+Бенчмарки FunPay Cardinal. Запуск из корня проекта: python -m benchmarks.<название модуля>
+"""
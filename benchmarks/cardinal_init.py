@@ -0,0 +1,101 @@
+"""
+Бенчмарк запуска: время Cardinal.init без кэша дерева категорий (холодный старт) и с кэшем
+(storage/cache/categories.json, теплый старт) на локальном тестовом сервере FunPay (benchmarks/fake_funpay.py).
+
+Каждый запуск выполняется в отдельном процессе во временной папке (Telegram бот и плагины выключены).
+Первый запуск создает кэш дерева категорий, следующие используют его.
+
+Запуск: python -m benchmarks.cardinal_init [--games 1000] [--sections 8] [--repeats 3] [--latency 0]
+Результат выводится в формате JSON (по одной строке на режим).
+"""
+
+from __future__ import annotations
+
+from statistics import median
+from threading import Thread
+import subprocess
+import argparse
+import platform
+import tempfile
+import shutil
+import json
+import time
+import sys
+import os
+
+from benchmarks.fake_funpay import FakeFunPay, create_server
+from benchmarks.parsers import get_version
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(url: str):
+    """
+    Инициализирует кардинал (выполняется в отдельном процессе, рабочая папка - временная).
+    """
+    from first_setup import create_config_obj, default_config
+    from configparser import ConfigParser
+
+    main_cfg = create_config_obj(default_config)
+    main_cfg["FunPay"]["golden_key"] = "0" * 32
+    main_cfg["FunPay"]["baseUrl"] = url
+    empty = create_config_obj({})
+
+    start = time.perf_counter()
+    from cardinal import Cardinal
+    imported = time.perf_counter()
+    cardinal = Cardinal(main_cfg, empty, empty, ConfigParser(), get_version())
+    cardinal.init()
+    end = time.perf_counter()
+    print(json.dumps({"import": imported - start, "init": end - imported,
+                      "categories": len(cardinal.account.get_sorted_categories())}), flush=True)
+    os._exit(0)
+
+
+def run(url: str, folder: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    result = subprocess.run([sys.executable, "-m", "benchmarks.cardinal_init", "--child", url], cwd=folder, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=300)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    args = argparse.ArgumentParser(description="Время Cardinal.init без кэша и с кэшем дерева категорий.")
+    args.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args.add_argument("--games", type=int, default=1000, help="кол-во игр на главной странице")
+    args.add_argument("--sections", type=int, default=8, help="кол-во разделов в каждой игре")
+    args.add_argument("--repeats", type=int, default=3, help="кол-во запусков в каждом режиме")
+    args.add_argument("--latency", type=float, default=0, help="задержка ответа сервера (мс)")
+    args = args.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    funpay = FakeFunPay(0, 0, latency=args.latency, games=args.games, sections=args.sections)
+    server = create_server(funpay)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = {"cold": [], "warm": []}
+    for _ in range(args.repeats):
+        folder = tempfile.mkdtemp()
+        try:
+            results["cold"].append(run(url, folder))
+            results["warm"].append(run(url, folder))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    server.shutdown()
+
+    for mode, runs in results.items():
+        print(json.dumps({"benchmark": "cardinal_init", "mode": mode, "games": args.games,
+                          "sections": args.games * args.sections, "repeats": args.repeats,
+                          "categories": runs[0]["categories"],
+                          "init_median": round(median(i["init"] for i in runs), 4),
+                          "init_min": round(min(i["init"] for i in runs), 4),
+                          "import_median": round(median(i["import"] for i in runs), 4),
+                          "version": get_version(), "python": platform.python_version()}))
+
+
+if __name__ == "__main__":
+    main()
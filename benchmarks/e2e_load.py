@@ -0,0 +1,94 @@
+"""
+Нагрузочный тест Runner'а на локальном тестовом сервере FunPay (benchmarks/fake_funpay.py).
+
+Запускает тестовый сервер (или использует уже запущенный, --url), создает Account с base_url тестового сервера,
+получает события через Runner.listen и отвечает на каждое сообщение покупателя (как автоответчик кардинала).
+По окончании выводит JSON: кол-во событий в секунду, время ответа покупателям и статистику сервера.
+
+Запуск: python -m benchmarks.e2e_load [--duration 60] [--message-rate 20] [--order-rate 2] [--error-rate 0.05]
+    [--latency 50] [--delay 1] [--url http://127.0.0.1:8080]
+"""
+
+from __future__ import annotations
+
+from threading import Thread
+import argparse
+import platform
+import logging
+import json
+import time
+
+from FunPayAPI import Account, Runner
+from FunPayAPI.updater.events import NewMessageEvent
+from benchmarks.fake_funpay import FakeFunPay, create_server
+from benchmarks.parsers import get_version
+
+
+logger = logging.getLogger("main")
+
+
+def consume(account: Account, runner: Runner, delay: float, counters: dict):
+    """
+    Получает события и отвечает на сообщения покупателей.
+    """
+    for event in runner.listen(requests_delay=delay):
+        name = type(event).__name__
+        counters["events"][name] = counters["events"].get(name, 0) + 1
+        if not isinstance(event, NewMessageEvent) or event.message.author_id in (0, account.id):
+            continue
+        try:
+            account.send_message(event.message.chat_id, "Здравствуйте! Продавец скоро ответит.",
+                                 event.message.chat_name, event.message.interlocutor_id)
+            counters["replies"] += 1
+        except:
+            counters["reply_errors"] += 1
+            logger.debug("TRACEBACK", exc_info=True)
+
+
+def main():
+    args = argparse.ArgumentParser(description="Нагрузочный тест Runner'а на тестовом сервере FunPay.")
+    args.add_argument("--url", default=None, help="адрес уже запущенного тестового сервера")
+    args.add_argument("--duration", type=float, default=60, help="длительность теста (сек.)")
+    args.add_argument("--delay", type=float, default=1, help="задержка между запросами Runner'а (сек.)")
+    args.add_argument("--message-rate", type=float, default=20, help="сообщений покупателей в секунду")
+    args.add_argument("--order-rate", type=float, default=2, help="заказов в секунду")
+    args.add_argument("--error-rate", type=float, default=0, help="доля запросов, на которые отвечать 429")
+    args.add_argument("--latency", type=float, default=0, help="задержка ответа сервера (мс)")
+    args = args.parse_args()
+
+    funpay = server = None
+    url = args.url
+    if not url:
+        funpay = FakeFunPay(args.message_rate, args.order_rate, error_rate=args.error_rate, latency=args.latency)
+        server = create_server(funpay)
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    account = Account("0" * 32, base_url=url).get()
+    runner = Runner(account)
+    Thread(target=runner.loop, daemon=True).start()
+    if funpay:
+        funpay.start_generators()
+
+    counters = {"events": {}, "replies": 0, "reply_errors": 0}
+    start = time.time()
+    Thread(target=consume, args=(account, runner, args.delay, counters), daemon=True).start()
+    time.sleep(args.duration)
+    duration = time.time() - start
+    if funpay:
+        funpay.stop()
+        stats = funpay.stats()
+        server.shutdown()
+    else:
+        stats = account.session.get(f"{url}/_stats").json()
+
+    events = sum(counters["events"].values())
+    print(json.dumps({"benchmark": "e2e_load", "duration": round(duration, 3), "events": events,
+                      "events_per_sec": round(events / duration, 3), "events_by_type": counters["events"],
+                      "replies": counters["replies"], "reply_errors": counters["reply_errors"],
+                      "reply_latency": stats["reply_latency"], "server": stats,
+                      "version": get_version(), "python": platform.python_version()}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
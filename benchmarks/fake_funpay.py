@@ -0,0 +1,496 @@
+"""
+Локальный тестовый сервер, имитирующий FunPay, для нагрузочного тестирования Runner'а и кардинала.
+
+Сервер генерирует покупателей, сообщения и заказы с заданной частотой и отвечает на запросы к runner/
+(с учетом тегов объектов), chat/history, orders/trade, users/<id>/, lots/raise, api/orders/get и file/addChatImage.
+Может отвечать ошибкой 429 и добавлять задержку к ответам.
+Статистика (в т.ч. время ответа бота покупателям) доступна по адресу /_stats.
+
+Запуск: python -m benchmarks.fake_funpay [--port 8080] [--message-rate 5] [--order-rate 0.5] [--error-rate 0.05]
+    [--latency 50]
+Чтобы запустить кардинала с тестовым сервером, укажите в configs/_main.cfg в секции [FunPay]:
+    baseUrl = http://127.0.0.1:8080
+"""
+
+from __future__ import annotations
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from string import Template
+from threading import Thread, Lock, Event
+from statistics import median
+import argparse
+import html
+import random
+import string
+import json
+import time
+import re
+
+from FunPayAPI.common.utils import random_tag
+from benchmarks.parsers import (load_template, load_json, page, ACCOUNT_ID, ACCOUNT_USERNAME, GAME_ID, GAME_NAME,
+                                LOTS_SUBCATEGORY_ID, CHIPS_SUBCATEGORY_ID)
+
+
+USERS_RE = re.compile(r"^/users/(\d+)/$")
+BOOKMARKS_SIZE = 50
+"""Кол-во чатов в объекте chat_bookmarks."""
+CHAT_NODE_SIZE = 50
+"""Макс. кол-во сообщений в объекте chat_node."""
+ORDERS_PAGE_SIZE = 100
+"""Кол-во заказов на одной странице orders/trade."""
+RAISE_INTERVAL = 4 * 3600
+"""Через сколько секунд можно повторно поднимать лоты категории."""
+
+
+class FakeChat:
+    """
+    Личный чат продавца с покупателем.
+    """
+    def __init__(self, id_: int, buyer_id: int, buyer_name: str):
+        self.id = id_
+        self.buyer_id = buyer_id
+        self.buyer_name = buyer_name
+        id1, id2 = sorted([ACCOUNT_ID, buyer_id])
+        self.name = f"users-{id1}-{id2}"
+        self.messages: list[dict] = []
+        """Сообщения ({"id", "author", "text", "html"})."""
+        self.tag = random_tag()
+        self.last_read = 0
+        """ID последнего сообщения, прочитанного продавцом."""
+        self.waiting_since: float | None = None
+        """Время первого сообщения покупателя, на которое продавец еще не ответил."""
+
+
+class FakeOrder:
+    """
+    Заказ покупателя.
+    """
+    def __init__(self, id_: str, chat: FakeChat, price: float, subcategory_id: int, section_name: str):
+        self.id = id_
+        self.chat = chat
+        self.price = price
+        self.subcategory_id = subcategory_id
+        self.section_name = section_name
+        self.status = "paid"
+        self.time = time.time()
+
+
+class FakeFunPay:
+    """
+    Состояние тестового сервера FunPay и генератор покупателей / сообщений / заказов.
+
+    :param message_rate: сообщений покупателей в секунду.
+    :param order_rate: заказов в секунду.
+    :param new_buyer_share: доля сообщений от новых покупателей.
+    :param error_rate: доля запросов, на которые сервер отвечает 429.
+    :param latency: задержка ответа (в миллисекундах).
+    :param lots: кол-во лотов на странице продавца.
+    :param games: кол-во доп. игр на главной странице (дерево категорий).
+    :param sections: кол-во разделов в каждой доп. игре.
+    """
+    def __init__(self, message_rate: float = 5, order_rate: float = 0.5, new_buyer_share: float = 0.3,
+                 error_rate: float = 0, latency: float = 0, lots: int = 20, games: int = 0, sections: int = 8):
+        self.message_rate = message_rate
+        self.order_rate = order_rate
+        self.new_buyer_share = new_buyer_share
+        self.error_rate = error_rate
+        self.latency = latency
+        self.lots = lots
+        self.games = games
+        self.sections = sections
+
+        self.lock = Lock()
+        self.stopped = Event()
+        self.start_time = time.time()
+        self.chats: dict[int, FakeChat] = {}
+        self.chats_by_name: dict[str, FakeChat] = {}
+        self.chats_order: list[int] = []
+        """ID чатов, от последнего изменившегося к первому."""
+        self.orders: list[FakeOrder] = []
+        """Заказы, от новых к старым."""
+        self.orders_by_id: dict[str, FakeOrder] = {}
+        self.bookmarks_tag = random_tag()
+        self.orders_tag = random_tag()
+        self.last_message_id = 1000000
+        self.last_file_id = 0
+        self.raise_times: dict[int, float] = {}
+
+        self.requests: dict[str, int] = {}
+        self.errors_429 = 0
+        self.buyer_messages = 0
+        self.replies = 0
+        self.reply_latencies: list[float] = []
+
+        self.texts = [Template(i) for i in load_json("messages.json")
+                      if not i.startswith(("Покупатель", "The buyer", "Продавец", "Заказ"))]
+        runner_fixture = load_json("runner.json")
+        self.bookmarks_page = Template(runner_fixture["chat_bookmarks"]["data"]["html"])
+        self.bookmarks_item = Template(runner_fixture["chat_bookmarks_item"])
+        self.user_message = Template(runner_fixture["chat_node_messages"]["user"])
+        self.system_message = Template(runner_fixture["chat_node_messages"]["system"])
+
+    # Генерация событий
+    def new_message(self, chat: FakeChat, author: int, text: str) -> dict:
+        """
+        Добавляет сообщение в чат (вызывать под self.lock).
+        """
+        self.last_message_id += 1
+        if author == 0:
+            message_html = self.system_message.safe_substitute(message_id=self.last_message_id,
+                                                               text=html.escape(text))
+        else:
+            name = ACCOUNT_USERNAME if author == ACCOUNT_ID else chat.buyer_name
+            message_html = self.user_message.safe_substitute(message_id=self.last_message_id, author_id=author,
+                                                             author=name, text=html.escape(text))
+        message = {"id": self.last_message_id, "author": author, "text": text, "html": message_html}
+        chat.messages.append(message)
+        chat.tag = random_tag()
+        if author == ACCOUNT_ID:
+            chat.last_read = self.last_message_id
+        if chat.id in self.chats_order:
+            self.chats_order.remove(chat.id)
+        self.chats_order.insert(0, chat.id)
+        self.bookmarks_tag = random_tag()
+        return message
+
+    def get_chat(self, new: bool = False) -> FakeChat:
+        """
+        Возвращает случайный существующий или новый чат (вызывать под self.lock).
+        """
+        if self.chats and not new:
+            return self.chats[random.choice(self.chats_order)]
+        index = len(self.chats)
+        chat = FakeChat(30000000 + index, 20000000 + index, f"buyer{index}")
+        self.chats[chat.id] = chat
+        self.chats_by_name[chat.name] = chat
+        return chat
+
+    def generate_message(self):
+        with self.lock:
+            chat = self.get_chat(new=random.random() < self.new_buyer_share)
+            text = random.choice(self.texts).safe_substitute(buyer=chat.buyer_name, seller=ACCOUNT_USERNAME)
+            self.new_message(chat, chat.buyer_id, text)
+            if chat.waiting_since is None:
+                chat.waiting_since = time.time()
+            self.buyer_messages += 1
+
+    def generate_order(self):
+        with self.lock:
+            chat = self.get_chat(new=random.random() < self.new_buyer_share)
+            order_id = "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
+            currency = random.random() < 0.25
+            order = FakeOrder(order_id, chat, round(random.uniform(50, 5000), 2),
+                              CHIPS_SUBCATEGORY_ID if currency else LOTS_SUBCATEGORY_ID,
+                              "Мора" if currency else "Аккаунты")
+            self.orders.insert(0, order)
+            self.orders_by_id[order_id] = order
+            self.new_message(chat, 0, f"Покупатель {chat.buyer_name} оплатил заказ #{order_id}. "
+                                      f"{GAME_NAME}, {order.section_name}, 1 шт. {chat.buyer_name}, не забудьте потом "
+                                      f"нажать кнопку «Подтвердить выполнение заказа».")
+            # Покупатели подтверждают примерно половину заказов.
+            paid = [i for i in self.orders if i.status == "paid"]
+            if len(paid) > 1 and random.random() < 0.5:
+                closed = paid[-1]
+                closed.status = "closed"
+                self.new_message(closed.chat, 0, f"Покупатель {closed.chat.buyer_name} подтвердил успешное выполнение "
+                                                 f"заказа #{closed.id} и отправил деньги продавцу {ACCOUNT_USERNAME}.")
+            self.orders_tag = random_tag()
+
+    def generator_loop(self, rate: float, func):
+        if rate <= 0:
+            return
+        next_time = time.time()
+        while not self.stopped.is_set():
+            # Пуассоновский поток событий.
+            next_time += random.expovariate(rate)
+            self.stopped.wait(max(0.0, next_time - time.time()))
+            if not self.stopped.is_set():
+                func()
+
+    def start_generators(self):
+        Thread(target=self.generator_loop, args=(self.message_rate, self.generate_message), daemon=True).start()
+        Thread(target=self.generator_loop, args=(self.order_rate, self.generate_order), daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+
+    # Ответы на запросы
+    def main_page(self) -> bytes:
+        games = []
+        for game in range(self.games):
+            game_id = GAME_ID + 1 + game
+            links = "".join(f'<li><a href="https://funpay.com/{"chips" if i % 4 == 3 else "lots"}/'
+                            f'{100000 + game * self.sections + i}/">Раздел {i}</a></li>'
+                            for i in range(self.sections))
+            games.append(f'<div class="col-md-3 col-xs-6">\n<div class="promo-game-item">\n'
+                         f'<div class="game-title" data-id="{game_id}"><a href="https://funpay.com/lots/'
+                         f'{100000 + game * self.sections}/">Игра {game}</a></div>\n'
+                         f'<ul class="list-inline" data-id="{game_id}">\n{links}\n</ul>\n</div>\n</div>')
+        return page("main.html", "", game_id=GAME_ID, game_name=GAME_NAME, lots_subcategory_id=LOTS_SUBCATEGORY_ID,
+                    chips_subcategory_id=CHIPS_SUBCATEGORY_ID, games="\n".join(games))
+
+    def user_page(self, user_id: int) -> bytes:
+        section = load_template("users_section.html")
+        item = load_template("users_item.html")
+        items = "".join(item.safe_substitute(section_type="lots", offer_id=40000000 + i, amount=i % 50 + 1,
+                                             price=f"{100 + i * 10}.5") for i in range(self.lots))
+        sections = section.safe_substitute(section_type="lots", subcategory_id=LOTS_SUBCATEGORY_ID,
+                                           subcategory_name=GAME_NAME, items=items)
+        return page("users.html", "", profile_username=ACCOUNT_USERNAME if user_id == ACCOUNT_ID else f"user{user_id}",
+                    sections=sections)
+
+    def sales_page(self, start_from: str | None) -> bytes:
+        item = load_template("orders_trade_item.html")
+        with self.lock:
+            orders = self.orders
+            if start_from and start_from in self.orders_by_id:
+                orders = orders[orders.index(self.orders_by_id[start_from]):]
+            orders = orders[:ORDERS_PAGE_SIZE + 1]
+            next_order = orders[ORDERS_PAGE_SIZE].id if len(orders) > ORDERS_PAGE_SIZE else ""
+            statuses = {"paid": (" info", "Оплачен"), "closed": ("", "Закрыт"), "refunded": (" warning", "Возврат")}
+            items = "".join(item.safe_substitute(order_id=i.id, status_class=statuses[i.status][0],
+                                                 status_text=statuses[i.status][1],
+                                                 date=time.strftime("сегодня, %H:%M", time.localtime(i.time)),
+                                                 game_name=GAME_NAME, section_name=i.section_name,
+                                                 buyer_id=i.chat.buyer_id, buyer=i.chat.buyer_name,
+                                                 price=f"{i.price}") for i in orders[:ORDERS_PAGE_SIZE])
+        return page("orders_trade.html", items, game_id=GAME_ID, game_name=GAME_NAME,
+                    lots_subcategory_id=LOTS_SUBCATEGORY_ID, chips_subcategory_id=CHIPS_SUBCATEGORY_ID,
+                    next_order_id=next_order)
+
+    def chat_node(self, chat: FakeChat, node, last_message: int) -> dict:
+        messages = [{"id": i["id"], "author": i["author"], "html": i["html"]} for i in chat.messages
+                    if i["id"] > last_message][-CHAT_NODE_SIZE:]
+        return {"type": "chat_node", "id": node, "tag": chat.tag,
+                "data": {"node": {"id": chat.id, "name": chat.name, "silent": False}, "messages": messages}}
+
+    def find_chat(self, node) -> FakeChat | None:
+        if isinstance(node, str) and not node.isdigit():
+            return self.chats_by_name.get(node)
+        return self.chats.get(int(node))
+
+    def runner(self, form: dict) -> dict:
+        objects = json.loads(form.get("objects", "[]"))
+        request = form.get("request")
+        request = json.loads(request) if request and request != "False" else None
+        result = {"objects": [], "response": False}
+        with self.lock:
+            if request and request.get("action") == "chat_message":
+                data = request["data"]
+                chat = self.find_chat(data["node"])
+                if chat is None:
+                    result["response"] = {"error": "Чат не найден."}
+                else:
+                    self.new_message(chat, ACCOUNT_ID, data.get("content") or "Изображение")
+                    if chat.waiting_since is not None:
+                        self.reply_latencies.append(time.time() - chat.waiting_since)
+                        chat.waiting_since = None
+                    self.replies += 1
+                    result["response"] = {"error": None}
+
+            for obj in objects:
+                if obj["type"] == "chat_bookmarks" and obj.get("tag") != self.bookmarks_tag:
+                    items = []
+                    for chat_id in self.chats_order[:BOOKMARKS_SIZE]:
+                        chat = self.chats[chat_id]
+                        last = chat.messages[-1]
+                        items.append(self.bookmarks_item.safe_substitute(
+                            chat_id=chat.id, node_msg=last["id"], user_msg=chat.last_read,
+                            unread=" unread" if chat.last_read < last["id"] else "", username=chat.buyer_name,
+                            text=html.escape(last["text"])))
+                    result["objects"].append({
+                        "type": "chat_bookmarks", "id": obj["id"], "tag": self.bookmarks_tag,
+                        "data": {"order": self.chats_order[:BOOKMARKS_SIZE],
+                                 "html": self.bookmarks_page.safe_substitute(account_id=ACCOUNT_ID,
+                                                                             items="".join(items))}})
+                elif obj["type"] == "orders_counters" and obj.get("tag") != self.orders_tag:
+                    result["objects"].append({
+                        "type": "orders_counters", "id": obj["id"], "tag": self.orders_tag,
+                        "data": {"buyer": 0, "seller": len([i for i in self.orders if i.status == "paid"])}})
+                elif obj["type"] == "chat_node":
+                    data = obj.get("data") or {}
+                    node = data.get("node") or obj["id"]
+                    chat = self.find_chat(node)
+                    if chat is not None and obj.get("tag") != chat.tag:
+                        result["objects"].append(self.chat_node(chat, node, data.get("last_message") or -1))
+        return result
+
+    def chat_history(self, query: dict) -> dict:
+        with self.lock:
+            chat = self.find_chat(query.get("node", ["0"])[0])
+            if chat is None:
+                return {"chat": None}
+            last_message = int(query.get("last_message", ["-1"])[0])
+            return {"chat": self.chat_node(chat, chat.id, last_message)["data"]}
+
+    def raise_lots(self, form: dict) -> dict:
+        game_id = int(form.get("game_id", 0))
+        with self.lock:
+            wait = RAISE_INTERVAL - (time.time() - self.raise_times.get(game_id, 0))
+            if wait > 0:
+                return {"error": 1, "msg": f"Подождите {int(wait // 3600) or 1} ч.", "wait": int(wait)}
+            self.raise_times[game_id] = time.time()
+        return {"error": 0, "msg": "Предложения подняты."}
+
+    def orders_info(self, body: dict) -> dict:
+        data = {}
+        with self.lock:
+            for order_id in body.get("order_uids", []):
+                if not (order := self.orders_by_id.get(order_id)):
+                    continue
+                data[order_id] = {
+                    "order_uid": order.id,
+                    "section": {"local_id": order.subcategory_id,
+                                "type_id": "chip" if order.subcategory_id == CHIPS_SUBCATEGORY_ID else "lot"},
+                    "buyer": {"user_id": order.chat.buyer_id, "name": order.chat.buyer_name},
+                    "seller": {"user_id": ACCOUNT_ID, "name": ACCOUNT_USERNAME},
+                    "currency": "RUB",
+                    "amount": str(order.price),
+                    "status": order.status,
+                    "chat": {"node_name": order.chat.name},
+                    "review": None,
+                    "type_data": {"amount": "1", "fields": {}, "secrets": []}
+                }
+        return {"status": "SUCCESS", "data": data}
+
+    def upload_image(self) -> dict:
+        with self.lock:
+            self.last_file_id += 1
+            return {"fileId": self.last_file_id}
+
+    def stats(self) -> dict:
+        """
+        :return: статистика сервера.
+        """
+        with self.lock:
+            latencies = sorted(self.reply_latencies)
+            uptime = time.time() - self.start_time
+            return {
+                "uptime": round(uptime, 3),
+                "requests": dict(self.requests),
+                "errors_429": self.errors_429,
+                "chats": len(self.chats),
+                "orders": len(self.orders),
+                "buyer_messages": self.buyer_messages,
+                "replies": self.replies,
+                "unanswered_chats": len([i for i in self.chats.values() if i.waiting_since is not None]),
+                "reply_latency": {
+                    "count": len(latencies),
+                    "median": round(median(latencies), 4) if latencies else None,
+                    "p95": round(latencies[int(len(latencies) * 0.95)], 4) if latencies else None,
+                    "max": round(latencies[-1], 4) if latencies else None
+                }
+            }
+
+
+def create_handler(funpay: FakeFunPay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, obj):
+            self.send(200, json.dumps(obj, ensure_ascii=False).encode(), "application/json")
+
+        def process(self, method: str):
+            url = urlparse(self.path)
+            path = re.sub(r"^/(en|uk)/", "/", url.path)
+            query = parse_qs(url.query)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+
+            if path == "/_stats":
+                return self.send_json(funpay.stats())
+
+            key = "users/<id>/" if USERS_RE.match(path) else path.strip("/") or "/"
+            with funpay.lock:
+                funpay.requests[key] = funpay.requests.get(key, 0) + 1
+            if funpay.latency:
+                time.sleep(funpay.latency / 1000 * random.uniform(0.5, 1.5))
+            if funpay.error_rate and random.random() < funpay.error_rate:
+                with funpay.lock:
+                    funpay.errors_429 += 1
+                return self.send(429)
+
+            form = {}
+            if method == "POST" and "json" not in self.headers.get("Content-Type", "") \
+                    and "multipart" not in self.headers.get("Content-Type", ""):
+                form = {k: v[-1] for k, v in parse_qs(body.decode(), keep_blank_values=True).items()}
+
+            if path == "/" and method == "GET":
+                return self.send(200, funpay.main_page())
+            elif path == "/runner/" and method == "POST":
+                return self.send_json(funpay.runner(form))
+            elif path == "/chat/history":
+                return self.send_json(funpay.chat_history(query))
+            elif path == "/orders/trade":
+                return self.send(200, funpay.sales_page(form.get("continue")))
+            elif match := USERS_RE.match(path):
+                return self.send(200, funpay.user_page(int(match.group(1))))
+            elif path == "/lots/raise" and method == "POST":
+                return self.send_json(funpay.raise_lots(form))
+            elif path == "/api/orders/get" and method == "POST":
+                return self.send_json(funpay.orders_info(json.loads(body or b"{}")))
+            elif path == "/file/addChatImage" and method == "POST":
+                return self.send_json(funpay.upload_image())
+            self.send(404)
+
+        def do_GET(self):
+            self.process("GET")
+
+        def do_POST(self):
+            self.process("POST")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def create_server(funpay: FakeFunPay, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Создает HTTP-сервер (port=0 - любой свободный порт, см. server.server_address).
+    """
+    server = ThreadingHTTPServer((host, port), create_handler(funpay))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    args = argparse.ArgumentParser(description="Локальный тестовый сервер FunPay.")
+    args.add_argument("--host", default="127.0.0.1")
+    args.add_argument("--port", type=int, default=8080)
+    args.add_argument("--message-rate", type=float, default=5, help="сообщений покупателей в секунду")
+    args.add_argument("--order-rate", type=float, default=0.5, help="заказов в секунду")
+    args.add_argument("--new-buyers", type=float, default=0.3, help="доля событий от новых покупателей")
+    args.add_argument("--error-rate", type=float, default=0, help="доля запросов, на которые отвечать 429")
+    args.add_argument("--latency", type=float, default=0, help="задержка ответа (мс)")
+    args.add_argument("--lots", type=int, default=20, help="кол-во лотов на странице продавца")
+    args.add_argument("--games", type=int, default=0, help="кол-во доп. игр на главной странице")
+    args.add_argument("--report", type=float, default=10, help="как часто выводить статистику (сек.)")
+    args = args.parse_args()
+
+    funpay = FakeFunPay(args.message_rate, args.order_rate, args.new_buyers, args.error_rate, args.latency,
+                        args.lots, args.games)
+    server = create_server(funpay, args.host, args.port)
+    Thread(target=server.serve_forever, daemon=True).start()
+    funpay.start_generators()
+    print(json.dumps({"fake_funpay": f"http://{args.host}:{server.server_address[1]}"}), flush=True)
+    try:
+        while True:
+            time.sleep(args.report)
+            print(json.dumps(funpay.stats(), ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        funpay.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Бенчмарк логгера: сколько записей в секунду успевает записать поток, который пишет логи, при синхронной записи
+(хэндлеры вызываются в этом же потоке) и при записи через очередь (Utils.logger.start_queue_logging).
+Для записи через очередь также измеряется полное время, включая запись всех записей в файл.
+
+Логи пишутся во временную папку, консольный вывод направляется в os.devnull.
+
+Запуск: python -m benchmarks.logging_throughput [кол-во записей] [--json]
+Результат выводится в формате JSON (по одной строке на режим).
+"""
+
+from __future__ import annotations
+
+import logging.config
+import logging
+import tempfile
+import copy
+import json
+import time
+import sys
+import os
+
+from Utils import logger as fpc_logger
+
+
+def configure(folder: str, json_sink: bool):
+    config = copy.deepcopy(fpc_logger.LOGGER_CONFIG)
+    config["handlers"]["file_handler"]["filename"] = os.path.join(folder, "log.log")
+    config["handlers"]["cli_handler"]["stream"] = open(os.devnull, "w", encoding="utf-8")
+    logging.config.dictConfig(config)
+    if json_sink:
+        fpc_logger.add_json_sink(os.path.join(folder, "log.jsonl"))
+
+
+def run(amount: int, queued: bool, json_sink: bool) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        configure(folder, json_sink)
+        if queued:
+            fpc_logger.start_queue_logging()
+        log = logging.getLogger("FPC.benchmark")
+        start = time.perf_counter()
+        for i in range(amount):
+            if i % 10 == 0:
+                log.debug(f"Отладочная запись $YELLOW{i}$RESET.")
+            else:
+                log.info(f"$MAGENTAЗапись $YELLOW#{i}$RESET: получено сообщение в чате $YELLOW{i % 100}$RESET.")
+        emitted = time.perf_counter() - start
+        fpc_logger.stop_queue_logging()
+        total = time.perf_counter() - start
+        logging.shutdown()
+        for name in fpc_logger.LOGGER_CONFIG["loggers"]:
+            logging.getLogger(name).handlers = []
+    return {"benchmark": "logging_throughput", "mode": "queue" if queued else "sync", "json_sink": json_sink,
+            "records": amount, "caller_records_per_sec": round(amount / emitted),
+            "total_records_per_sec": round(amount / total)}
+
+
+def main(amount: int = 50_000, json_sink: bool = False):
+    for queued in (False, True):
+        print(json.dumps(run(amount, queued, json_sink)))
+
+
+if __name__ == "__main__":
+    args = [i for i in sys.argv[1:] if not i.startswith("--")]
+    main(int(args[0]) if args else 50_000, "--json" in sys.argv)
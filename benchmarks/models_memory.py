@@ -0,0 +1,83 @@
+"""
+Бенчмарк памяти моделей FunPayAPI: сколько байт занимает один объект чата / сообщения / заказа / лота
+с сохранением HTML кода (keepHTML = 1) и без него (keepHTML = 0, по умолчанию).
+
+Запуск: python -m benchmarks.models_memory [кол-во объектов]
+Результат выводится в формате JSON (по одной строке на класс).
+"""
+
+from __future__ import annotations
+
+import datetime
+import tracemalloc
+import json
+import sys
+
+from FunPayAPI import types
+from FunPayAPI.common.enums import Currency, OrderStatuses, SubCategoryTypes
+
+
+CATEGORY = types.Category(1, "Genshin Impact")
+SUBCATEGORY = types.SubCategory(1, "Аккаунты", SubCategoryTypes.COMMON, CATEGORY)
+SELLER = types.SellerShortcut(1, "seller", True, 5, 100, None)
+
+# Примерные размеры HTML кода виджетов (в символах), снятые с реальных страниц FunPay.
+HTML_SIZES = {
+    "ChatShortcut": 700,
+    "Message": 900,
+    "OrderShortcut": 1500,
+    "LotShortcut": 1300,
+    "MyLotShortcut": 1100,
+}
+
+
+def make_html(class_name: str, index: int) -> str:
+    """
+    Генерирует уникальный HTML код заданного размера (чтобы строки не переиспользовались интерпретатором).
+    """
+    head = f'<a href="https://funpay.com/{class_name.lower()}/{index}/" class="tc-item">'
+    return head + "x" * (HTML_SIZES[class_name] - len(head) - 4) + "</a>"
+
+
+def make_object(class_name: str, index: int, keep_html: bool):
+    html = make_html(class_name, index) if keep_html else None
+    if class_name == "ChatShortcut":
+        return types.ChatShortcut(index, f"user{index}", f"Сообщение {index}", index, index, False, html)
+    if class_name == "Message":
+        return types.Message(index, f"Сообщение {index}", index, f"user{index}", index, f"user{index}", index, html)
+    if class_name == "OrderShortcut":
+        return types.OrderShortcut(f"#A{index:07}", f"Аккаунт {index}, 1 шт.", 100.0, Currency.RUB,
+                                   f"user{index}", index, index, OrderStatuses.PAID, datetime.datetime.now(),
+                                   "Аккаунты", SUBCATEGORY, html)
+    if class_name == "LotShortcut":
+        return types.LotShortcut(index, None, None, f"Аккаунт {index}", 1, 100.0, Currency.RUB, SUBCATEGORY,
+                                 SELLER, False, False, None, html)
+    return types.MyLotShortcut(index, None, None, f"Аккаунт {index}", 1, 100.0, Currency.RUB, SUBCATEGORY,
+                               False, True, html)
+
+
+def measure(class_name: str, amount: int, keep_html: bool) -> float:
+    """
+    :return: кол-во байт на один объект (с учетом всех строк / словарей, созданных конструктором).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make_object(class_name, i, keep_html) for i in range(amount)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / amount
+
+
+def main(amount: int = 10_000):
+    for class_name in HTML_SIZES:
+        with_html = measure(class_name, amount, True)
+        without_html = measure(class_name, amount, False)
+        print(json.dumps({"benchmark": "models_memory", "class": class_name, "objects": amount,
+                          "slots": hasattr(getattr(types, class_name), "__slots__"),
+                          "bytes_per_object_html": round(with_html, 1),
+                          "bytes_per_object_no_html": round(without_html, 1)}))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
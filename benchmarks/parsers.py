@@ -0,0 +1,400 @@
+"""
+Бенчмарк парсеров FunPayAPI на записанных (обезличенных) страницах FunPay из benchmarks/fixtures.
+
+Фикстуры - это шаблоны страниц (string.Template): страница + шаблон одного элемента (чата, сообщения, заказа,
+лота, поля лота). Из них собираются страницы нужного размера (от 10 до 10 000 элементов).
+Запросы к FunPay не отправляются: Account.method подменяется и возвращает собранную страницу.
+
+Запуск: python -m benchmarks.parsers [--sizes 10,100,1000,10000] [--repeats 5] [--cases get_sales,get_user]
+    [--output results.jsonl]
+Результат выводится в формате JSON (по одной строке на пару бенчмарк / размер), в каждой строке есть версия FPC,
+чтобы результаты разных версий можно было сравнивать.
+"""
+
+from __future__ import annotations
+
+from string import Template
+from statistics import median
+import argparse
+import platform
+import json
+import time
+import copy
+import os
+import re
+
+from FunPayAPI import types
+from FunPayAPI.account import Account
+from FunPayAPI.updater.runner import Runner
+from FunPayAPI.common.enums import SubCategoryTypes
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SIZES = [10, 100, 1000, 10000]
+
+ACCOUNT_ID = 10000001
+ACCOUNT_USERNAME = "seller1"
+CSRF_TOKEN = "0000000000000000000000000000000000000000"
+GAME_ID = 1
+GAME_NAME = "Genshin Impact"
+LOTS_SUBCATEGORY_ID = 101
+CHIPS_SUBCATEGORY_ID = 201
+SECTION_SIZE = 100
+"""Кол-во лотов в одной подкатегории на странице пользователя."""
+CHAT_SIZE = 50
+"""Кол-во сообщений в одном chat_node (FunPay отдает до 50 сообщений на личный чат)."""
+SELLERS = 500
+"""Кол-во уникальных продавцов на странице подкатегории."""
+
+
+def get_version() -> str:
+    """
+    :return: версия FPC из main.py.
+    """
+    try:
+        with open(os.path.join(os.path.dirname(FIXTURES_DIR), "..", "main.py"), "r", encoding="utf-8") as f:
+            return re.search(r'VERSION = "(.+?)"', f.read()).group(1)
+    except:
+        return "unknown"
+
+
+def load_text(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def load_template(name: str) -> Template:
+    return Template(load_text(name))
+
+
+def load_json(name: str):
+    return json.loads(load_text(name))
+
+
+def page(name: str, items: str, **kwargs) -> bytes:
+    """
+    Собирает страницу из шаблона.
+
+    :param name: название шаблона страницы.
+    :param items: HTML код элементов.
+
+    :return: страница в байтах (как response.content).
+    """
+    return load_template(name).safe_substitute(title="FunPay", csrf=CSRF_TOKEN, account_id=ACCOUNT_ID,
+                                               username=ACCOUNT_USERNAME, items=items, **kwargs).encode()
+
+
+def order_id(index: int) -> str:
+    return f"A{index:07d}"
+
+
+def buyer(index: int) -> tuple[int, str]:
+    return 20000000 + index, f"buyer{index}"
+
+
+def build_chat_bookmarks(amount: int, node_msg_offset: int = 0) -> dict:
+    """
+    :return: объект chat_bookmarks ответа runner'а с amount чатами.
+    """
+    fixture = load_json("runner.json")
+    item = Template(fixture["chat_bookmarks_item"])
+    items = []
+    for i in range(amount):
+        user_id, username = buyer(i)
+        items.append(item.safe_substitute(chat_id=30000000 + i, node_msg=1000000 + i * 10 + node_msg_offset,
+                                          user_msg=1000000 + i * 10, username=username,
+                                          unread=" unread" if i % 3 == 0 else "",
+                                          text=f"Здравствуйте! Сообщение {i}"))
+    obj = fixture["chat_bookmarks"]
+    obj["id"] = ACCOUNT_ID
+    obj["data"]["html"] = Template(obj["data"]["html"]).safe_substitute(account_id=ACCOUNT_ID, items="".join(items))
+    return obj
+
+
+def build_orders_counters() -> dict:
+    """
+    :return: объект orders_counters ответа runner'а.
+    """
+    obj = load_json("runner.json")["orders_counters"]
+    obj["id"] = ACCOUNT_ID
+    return obj
+
+
+def build_chat_nodes(amount: int) -> tuple[dict[int, str], list[dict]]:
+    """
+    :return: ({ID чата: никнейм собеседника}, объекты chat_node ответа runner'а) с amount сообщениями,
+        разбитыми на чаты по CHAT_SIZE сообщений.
+    """
+    fixture = load_json("runner.json")
+    user_message = Template(fixture["chat_node_messages"]["user"])
+    system_message = Template(fixture["chat_node_messages"]["system"])
+    texts = [Template(i) for i in load_json("messages.json")]
+    chats_data, objects = {}, []
+    for chat_index in range((amount + CHAT_SIZE - 1) // CHAT_SIZE):
+        user_id, username = buyer(chat_index)
+        chat_id = 30000000 + chat_index
+        messages = []
+        for i in range(chat_index * CHAT_SIZE, min(amount, (chat_index + 1) * CHAT_SIZE)):
+            text = texts[i % len(texts)].safe_substitute(buyer=username, seller=ACCOUNT_USERNAME,
+                                                         order_id=order_id(i))
+            message_id = 1000000 + i
+            if text.startswith(("Покупатель", "The buyer", "Продавец", "Заказ")):
+                author_id = 0
+                html = system_message.safe_substitute(message_id=message_id, text=text)
+            else:
+                author_id, author = (user_id, username) if i % 2 else (ACCOUNT_ID, ACCOUNT_USERNAME)
+                html = user_message.safe_substitute(message_id=message_id, author_id=author_id, author=author,
+                                                    text=text)
+            messages.append({"id": message_id, "author": author_id, "html": html})
+        obj = copy.deepcopy(fixture["chat_node"])
+        id1, id2 = sorted([ACCOUNT_ID, user_id])
+        obj["id"] = f"users-{id1}-{id2}"
+        obj["data"]["node"].update({"id": chat_id, "name": f"users-{id1}-{id2}"})
+        obj["data"]["messages"] = messages
+        chats_data[chat_id] = username
+        objects.append(obj)
+    return chats_data, objects
+
+
+def build_messages(amount: int) -> list[types.Message]:
+    """
+    :return: amount объектов сообщений (тип сообщения не определен).
+    """
+    texts = [Template(i) for i in load_json("messages.json")]
+    result = []
+    for i in range(amount):
+        user_id, username = buyer(i)
+        text = texts[i % len(texts)].safe_substitute(buyer=username, seller=ACCOUNT_USERNAME, order_id=order_id(i))
+        result.append(types.Message(i, text, 30000000 + i, username, user_id, username, 0, None,
+                                    determine_msg_type=False))
+    return result
+
+
+def build_user_page(amount: int) -> bytes:
+    """
+    :return: страница users/<id>/ с amount лотами, разбитыми на подкатегории по SECTION_SIZE лотов.
+    """
+    section = load_template("users_section.html")
+    item = load_template("users_item.html")
+    sections = []
+    for section_index in range((amount + SECTION_SIZE - 1) // SECTION_SIZE):
+        currency = section_index % 2
+        section_type = "chips" if currency else "lots"
+        subcategory_id = (CHIPS_SUBCATEGORY_ID if currency else LOTS_SUBCATEGORY_ID) + section_index // 2
+        items = "".join(item.safe_substitute(section_type=section_type, offer_id=40000000 + i, amount=i % 50 + 1,
+                                             price=f"{100 + i % 900}.5")
+                        for i in range(section_index * SECTION_SIZE, min(amount, (section_index + 1) * SECTION_SIZE)))
+        sections.append(section.safe_substitute(section_type=section_type, subcategory_id=subcategory_id,
+                                                subcategory_name=GAME_NAME, items=items))
+    return page("users.html", "", profile_username="user1", sections="".join(sections))
+
+
+def build_sales_page(amount: int) -> bytes:
+    """
+    :return: страница orders/trade с amount заказами.
+    """
+    item = load_template("orders_trade_item.html")
+    statuses = [(" info", "Оплачен"), ("", "Закрыт"), (" warning", "Возврат")]
+    items = []
+    for i in range(amount):
+        buyer_id, buyer_name = buyer(i)
+        status_class, status_text = statuses[i % len(statuses)]
+        items.append(item.safe_substitute(order_id=order_id(i), status_class=status_class, status_text=status_text,
+                                          date="12 мая, 14:05" if i % 2 else "сегодня, 14:05",
+                                          game_name=GAME_NAME, section_name="Аккаунты" if i % 4 else "Мора",
+                                          buyer_id=buyer_id, buyer=buyer_name, price=f"{100 + i % 900}.5"))
+    return page("orders_trade.html", "".join(items), game_id=GAME_ID, game_name=GAME_NAME,
+                lots_subcategory_id=LOTS_SUBCATEGORY_ID, chips_subcategory_id=CHIPS_SUBCATEGORY_ID,
+                next_order_id=order_id(amount))
+
+
+def build_subcategory_page(subcategory_type: SubCategoryTypes, amount: int) -> bytes:
+    """
+    :return: страница lots/<id>/ или chips/<id>/ с amount лотами.
+    """
+    name = "lots" if subcategory_type is SubCategoryTypes.COMMON else "chips"
+    item = load_template(f"{name}_item.html")
+    items = []
+    for i in range(amount):
+        seller_index = i % SELLERS
+        online = seller_index % 2
+        items.append(item.safe_substitute(offer_id=40000000 + i, promo=" offer-promo" if i < 3 else "",
+                                          online=" online" if online else "", online_flag=online,
+                                          auto_flag=i % 2, server_id=i % 4 + 1,
+                                          subcategory_id=CHIPS_SUBCATEGORY_ID, seller_id=50000000 + seller_index,
+                                          seller=f"seller{seller_index}", reviews=seller_index * 3,
+                                          amount=f"{i % 50 + 1} 000" if name == "chips" else i % 50 + 1,
+                                          price=f"{100 + i % 900}.5" if name == "lots" else f"0.{i % 90 + 10}"))
+    return page(f"{name}.html", "".join(items), subcategory_name=GAME_NAME)
+
+
+def build_offer_edit_page(amount: int) -> bytes:
+    """
+    :return: страница lots/offerEdit с amount доп. полями.
+    """
+    item = load_template("offer_edit_item.html")
+    items = "".join(item.safe_substitute(field_id=i, field_value=f"Значение {i}") for i in range(amount))
+    return page("offer_edit.html", items, offer_id=40000000, subcategory_id=LOTS_SUBCATEGORY_ID, amount=5,
+                price="1000")
+
+
+class FakeResponse:
+    """
+    Ответ на подмененный запрос (вместо requests.Response).
+    """
+    def __init__(self, content: bytes):
+        self.status_code = 200
+        self.content = content
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def make_categories(amount: int = 100) -> list[types.Category]:
+    """
+    :return: дерево категорий с подкатегориями, на которые ссылаются фикстуры.
+    """
+    category = types.Category(GAME_ID, GAME_NAME)
+    for i in range(amount):
+        category.add_subcategory(types.SubCategory(LOTS_SUBCATEGORY_ID + i, "Аккаунты", SubCategoryTypes.COMMON,
+                                                   category, i))
+        category.add_subcategory(types.SubCategory(CHIPS_SUBCATEGORY_ID + i, "Мора", SubCategoryTypes.CURRENCY,
+                                                   category, amount + i))
+    return [category]
+
+
+def make_account() -> Account:
+    """
+    Создает инициализированный аккаунт без запроса к FunPay. Страницы для ответов кладутся в account.pages
+    ({начало метода API: страница}).
+    """
+    account = Account("0" * 32)
+    account._Account__initiated = True
+    account._Account__set_categories(make_categories())
+    account.id = ACCOUNT_ID
+    account.username = ACCOUNT_USERNAME
+    account.csrf_token = CSRF_TOKEN
+    account.pages = {}
+
+    def method(request_method, api_method, headers, payload, *args, **kwargs):
+        for prefix, content in account.pages.items():
+            if api_method.startswith(prefix):
+                return FakeResponse(content)
+        raise KeyError(api_method)
+
+    account.method = method
+    return account
+
+
+def make_runner(account: Account, disable_message_requests: bool = False) -> Runner:
+    account.runner = None
+    return Runner(account, disable_message_requests)
+
+
+def measure(setup, run, repeats: int) -> list[float]:
+    """
+    :param setup: подготовка (не замеряется), возвращает аргумент для run.
+    :param run: замеряемая функция.
+    :param repeats: кол-во повторов.
+
+    :return: время выполнения run (в секундах) в каждом из повторов.
+    """
+    result = []
+    for _ in range(repeats):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        result.append(time.perf_counter() - start)
+    return result
+
+
+def cases(account: Account, amount: int) -> dict:
+    """
+    :return: бенчмарки для amount элементов {название: (подготовка, замеряемая функция)}.
+    """
+    bookmarks = build_chat_bookmarks(amount)
+    changed_bookmarks = build_chat_bookmarks(amount, node_msg_offset=1)
+    orders_counters = build_orders_counters()
+    chats_data, chat_nodes = build_chat_nodes(amount)
+    messages = build_messages(amount)
+    account.pages = {
+        "users/": build_user_page(amount),
+        "https://funpay.com/orders/trade": build_sales_page(amount),
+        "lots/offerEdit": build_offer_edit_page(amount),
+        "lots/": build_subcategory_page(SubCategoryTypes.COMMON, amount),
+        "chips/": build_subcategory_page(SubCategoryTypes.CURRENCY, amount),
+    }
+
+    def runner_after_first_request():
+        # Второй запрос: во всех чатах новые сообщения (без доп. запросов истории чатов).
+        runner = make_runner(account, disable_message_requests=True)
+        runner.parse_updates([bookmarks])
+        return runner
+
+    def get_lots(_):
+        profile = account.get_user(ACCOUNT_ID)
+        profile.get_lots()
+
+    def get_message_types(_):
+        for message in messages:
+            message.get_message_type()
+
+    return {
+        "Runner.parse_chat_updates[initial]": (lambda: make_runner(account),
+                                               lambda runner: runner.parse_chat_updates(bookmarks)),
+        "Runner.parse_chat_updates[changed]": (runner_after_first_request,
+                                               lambda runner: runner.parse_chat_updates(changed_bookmarks)),
+        "Runner.parse_updates[initial]": (lambda: make_runner(account),
+                                          lambda runner: runner.parse_updates([bookmarks, orders_counters])),
+        "Account.parse_chats_histories": (lambda: None,
+                                          lambda _: account.parse_chats_histories(chats_data, chat_nodes)),
+        "Account.get_user": (lambda: None, lambda _: account.get_user(ACCOUNT_ID)),
+        "Account.get_user+UserProfile.get_lots": (lambda: None, get_lots),
+        "Account.get_sales": (lambda: None, lambda _: account.get_sales()),
+        "Account.get_subcategory_public_lots[lots]": (
+            lambda: None,
+            lambda _: account.get_subcategory_public_lots(SubCategoryTypes.COMMON, LOTS_SUBCATEGORY_ID)),
+        "Account.get_subcategory_public_lots[chips]": (
+            lambda: None,
+            lambda _: account.get_subcategory_public_lots(SubCategoryTypes.CURRENCY, CHIPS_SUBCATEGORY_ID)),
+        "Account.get_lot_fields": (lambda: None, lambda _: account.get_lot_fields(40000000)),
+        "Message.get_message_type": (lambda: None, get_message_types),
+    }
+
+
+def main():
+    args = argparse.ArgumentParser(description="Бенчмарк парсеров FunPayAPI.")
+    args.add_argument("--sizes", default=",".join(str(i) for i in SIZES),
+                      help="размеры фикстур (кол-во элементов) через запятую")
+    args.add_argument("--repeats", type=int, default=5, help="кол-во повторов каждого замера")
+    args.add_argument("--cases", default="", help="запускать только бенчмарки, название которых содержит "
+                                                  "одну из подстрок (через запятую)")
+    args.add_argument("--output", default=None, help="файл, в который дописываются результаты (JSON lines)")
+    args = args.parse_args()
+
+    sizes = [int(i) for i in args.sizes.split(",") if i.strip()]
+    filters = [i.strip() for i in args.cases.split(",") if i.strip()]
+    meta = {"version": get_version(), "python": platform.python_version(), "time": int(time.time())}
+    account = make_account()
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    try:
+        for amount in sizes:
+            for name, (setup, run) in cases(account, amount).items():
+                if filters and not any(i in name for i in filters):
+                    continue
+                timings = measure(setup, run, args.repeats)
+                line = json.dumps({"benchmark": "parsers", "case": name, "items": amount, "repeats": args.repeats,
+                                   "min": round(min(timings), 6), "median": round(median(timings), 6),
+                                   "per_item_us": round(min(timings) / amount * 1_000_000, 3), **meta},
+                                  ensure_ascii=False)
+                print(line, flush=True)
+                if output:
+                    output.write(line + "\n")
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Callable
 if TYPE_CHECKING:
     from configparser import ConfigParser
+    import tg_bot.bot
 
-from tg_bot import auto_response_cp, config_loader_cp, auto_delivery_cp, templates_cp, plugins_cp, file_uploader
 from types import ModuleType
 import Utils.exceptions
 from uuid import UUID
+from pathlib import Path
 import importlib.util
 import configparser
 import itertools
@@ -23,13 +24,21 @@ import handlers
 import announcements
 
 from Utils import cardinal_tools
-import tg_bot.bot
+from Utils.startup_profiler import StartupProfiler
+from Utils.orders_loader import OrdersLoader
+from Utils.raise_scheduler import RaiseScheduler
+from Utils.profile_refresher import ProfileRefresher
+from Utils import metrics_server
+from FunPayAPI.common.tracing import TRACER
 
 from threading import Thread
 
 
 logger = logging.getLogger("FPC")
 
+UNAUTHORIZED_INIT_ATTEMPTS = 5
+"""Кол-во ошибок авторизации подряд, после которых доп. аккаунт прекращает попытки инициализации."""
+
 
 def check_proxy(proxy: dict) -> bool:
     logger.info("Выполняю проверку прокси...")
@@ -88,7 +97,9 @@ class PluginData:
 
 class Cardinal(object):
     def __new__(cls, *args, **kwargs):
-        # Singleton
+        # Singleton (доп. аккаунты мульти-аккаунтного режима - отдельные экземпляры, см. Utils.accounts_supervisor)
+        if kwargs.get("name") is not None:
+            return super(Cardinal, cls).__new__(cls)
         if not hasattr(cls, "instance"):
             cls.instance = super(Cardinal, cls).__new__(cls)
         return getattr(cls, "instance")
@@ -97,8 +108,18 @@ class Cardinal(object):
                  auto_delivery_config: ConfigParser,
                  auto_response_config: ConfigParser,
                  raw_auto_response_config: ConfigParser,
-                 version: str):
+                 version: str,
+                 name: str | None = None,
+                 storage_dir: str = "storage"):
         self.VERSION = version
+        self.name = name  # Название доп. аккаунта (None для основного аккаунта).
+        self.storage_dir = storage_dir  # Папка storage аккаунта.
+        self.products_dir = f"{storage_dir}/products"  # Папка с товарными файлами аккаунта.
+        self.images_dir = f"{storage_dir}/images"  # Папка с изображениями для $photo=<путь> аккаунта.
+        self.supervisor = None  # Супервизор мульти-аккаунтного режима (если есть доп. аккаунты).
+        self.metrics_server: metrics_server.MetricsServer | None = None  # HTTP-сервер метрик (/metrics).
+        self.events_count = 0  # Кол-во обработанных event'ов (для статистики мульти-аккаунтного режима).
+        self.runner_state_saved: float = 0  # Время последнего сохранения снапшота состояния чатов Runner'а.
         self.instance_id = random.randint(0, 999999999)
         self.delivery_tests = {}  # Одноразовые ключи для тестов автовыдачи. {"ключ": "название лота"}
 
@@ -126,7 +147,13 @@ class Cardinal(object):
 
         self.account = FunPayAPI.Account(self.MAIN_CFG["FunPay"]["golden_key"],
                                          self.MAIN_CFG["FunPay"]["user_agent"],
-                                         proxy=self.proxy)
+                                         proxy=self.proxy,
+                                         keep_html=self.MAIN_CFG["Other"].getboolean("keepHTML", fallback=False),
+                                         categories_cache=f"{storage_dir}/cache/categories.json",
+                                         images_cache=f"{storage_dir}/cache/images.json",
+                                         base_url=self.MAIN_CFG["FunPay"].get("baseUrl", fallback="").strip())
+        # Загрузчик полной информации о заказах (объединяет одновременные запросы в один, кэширует заказы).
+        self.orders_loader = OrdersLoader(self.account)
 
         self.runner: FunPayAPI.Runner | None = None
 
@@ -136,17 +163,21 @@ class Cardinal(object):
         self.run_id = 0
         self.start_time = int(time.time())
 
-        self.raise_time = {}  # Временные метки поднятия категорий {id игры: след. время поднятия}
+        self.raise_scheduler = RaiseScheduler(self)  # Планировщик поднятия лотов (очередь категорий по времени).
         self.profile: FunPayAPI.types.UserProfile | None = None  # FunPay профиль для всего кардинала (+ хэндлеров)
         self.tg_profile: FunPayAPI.types.UserProfile | None = None  # FunPay профиль (для Telegram-ПУ)
         self.last_tg_profile_update = datetime.datetime.now()  # Последнее время обновления профиля для TG-ПУ
         self.curr_profile: FunPayAPI.types.UserProfile | None = None  # Текущий профиль (для восст. / деакт. лотов.)
         # Тег последнего event'а, после которого обновлялся self.current_profile
         self.curr_profile_last_tag: str | None = None
+        # Обновление self.curr_profile после изменения списка заказов (объединяет запросы нескольких event'ов подряд).
+        self.profile_refresher = ProfileRefresher(
+            self, debounce=self.MAIN_CFG["Other"].getfloat("profileRefreshDebounce", fallback=1),
+            min_interval=self.MAIN_CFG["Other"].getfloat("profileRefreshInterval", fallback=5))
         # Тег последнего event'а, после которого обновлялось состояние лотов.
         self.last_state_change_tag: str | None = None
         self.block_list = cardinal_tools.load_block_list()  # ЧС.
-        self.old_users = cardinal_tools.load_old_users()  # Уже написавшие пользователи.
+        self.old_users = cardinal_tools.load_old_users(storage_dir)  # Уже написавшие пользователи.
 
         # Хэндлеры
         self.pre_init_handlers = []
@@ -197,8 +228,11 @@ class Cardinal(object):
 
     def __init_account(self) -> None:
         """
-        Инициализирует класс аккаунта (self.account)
+        Инициализирует класс аккаунта (self.account).
+        Доп. аккаунт прекращает попытки после UNAUTHORIZED_INIT_ATTEMPTS ошибок авторизации подряд
+        (скорее всего, неверный golden_key), основной аккаунт повторяет попытки бесконечно.
         """
+        unauthorized = 0
         while True:
             try:
                 self.account.get()
@@ -208,7 +242,13 @@ class Cardinal(object):
                 break
             except TimeoutError:
                 logger.error("Не удалось загрузить данные об аккаунте: превышен тайм-аут ожидания.")
-            except (FunPayAPI.exceptions.UnauthorizedError, FunPayAPI.exceptions.RequestFailedError) as e:
+            except FunPayAPI.exceptions.UnauthorizedError as e:
+                logger.error(e.short_str())
+                logger.debug(e)
+                unauthorized += 1
+                if self.name is not None and unauthorized >= UNAUTHORIZED_INIT_ATTEMPTS:
+                    raise
+            except FunPayAPI.exceptions.RequestFailedError as e:
                 logger.error(e.short_str())
                 logger.debug(e)
             except:
@@ -239,8 +279,8 @@ class Cardinal(object):
             try:
                 profile = self.account.get_user(self.account.id)
                 logger.info(f"$MAGENTAПолучил информацию о лотах аккаунта. Всего категорий: "
-                            f"$YELLOW{len(profile.get_sorted_lots(2))}.")
-                logger.info(f"$MAGENTAВсего лотов: $YELLOW{len(profile.get_lots())}")
+                            f"$YELLOW{len(profile.get_subcategories())}.")
+                logger.info(f"$MAGENTAВсего лотов: $YELLOW{len(profile.get_lots_ids())}")
                 break
             except TimeoutError:
                 logger.error("Не удалось загрузить данные о лотах аккаунта: превышен тайм-аут ожидания.")
@@ -267,92 +307,103 @@ class Cardinal(object):
         if update_main_profile:
             self.profile = profile
             self.curr_profile = profile
-            self.lots_ids = [i.id for i in profile.get_lots()]
+            self.lots_ids = profile.get_lots_ids()
+            self.raise_scheduler.update_profile(profile)
             logger.info(f"Обновил информацию о профиле, лотах "
-                        f"$YELLOW({len(profile.get_lots())})$RESET и категориях "
-                        f"$YELLOW({len(profile.get_sorted_lots(2))})$RESET. ")
+                        f"$YELLOW({len(profile.get_lots_ids())})$RESET и категориях "
+                        f"$YELLOW({len(profile.get_subcategories())})$RESET. ")
         if update_telegram_profile:
             self.tg_profile = profile
             self.last_telegram_lots_update = datetime.datetime.now()
-            logger.info(f"Обновлена информация об активных лотах $YELLOW({len(profile.get_lots())})$RESET для ПУ TG.")
+            logger.info(f"Обновлена информация об активных лотах $YELLOW({len(profile.get_lots_ids())})$RESET "
+                        f"для ПУ TG.")
         return True
 
     def __init_telegram(self) -> None:
         """
         Инициализирует Telegram бота.
         """
-        self.telegram = tg_bot.bot.TGBot(self)
+        # Модули Telegram бота (и aiohttp для асинхронного режима) импортируются только если бот включен.
+        if self.MAIN_CFG["Telegram"].getboolean("asyncMode", fallback=False):
+            from tg_bot.async_bot import AsyncTGBot
+            self.telegram = AsyncTGBot(self)
+        else:
+            from tg_bot.bot import TGBot
+            self.telegram = TGBot(self)
         self.telegram.init()
 
-    # Прочее
-    def raise_lots(self) -> int:
+    def __run_telegram(self) -> None:
         """
-        Пытается поднять лоты.
-
-        :return: предположительное время, когда нужно снова запустить данную функцию.
+        Устанавливает меню команд и запускает Telegram бота (вызывается в отдельном потоке).
         """
-        # Время следующего вызова функции (по умолчанию - бесконечность).
-        next_call = float("inf")
-
-        for subcat in self.profile.get_sorted_lots(2):
-            # Если id категории текущей подкатегории уже находится в self.game_ids, но время поднятия подкатегорий
-            # данной категории еще не настало - пропускам эту подкатегорию.
-            if subcat.type is FunPayAPI.types.SubCategoryTypes.CURRENCY:
-                continue
-            if (saved_time := self.raise_time.get(subcat.category.id)) and saved_time > int(time.time()):
-                # Если записанное в self.game_ids время меньше текущего next_call'а
-                # обновляем время next_call'a на записанное время.
-                next_call = saved_time if saved_time < next_call else next_call
-                continue
-
-            # В любом другом случае пытаемся поднять лоты всех категорий, относящихся к игре subcat.game_id
+        with StartupProfiler().phase("telegram: setup_commands"):
             try:
-                time.sleep(0.5)
-                result = self.account.raise_subcategories(subcat.category.id, subcat.id)
-            except Exception as e:
-                if isinstance(e, FunPayAPI.exceptions.RequestFailedError) and e.status_code == 429:
-                    logger.warning(f"Ошибка 429 при поднятии категории \"{subcat.fullname}\". Пауза на 10 сек...")
-                    time.sleep(10)
-                    next_time = int(time.time()) + 1
-                else:
-                    logger.error(f"Произошла непредвиденная ошибка при попытке поднять категорию \"{subcat.fullname}. "
-                                 f"(следующая попытка для данной категории через 10 секунд.)")
-                    logger.debug("TRACEBACK", exc_info=True)
-                    next_time = int(time.time()) + 10
-                next_call = next_time if next_time < next_call else next_call
-                continue
+                self.telegram.setup_commands()
+            except:
+                logger.error("Не удалось установить меню команд Telegram бота.")
+                logger.debug("TRACEBACK", exc_info=True)
+        self.telegram.run()
 
-            if not result.complete:
-                logger.warning(f"Не удалось поднять лоты категории \"{subcat.category.name}\". "
-                               f"FunPay говорит подождать еще {cardinal_tools.time_to_str(result.wait)}.")
-                logger.debug(f"Ответ FunPay: {result.funpay_response}")
-                next_time = int(time.time()) + result.wait
-            else:
-                for i in result.raised_subcategories:
-                    logger.info(f"Поднял лоты подкатегории \"{i.fullname}\". ")
-                logger.info(f"Все подкатегории, относящиеся к игре {subcat.category.name} (ID: {subcat.category.id}) "
-                            f"подняты!")
-                logger.info(f"Следующая попытка через {cardinal_tools.time_to_str(result.wait)}.")
-                next_time = int(time.time()) + result.wait
-            self.run_handlers(self.post_lots_raise_handlers, (self, result))
+    def __init_runner_state(self) -> None:
+        """
+        Устанавливает лимит памяти состояния чатов Runner'а и восстанавливает горячие чаты из снапшота.
+        """
+        self.runner.state.set_max_bytes(self.MAIN_CFG["Other"].getint("runnerStateMemoryMB", fallback=32) * 1048576)
+        try:
+            if self.runner.state.load(f"{self.storage_dir}/cache/runner_state.json"):
+                logger.info(f"Восстановлено состояние чатов Runner'а: $YELLOW{len(self.runner.state)}$RESET чатов.")
+        except:
+            logger.warning("Не удалось восстановить состояние чатов Runner'а.")
+            logger.debug("TRACEBACK", exc_info=True)
+        self.runner_state_saved = time.time()
+
+    def save_runner_state(self) -> None:
+        """
+        Сохраняет снапшот горячих чатов Runner'а (восстанавливается при следующем запуске).
+        """
+        self.runner_state_saved = time.time()
+        try:
+            self.runner.state.save(f"{self.storage_dir}/cache/runner_state.json")
+        except:
+            logger.warning("Не удалось сохранить состояние чатов Runner'а.")
+            logger.debug("TRACEBACK", exc_info=True)
 
-            self.raise_time[subcat.category.id] = next_time
-            next_call = next_time if next_time < next_call else next_call
-        return next_call
+    def __init_metrics_server(self, host: str, port: int) -> None:
+        """
+        Запускает HTTP-сервер метрик. Ошибка запуска (например, занят порт) не прерывает инициализацию.
+        """
+        try:
+            self.metrics_server = metrics_server.MetricsServer(self, host, port)
+            self.metrics_server.start()
+        except:
+            self.metrics_server = None
+            logger.error(f"Не удалось запустить сервер метрик на $YELLOW{host}:{port}$RESET.")
+            logger.debug("TRACEBACK", exc_info=True)
 
-    def split_message(self, text: str) -> list[str | int]:
+    # Прочее
+    def split_message(self, text: str) -> list[str | int | Path]:
         """
         Разбивает сообщения по 20 строк, отделяет изображения от текста.
-        (обозначение изображения: $photo=1234567890)
+        (обозначение изображения: $photo=1234567890 или $photo=storage/images/image.png)
+        Изображения по пути отправляются только из папки изображений аккаунта (self.images_dir).
         :param text: текст сообщения.
-        :return: набор текстов сообщений / изображений.
-        """
-        photos = [int(i.split("=")[1]) for i in cardinal_tools.PHOTO_RE.findall(text)]
+        :return: набор текстов сообщений / изображений (ID или путь до файла).
+        """
+        photos = []
+        for i in (j.split("=", 1)[1] for j in cardinal_tools.PHOTO_RE.findall(text)):
+            if i.isdigit():
+                photos.append(int(i))
+            elif path := cardinal_tools.resolve_image_path(i, self.images_dir):
+                photos.append(Path(path))
+            else:
+                logger.warning(f"Изображение $YELLOW{i}$RESET находится вне папки $YELLOW{self.images_dir}"
+                               f"$RESET и не будет отправлено.")
+                photos.append(None)
         texts = cardinal_tools.PHOTO_RE.split(text)
         objects = [x for x in itertools.chain.from_iterable(itertools.zip_longest(texts, photos)) if x]
         result = []
         for i in objects:
-            if isinstance(i, int):
+            if isinstance(i, (int, Path)):
                 result.append(i)
                 continue
 
@@ -390,12 +441,16 @@ class Cardinal(object):
             current_attempts = attempts
             while current_attempts:
                 try:
-                    if isinstance(mes, int):
-                        msg = self.account.send_message(chat_id, None, chat_name, mes)
+                    if isinstance(mes, Path):
+                        # Изображение выгружается один раз, далее ID берется из кэша.
+                        msg = self.account.send_image(chat_id, str(mes), chat_name)
+                    elif isinstance(mes, int):
+                        msg = self.account.send_message(chat_id, None, chat_name, image_id=mes)
                     else:
                         msg = self.account.send_message(chat_id, mes, chat_name)
                     if msg:
                         logger.info(f"Отправил сообщение в чат $YELLOW{chat_id}.")
+                        metrics_server.MESSAGES_SENT.inc(metrics_server.account_label(self), "success")
                         break
                 except:
                     logger.warning(f"Произошла ошибка при отправке сообщения в чат $YELLOW{chat_id}.$RESET")
@@ -406,6 +461,7 @@ class Cardinal(object):
             else:
                 logger.error(f"Не удалось отправить сообщение в чат $YELLOW{chat_id}$RESET: "
                              f"превышено кол-во попыток.")
+                metrics_server.MESSAGES_SENT.inc(metrics_server.account_label(self), "failure")
                 return None
         return msg
 
@@ -444,6 +500,7 @@ class Cardinal(object):
         Запускает хэндлеры, привязанные к тому или иному событию.
         """
         instance_id = self.run_id
+        account_label = metrics_server.account_label(self)
         events_handlers = {
             FunPayAPI.events.EventTypes.INITIAL_CHAT: self.init_message_handlers,
             FunPayAPI.events.EventTypes.CHATS_LIST_CHANGED: self.messages_list_changed_handlers,
@@ -456,29 +513,30 @@ class Cardinal(object):
             FunPayAPI.events.EventTypes.ORDER_STATUS_CHANGED: self.order_status_changed_handlers,
         }
 
-        for event in self.runner.listen(requests_delay=int(self.MAIN_CFG["Other"]["requestsDelay"])):
+        requests_delay = int(self.MAIN_CFG["Other"]["requestsDelay"])
+        # Интервал опроса уменьшается до requestsDelayMin после активности и увеличивается до requestsDelayMax,
+        # если активности нет (см. FunPayAPI.updater.polling).
+        for event in self.runner.listen(
+                requests_delay=requests_delay,
+                min_delay=self.MAIN_CFG["Other"].getfloat("requestsDelayMin", fallback=requests_delay),
+                max_delay=self.MAIN_CFG["Other"].getfloat("requestsDelayMax", fallback=requests_delay * 2)):
             if instance_id != self.run_id:
                 break
-            self.run_handlers(events_handlers[event.type], (self, event))
+            self.events_count += 1
+            metrics_server.EVENTS.inc(account_label, event.type.name)
+            with TRACER.activate(event.trace):
+                self.run_handlers(events_handlers[event.type], (self, event))
+            TRACER.finish(event.trace)
+            if time.time() - self.runner_state_saved > 300:
+                self.save_runner_state()
 
     def lots_raise_loop(self):
         """
-        Запускает бесконечный цикл поднятия категорий (если autoRaise в _main.cfg == 1)
+        Запускает бесконечный цикл поднятия категорий (если autoRaise в _main.cfg == 1).
+        Поток спит до времени поднятия ближайшей категории (см. Utils.raise_scheduler).
         """
-        if not self.profile.get_lots():
-            logger.info("$CYAN Цикл автоподнятия не был запущен, т.к. на аккаунте не обнаружен лотов.")
-            return
-
         logger.info("$CYANЦикл автоподнятия лотов запущен (это не значит, что автоподнятие лотов включено).")
-        while True:
-            if not self.MAIN_CFG["FunPay"].getboolean("autoRaise"):
-                time.sleep(10)
-                continue
-            next_time = self.raise_lots()
-            delay = next_time - int(time.time())
-            if delay <= 0:
-                continue
-            time.sleep(delay)
+        self.raise_scheduler.loop()
 
     def update_session_loop(self):
         """
@@ -497,27 +555,63 @@ class Cardinal(object):
         Инициализирует кардинал: регистрирует хэндлеры, инициализирует и запускает Telegram бота,
         получает данные аккаунта и профиля.
         """
-        self.add_handlers_from_plugin(handlers)
-        self.add_handlers_from_plugin(announcements)
-        self.load_plugins()
-        self.add_handlers()
-
-        if self.MAIN_CFG["Telegram"].getboolean("enabled"):
-            self.__init_telegram()
-            for module in [auto_response_cp, auto_delivery_cp, config_loader_cp, templates_cp, plugins_cp,
-                           file_uploader]:
-                self.add_handlers_from_plugin(module)
+        init_start = time.time()
+        profiler = StartupProfiler()
 
-        self.run_handlers(self.pre_init_handlers, (self, ))
+        # Получение данных аккаунта не зависит от плагинов и Telegram бота, поэтому выполняется параллельно с ними.
+        # Ошибка инициализации аккаунта (например, UnauthorizedError доп. аккаунта) пробрасывается после join().
+        init_error = []
 
-        if self.MAIN_CFG["Telegram"].getboolean("enabled"):
-            self.telegram.setup_commands()
-            Thread(target=self.telegram.run, daemon=True).start()
-
-        self.__init_account()
-        self.runner = FunPayAPI.Runner(self.account)
-        self.__update_profile()
-        self.run_handlers(self.post_init_handlers, (self, ))
+        def init_account():
+            try:
+                with profiler.phase("account: get"):
+                    self.__init_account()
+            except BaseException as e:
+                init_error.append(e)
+        account_thread = Thread(target=init_account, daemon=True)
+        account_thread.start()
+
+        with profiler.phase("handlers + plugins"):
+            self.add_handlers_from_plugin(handlers)
+            # Плагины и Telegram бот есть только у основного аккаунта.
+            if self.name is None:
+                self.add_handlers_from_plugin(announcements)
+                self.load_plugins()
+                self.add_handlers()
+
+        if self.name is None and self.MAIN_CFG["Telegram"].getboolean("enabled"):
+            with profiler.phase("telegram: init"):
+                from tg_bot import (auto_response_cp, config_loader_cp, auto_delivery_cp, templates_cp,
+                                    plugins_cp, file_uploader)
+                self.__init_telegram()
+                for module in [auto_response_cp, auto_delivery_cp, config_loader_cp, templates_cp, plugins_cp,
+                               file_uploader]:
+                    self.add_handlers_from_plugin(module)
+
+        with profiler.phase("pre-init handlers"):
+            self.run_handlers(self.pre_init_handlers, (self, ))
+
+        if self.name is None and self.MAIN_CFG["Telegram"].getboolean("enabled"):
+            Thread(target=self.__run_telegram, daemon=True).start()
+
+        with profiler.phase("account: wait"):
+            account_thread.join()
+        if init_error:
+            raise init_error[0]
+        with profiler.phase("runner"):
+            self.runner = FunPayAPI.Runner(self.account)
+            self.__init_runner_state()
+            # Запросы к runner/ (события, отправка сообщений) выполняются через очередь Runner'а.
+            Thread(target=self.runner.loop, daemon=True).start()
+        with profiler.phase("profile"):
+            self.__update_profile()
+        if self.name is None:
+            TRACER.resize(self.MAIN_CFG["Other"].getint("tracesBufferSize", fallback=1000))
+        if self.name is None and (port := self.MAIN_CFG["Other"].getint("metricsPort", fallback=0)):
+            self.__init_metrics_server(self.MAIN_CFG["Other"].get("metricsHost", fallback="127.0.0.1"), port)
+        with profiler.phase("post-init handlers"):
+            self.run_handlers(self.post_init_handlers, (self, ))
+        logger.info(f"$MAGENTAИнициализация завершена за $YELLOW{time.time() - init_start:.2f}$MAGENTA сек.")
         return self
 
     def run(self):
@@ -530,7 +624,9 @@ class Cardinal(object):
         self.run_handlers(self.post_start_handlers, (self,))
 
         Thread(target=self.lots_raise_loop, daemon=True).start()
-        Thread(target=self.update_session_loop, daemon=True).start()
+        # Данные доп. аккаунтов обновляет супервизор (в общем пуле потоков).
+        if self.name is None:
+            Thread(target=self.update_session_loop, daemon=True).start()
         self.process_events()
 
     def start(self):
@@ -680,7 +776,12 @@ class Cardinal(object):
         for func in handlers_list:
             try:
                 if getattr(func, "plugin_uuid") is None or self.plugins[getattr(func, "plugin_uuid")].enabled:
-                    func(*args)
+                    start = time.perf_counter()
+                    try:
+                        with TRACER.span(func.__name__):
+                            func(*args)
+                    finally:
+                        metrics_server.HANDLER_SECONDS.observe(time.perf_counter() - start, func.__name__)
             except:
                 logger.error("Произошла ошибка при выполнении хэндлера.")
                 logger.debug("TRACEBACK", exc_info=True)
@@ -21,7 +21,15 @@ default_config = {
     "Telegram": {
         "enabled": "0",
         "token": "",
-        "secretKey": "СекретныйПароль"
+        "secretKey": "СекретныйПароль",
+        "digestWindow": "0",
+        "apiUrl": "",
+        "webhookUrl": "",
+        "webhookHost": "127.0.0.1",
+        "webhookPort": "8443",
+        "webhookPath": "/telegram",
+        "webhookSecret": "",
+        "asyncMode": "0"
     },
 
     "BlockList": {
@@ -77,6 +85,7 @@ default_config = {
     "Other": {
         "watermark": "[👾 FunPay Cardinal 👻]",
         "requestsDelay": "4",
+        "keepHTML": "0",
     }
 }
 
@@ -9,19 +9,25 @@ if TYPE_CHECKING:
     from cardinal import Cardinal
 
 from FunPayAPI.types import MessageTypes, RaiseResponse, Message, OrderShortcut, Order
-from FunPayAPI import exceptions, utils as fp_utils
+from FunPayAPI import utils as fp_utils
+from FunPayAPI.common.tracing import TRACER
 from FunPayAPI.updater.events import *
 
 
-from tg_bot import utils, keyboards
+# tg_bot.keyboards (а с ним и telebot) импортируется внутри функций, которые вызываются только с Telegram ботом.
+from tg_bot import utils
 from Utils import cardinal_tools
-from threading import Thread
+from Utils.products_index import ProductsIndex, PRODUCTS_DIR
+from Utils import lots_states
+from Utils import metrics_server
+from threading import Thread, Lock
 import configparser
 import logging
 import time
 import re
 
 LAST_STACK_ID = ""
+LOTS_STATES_LOCK = Lock()
 
 
 logger = logging.getLogger("FPC.handlers")
@@ -65,13 +71,10 @@ def log_msg_handler(cardinal: Cardinal, event: NewMessageEvent):
     Логирует полученное сообщение.
     """
     message_text, name, chat_id = str(event.message), event.message.chat_name, event.message.chat_id
-    logger.info(f"$MAGENTA┌──$RESET Новое сообщение в переписке с пользователем $YELLOW{name} (node: {chat_id}):")
-
-    for index, line in enumerate(message_text.split("\n")):
-        if not index:
-            logger.info(f"$MAGENTA└───> $CYAN{line}")
-        else:
-            logger.info(f"      $CYAN{line}")
+    # Сообщение логируется одной записью (а не по записи на каждую строку).
+    lines = "\n      $CYAN".join(message_text.split("\n"))
+    logger.info(f"$MAGENTA┌──$RESET Новое сообщение в переписке с пользователем $YELLOW{name} (node: {chat_id}):\n"
+                f"$MAGENTA└───> $CYAN{lines}")
 
 
 def save_already_exists_chat_handler(cardinal: Cardinal, event: InitialChatEvent):
@@ -82,7 +85,7 @@ def save_already_exists_chat_handler(cardinal: Cardinal, event: InitialChatEvent
         return
     if event.chat.name not in cardinal.old_users:
         cardinal.old_users.append(event.chat.name)
-        cardinal_tools.cache_old_users(cardinal.old_users)
+        cardinal_tools.cache_old_users(cardinal.old_users, cardinal.storage_dir)
 
 
 def send_greetings_handler(cardinal: Cardinal, event: NewMessageEvent):
@@ -115,7 +118,7 @@ def add_old_user_handler(cardinal: Cardinal, event: NewMessageEvent):
     if chat_name in cardinal.old_users:
         return
     cardinal.old_users.append(chat_name)
-    cardinal_tools.cache_old_users(cardinal.old_users)
+    cardinal_tools.cache_old_users(cardinal.old_users, cardinal.storage_dir)
 
 
 def send_response_handler(cardinal: Cardinal, event: NewMessageEvent):
@@ -221,16 +224,19 @@ def send_new_message_notification_handler(cardinal: Cardinal, event: NewMessageE
     if not text:
         return
 
+    from tg_bot import keyboards
     kb = keyboards.reply(chat_id, chat_name, extend=True)
-    Thread(target=cardinal.telegram.send_notification, args=(text, kb, utils.NotificationTypes.new_message),
-           daemon=True).start()
+    cardinal.telegram.send_grouped_notification(text, kb, utils.NotificationTypes.new_message,
+                                                group_key=f"chat:{chat_id}",
+                                                group_title=f"💬 <b>{utils.escape(str(chat_name))}</b>")
 
 
 def send_review_notification(cardinal: Cardinal, order: Order, chat_id: int, reply_text: str | None):
     if not cardinal.telegram:
         return
+    from tg_bot import keyboards
     reply_text = f"\n\n🗨️<b>Ответ:</b> \n<code>{reply_text}</code>" if reply_text else ""
-    Thread(target=cardinal.telegram.send_notification,
+    Thread(target=TRACER.wrap(cardinal.telegram.send_notification),
            args=(f"🔮 Вы получили {'⭐' * order.review.stars} за заказ <code>{order.id}</code>!\n\n"
                  f"💬<b>Отзыв:</b>\n<code>{order.review.text}</code>{reply_text}",
                  keyboards.new_order(order.id, order.buyer_username, chat_id),
@@ -250,8 +256,11 @@ def process_review(cardinal: Cardinal, event: NewMessageEvent):
         if not order_id:
             return
         order_id = order_id[0][1:]
+        if message_type == types.MessageTypes.FEEDBACK_CHANGED:
+            cardinal.orders_loader.invalidate(order_id)
+        saved_order = (cardinal.runner.saved_orders or {}).get(order_id) if cardinal.runner else None
         try:
-            order = cardinal.account.get_order(order_id)
+            order = cardinal.orders_loader.get_order(order_id, saved_order.status if saved_order else None)
         except:
             logger.error(f"Не удалось получить информацию о заказе #{order_id}.")
             logger.debug("TRACEBACK", exc_info=True)
@@ -296,8 +305,9 @@ def send_command_notification_handler(cardinal: Cardinal, event: NewMessageEvent
     else:
         text = cardinal_tools.format_msg_text(cardinal.AR_CFG[command]["notificationText"], obj)
 
-    Thread(target=cardinal.telegram.send_notification, args=(text, keyboards.reply(chat_id, chat_name),
-                                                             utils.NotificationTypes.command), daemon=True).start()
+    from tg_bot import keyboards
+    Thread(target=TRACER.wrap(cardinal.telegram.send_notification),
+           args=(text, keyboards.reply(chat_id, chat_name), utils.NotificationTypes.command), daemon=True).start()
 
 
 def test_auto_delivery_handler(cardinal: Cardinal, event: NewMessageEvent):
@@ -341,7 +351,7 @@ def send_categories_raised_notification_handler(cardinal: Cardinal, response: Ra
     categories_text = "\n".join(f"<code>{i}</code>" for i in categories_names)
     text = f"""⤴️<b><i>Поднял следующие категории:</i></b>
 {categories_text}"""
-    Thread(target=cardinal.telegram.send_notification,
+    Thread(target=TRACER.wrap(cardinal.telegram.send_notification),
            args=(text, ),
            kwargs={"notification_type": utils.NotificationTypes.lots_raise}, daemon=True).start()
 
@@ -356,35 +366,22 @@ def get_lot_config_by_name(cardinal: Cardinal, name: str) -> configparser.Sectio
 
     :return: секцию конфига или None.
     """
-    for i in cardinal.AD_CFG.sections():
-        if i in name:
-            return cardinal.AD_CFG[i]
-    return None
+    return lots_states.get_lot_config_by_name(cardinal.AD_CFG, name)
 
 
-def check_products_amount(config_obj: configparser.SectionProxy) -> int:
+def check_products_amount(config_obj: configparser.SectionProxy, cardinal: Cardinal | None = None) -> int:
     file_name = config_obj.get("productsFileName")
     if not file_name:
         return 1
-    return cardinal_tools.count_products(f"storage/products/{file_name}")
+    return ProductsIndex(cardinal.products_dir if cardinal else PRODUCTS_DIR).count(file_name)
 
 
 def update_current_lots_handler(cardinal: Cardinal, event: OrdersListChangedEvent):
-    logger.info("Получаю информацию о лотах...")
-    attempts = 3
-    while attempts:
-        try:
-            cardinal.curr_profile = cardinal.account.get_user(cardinal.account.id)
-            cardinal.curr_profile_last_tag = event.runner_tag
-            break
-        except:
-            logger.error("Произошла ошибка при получении информации о лотах.")
-            logger.debug("TRACEBACK", exc_info=True)
-            attempts -= 1
-            time.sleep(2)
-    if not attempts:
-        logger.error("Не удалось получить информацию о лотах: превышено кол-во попыток.")
-        return
+    """
+    Запрашивает обновление текущего профиля (не блокирует поток событий).
+    Запросы нескольких событий подряд объединяются в одно скачивание профиля (см. Utils.profile_refresher).
+    """
+    cardinal.profile_refresher.request(event.runner_tag)
 
 
 # Новый ордер (REGISTER_TO_NEW_ORDER)
@@ -412,10 +409,11 @@ def send_new_order_notification_handler(cardinal: Cardinal, event: NewOrderEvent
 <b><i>💵 Сумма:</i></b>  <code>{event.order.price}</code>
 <b><i>📇 ID:</i></b> <code>#{event.order.id}</code>"""
 
+    from tg_bot import keyboards
     chat_id = cardinal.account.get_chat_by_name(event.order.buyer_username, True).id
     keyboard = keyboards.new_order(event.order.id, event.order.buyer_username, chat_id)
-    Thread(target=cardinal.telegram.send_notification, args=(text, keyboard, utils.NotificationTypes.new_order),
-           daemon=True).start()
+    cardinal.telegram.send_grouped_notification(text, keyboard, utils.NotificationTypes.new_order,
+                                                group_key=f"order:{event.order.id}")
 
 
 def deliver_product(cardinal: Cardinal, event: NewOrderEvent, delivery_obj: configparser.SectionProxy,
@@ -443,9 +441,10 @@ def deliver_product(cardinal: Cardinal, event: NewOrderEvent, delivery_obj: conf
         result = AMOUNT_EXPRESSION.findall(event.order.description)
         if result:
             amount = int(result[0].split(" ")[0])
-            products = cardinal_tools.get_products(f"storage/products/{file_name}", amount)
+            products = cardinal_tools.get_products(f"{cardinal.products_dir}/{file_name}", amount)
     if not products:
-        products = cardinal_tools.get_products(f"storage/products/{file_name}")
+        products = cardinal_tools.get_products(f"{cardinal.products_dir}/{file_name}")
+    ProductsIndex(cardinal.products_dir).invalidate(file_name)
 
     product_text = "\n".join(products[0]).replace("\\n", "\n")
     response_text = response_text.replace("$product", product_text)
@@ -455,9 +454,11 @@ def deliver_product(cardinal: Cardinal, event: NewOrderEvent, delivery_obj: conf
 
     # Если произошла какая-либо ошибка при отправлении товара, возвращаем товар обратно в файл с товарами.
     if not result:
-        cardinal_tools.add_products(f"storage/products/{file_name}", products[0])
+        cardinal_tools.add_products(f"{cardinal.products_dir}/{file_name}", products[0])
+        ProductsIndex(cardinal.products_dir).invalidate(file_name)
         logger.error(f"Не удалось отправить товар для ордера $YELLOW{event.order.id}$RESET. ")
-    return result, response_text, cardinal_tools.count_products(f"storage/products/{file_name}")
+        return result, response_text, ProductsIndex(cardinal.products_dir).count(file_name)
+    return result, response_text, products[1]
 
 
 def deliver_product_handler(cardinal: Cardinal, event: NewOrderEvent, *args) -> None:
@@ -473,7 +474,7 @@ def deliver_product_handler(cardinal: Cardinal, event: NewOrderEvent, *args) ->
             text = f"⛔ Пользователь " \
                    f"<a href=\"https://funpay.com/users/{event.order.buyer_id}/\">{event.order.buyer_username}</a> " \
                    f"находится в ЧС и включена блокировка автовыдачи."
-            Thread(target=cardinal.telegram.send_notification, args=(text, ),
+            Thread(target=TRACER.wrap(cardinal.telegram.send_notification), args=(text, ),
                    kwargs={"notification_type": utils.NotificationTypes.delivery}, daemon=True).start()
         return
 
@@ -503,6 +504,7 @@ def deliver_product_handler(cardinal: Cardinal, event: NewOrderEvent, *args) ->
                                   (cardinal, event, config_lot_name, "Превышено кол-во попыток.", result[2], True))
         else:
             logger.info(f"Товар для ордера {event.order.id} выдан.")
+            metrics_server.DELIVERY_SECONDS.observe(time.time() - event.time, metrics_server.account_label(cardinal))
             cardinal.run_handlers(cardinal.post_delivery_handlers,
                                   (cardinal, event, config_lot_name, result[1], result[2], False))
     except Exception as e:
@@ -534,7 +536,7 @@ def send_delivery_notification_handler(cardinal: Cardinal, event: NewOrderEvent,
 
 📋 <b><i>Осталось товаров: </i></b>{amount}"""
 
-    Thread(target=cardinal.telegram.send_notification, args=(text, ),
+    Thread(target=TRACER.wrap(cardinal.telegram.send_notification), args=(text, ),
            kwargs={"notification_type": utils.NotificationTypes.delivery}, daemon=True).start()
 
 
@@ -550,105 +552,49 @@ def update_lot_state(cardinal: Cardinal, lot: types.LotShortcut, task: int) -> b
 
     :return: результат выполнения.
     """
-    attempts = 3
-    while attempts:
-        try:
-            lot_fields = cardinal.account.get_lot_fields(lot.id, lot.subcategory.id)
-            if task == 1:
-                lot_fields.active = True
-                cardinal.account.save_lot(lot_fields)
-                logger.info(f"Восстановил лот $YELLOW{lot.description}$RESET.")
-            elif task == -1:
-                lot_fields.active = False
-                cardinal.account.save_lot(lot_fields)
-                logger.info(f"Деактивировал лот $YELLOW{lot.description}$RESET.")
-            return True
-        except Exception as e:
-            if isinstance(e, exceptions.RequestFailedError) and e.status_code == 404:
-                logger.error(f"Произошла ошибка при изменении состояния лота $YELLOW{lot.description}$RESET:"
-                             "лот не найден.")
-                return False
-            logger.error(f"Произошла ошибка при изменении состояния лота $YELLOW{lot.description}$RESET.")
-            logger.debug("TRACEBACK", exc_info=True)
-            attempts -= 1
-            time.sleep(2)
-    logger.error(f"Не удалось изменить состояние лота $YELLOW{lot.description}$RESET: превышено кол-во попыток.")
-    return False
+    return lots_states.set_lot_state(cardinal.account, lots_states.RequestsLimiter(cardinal.account), lot, task == 1)
 
 
 def update_lots_states(cardinal: Cardinal, event: NewOrderEvent):
     if not any([cardinal.MAIN_CFG["FunPay"].getboolean("autoRestore"),
                 cardinal.MAIN_CFG["FunPay"].getboolean("autoDisable")]):
         return
-    if cardinal.curr_profile_last_tag != event.runner_tag or cardinal.last_state_change_tag == event.runner_tag:
-        return
-
-    lots = cardinal.curr_profile.get_sorted_lots(1)
-
-    deactivated = []
-    restored = []
-    for lot in cardinal.profile.get_lots():
-        # -1 - деактивировать
-        # 0 - ничего не делать
-        # 1 - восстановить
-        current_task = 0
-        config_obj = get_lot_config_by_name(cardinal, lot.description)
-
-        # Если лот уже деактивирован
-        if lot.id not in lots:
-            # и не найден в конфиге автовыдачи (глобальное автовосстановление включено)
-            if config_obj is None:
-                if cardinal.MAIN_CFG["FunPay"].getboolean("autoRestore"):
-                    current_task = 1
-
-            # и найден в конфиге автовыдачи
-            else:
-                # и глобальное автовосстановление вкл. + не выключено в самом лоте в конфиге автовыдачи
-                if cardinal.MAIN_CFG["FunPay"].getboolean("autoRestore") and \
-                        config_obj.get("disableAutoRestore") in ["0", None]:
-                    # если глобальная автодеактивация выключена - восстанавливаем.
-                    if not cardinal.MAIN_CFG["FunPay"].getboolean("autoDisable"):
-                        current_task = 1
-                    # если глобальная автодеактивация включена - восстанавливаем только если есть товары.
-                    else:
-                        if check_products_amount(config_obj):
-                            current_task = 1
-
-        # Если же лот активен
-        else:
-            # и найден в конфиге автовыдачи
-            if config_obj:
-                products_count = check_products_amount(config_obj)
-                # и все условия выполнены: нет товаров + включено глобальная автодеактивация + она не выключена в
-                # самом лоте в конфига автовыдачи - отключаем.
-                if all((not products_count, cardinal.MAIN_CFG["FunPay"].getboolean("autoDisable"),
-                        config_obj.get("disableAutoDisable") in ["0", None])):
-                    current_task = -1
-
-        if current_task:
-            result = update_lot_state(cardinal, lot, current_task)
-            if result:
-                if current_task == -1:
-                    deactivated.append(lot.description)
-                elif current_task == 1:
-                    restored.append(lot.description)
-            time.sleep(0.5)
+    try:
+        cardinal.profile_refresher.get_profile(event.runner_tag)
+    except:
+        logger.debug("TRACEBACK", exc_info=True)
+        return
+    # Профиль, скачанный после события, мог быть объединен с более поздними событиями (или уже заменен более новым):
+    # состояние лотов обновляется 1 раз для каждого снимка профиля.
+    with LOTS_STATES_LOCK:
+        tag, profile = cardinal.curr_profile_last_tag, cardinal.curr_profile
+        if cardinal.last_state_change_tag == tag:
+            return
+        cardinal.last_state_change_tag = tag
+
+    # Сначала вычисляем все изменения, затем выполняем только нужные запросы (в несколько потоков).
+    to_restore, to_deactivate = lots_states.plan_lots_states(cardinal, set(profile.get_lots_ids()))
+    restored, deactivated = lots_states.apply_lots_states(
+        cardinal.account, to_restore, to_deactivate,
+        workers=cardinal.MAIN_CFG["FunPay"].getint("lotsStatesWorkers", fallback=4),
+        dry_run=cardinal.MAIN_CFG["FunPay"].getboolean("lotsStatesDryRun", fallback=False))
+    deactivated = [i.description for i in deactivated]
+    restored = [i.description for i in restored]
 
     if deactivated:
         lots = "\n".join(deactivated)
         text = f"""🔴 <b>Деактивировал лоты:</b>
         
 <code>{lots}</code>"""
-        Thread(target=cardinal.telegram.send_notification, args=(text, ),
+        Thread(target=TRACER.wrap(cardinal.telegram.send_notification), args=(text, ),
                kwargs={"notification_type": utils.NotificationTypes.lots_deactivate}, daemon=True).start()
     if restored:
         lots = "\n".join(restored)
         text = f"""🟢 <b>Активировал лоты:</b>
 
 <code>{lots}</code>"""
-        Thread(target=cardinal.telegram.send_notification, args=(text,),
+        Thread(target=TRACER.wrap(cardinal.telegram.send_notification), args=(text,),
                kwargs={"notification_type": utils.NotificationTypes.lots_restore}, daemon=True).start()
-    cardinal.last_state_change_tag = event.runner_tag
 
 
 def update_lots_state_handler(cardinal: Cardinal, event: NewOrderEvent, *args):
@@ -678,11 +624,12 @@ def send_order_confirmed_notification_handler(cardinal: Cardinal, event: OrderSt
     """
     Отправляет уведомление о подтверждении заказа в Telegram.
     """
-    if not event.order.status == types.OrderStatuses.CLOSED:
+    if not cardinal.telegram or not event.order.status == types.OrderStatuses.CLOSED:
         return
 
+    from tg_bot import keyboards
     chat = cardinal.account.get_chat_by_name(event.order.buyer_username, True)
-    Thread(target=cardinal.telegram.send_notification,
+    Thread(target=TRACER.wrap(cardinal.telegram.send_notification),
            args=(f"""🪙 Пользователь <a href="https://funpay.com/chat/?node={chat.id}">{event.order.buyer_username}</a> """
                  f"""подтвердил выполнение заказа <code>{event.order.id}</code>.""",
                  keyboards.new_order(event.order.id, event.order.buyer_username, chat.id),
@@ -706,7 +653,7 @@ def send_bot_started_notification_handler(cardinal: Cardinal, *args) -> None:
 
 ℹ️ <b><i>Версия:</i></b> <code>{cardinal.VERSION}</code>
 👑 <b><i>Аккаунт:</i></b>  <code>{cardinal.account.username}</code> | <code>{cardinal.account.id}</code>
-💰 <b><i>Баланс:</i></b> <code>{cardinal.account.balance}{curr}</code>
+💰 <b><i>Баланс:</i></b> <code>{cardinal.account.total_balance}{curr}</code>
 📊 <b><i>Незавершенных ордеров:</i></b>  <code>{cardinal.account.active_sales}</code>"""
 
     for i in cardinal.telegram.init_messages:
@@ -1,15 +1,20 @@
-import Utils.config_loader as cfg_loader
-from first_setup import first_setup
-from colorama import Fore, Style
-import Utils.logger
-from Utils.logger import LOGGER_CONFIG
-import logging.config
-import colorama
 import sys
-import json
-import os
-from cardinal import Cardinal
-import Utils.exceptions as excs
+from Utils.startup_profiler import StartupProfiler
+
+profiler = StartupProfiler()
+profiler.enabled = "--profile-startup" in sys.argv
+
+with profiler.phase("import: base"):
+    import Utils.config_loader as cfg_loader
+    from first_setup import first_setup
+    from colorama import Fore, Style
+    import Utils.logger
+    from Utils.logger import LOGGER_CONFIG
+    import logging.config
+    import colorama
+    import json
+    import os
+    import Utils.exceptions as excs
 
 
 logo = "XDDDDDDDDDDDDDDDDDDDDDDD"
@@ -39,6 +44,7 @@ colorama.init()
 
 
 logging.config.dictConfig(LOGGER_CONFIG)
+Utils.logger.start_queue_logging()
 logging.raiseExceptions = False
 logger = logging.getLogger("main")
 logger.debug("-------------------Новый запуск.-------------------")
@@ -52,15 +58,16 @@ if not os.path.exists("configs/_main.cfg"):
 
 
 try:
-    logger.info("$MAGENTAЗагружаю конфиг _main.cfg...")
-    MAIN_CFG = cfg_loader.load_main_config("configs/_main.cfg")
+    with profiler.phase("configs"):
+        logger.info("$MAGENTAЗагружаю конфиг _main.cfg...")
+        MAIN_CFG = cfg_loader.load_main_config("configs/_main.cfg")
 
-    logger.info("$MAGENTAЗагружаю конфиг auto_response.cfg...")
-    AR_CFG = cfg_loader.load_auto_response_config("configs/auto_response.cfg")
-    RAW_AR_CFG = cfg_loader.load_raw_auto_response_config("configs/auto_response.cfg")
+        logger.info("$MAGENTAЗагружаю конфиг auto_response.cfg...")
+        AR_CFG = cfg_loader.load_auto_response_config("configs/auto_response.cfg")
+        RAW_AR_CFG = cfg_loader.load_raw_auto_response_config("configs/auto_response.cfg")
 
-    logger.info("$MAGENTAЗагружаю конфиг auto_delivery.cfg...")
-    AD_CFG = cfg_loader.load_auto_delivery_config("configs/auto_delivery.cfg")
+        logger.info("$MAGENTAЗагружаю конфиг auto_delivery.cfg...")
+        AD_CFG = cfg_loader.load_auto_delivery_config("configs/auto_delivery.cfg")
 except excs.ConfigParseError as e:
     logger.error(e)
     logger.error("Завершаю программу...")
@@ -77,8 +84,35 @@ except:
     sys.exit()
 
 
+if MAIN_CFG["Other"].getboolean("jsonLogs", fallback=False):
+    Utils.logger.add_json_sink("logs/log.jsonl")
+if (log_repeat_window := MAIN_CFG["Other"].getint("logRepeatWindow", fallback=60)) > 0:
+    Utils.logger.add_repeated_log_filter(log_repeat_window, MAIN_CFG["Other"].getint("logRepeatBurst", fallback=5))
+
+
+# Тяжелые модули (FunPayAPI, telebot, bs4 и т.д.) импортируются только после успешной загрузки конфигов.
+with profiler.phase("import: cardinal"):
+    from cardinal import Cardinal
+    from Utils import accounts_supervisor
+
+
 try:
-    Cardinal(MAIN_CFG, AD_CFG, AR_CFG, RAW_AR_CFG, VERSION).init().run()
+    with profiler.phase("Cardinal.__init__"):
+        cardinal = Cardinal(MAIN_CFG, AD_CFG, AR_CFG, RAW_AR_CFG, VERSION)
+    # Мульти-аккаунтный режим: доп. аккаунты из папки accounts/ работают в этом же процессе.
+    supervisor = None
+    if accounts_supervisor.has_accounts():
+        with profiler.phase("accounts: load"):
+            supervisor = accounts_supervisor.AccountsSupervisor(
+                cardinal, workers=MAIN_CFG["Other"].getint("accountsWorkers", fallback=8),
+                pool_size=MAIN_CFG["Other"].getint("accountsPoolSize", fallback=20))
+            supervisor.load()
+    with profiler.phase("Cardinal.init"):
+        cardinal.init()
+    if supervisor:
+        supervisor.start()
+    profiler.save()
+    cardinal.run()
 except KeyboardInterrupt:
     logger.info("Завершаю программу...")
     sys.exit()
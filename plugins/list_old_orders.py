@@ -3,16 +3,15 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from cardinal import Cardinal
 
-from bs4 import BeautifulSoup
 from FunPayAPI.account import Account
 
-import time
+from datetime import datetime, timedelta
 import telebot
 from tg_bot import utils
 
 
 NAME = "List Old Orders Plugin"
-VERSION = "0.0.2"
+VERSION = "0.0.4"
 DESCRIPTION = "Данный плагин добавляет команду /old_orders, " \
               "благодаря которой можно получить список открытых заказов, которым более 24 часов."
 CREDITS = "@woopertail"
@@ -20,34 +19,6 @@ UUID = "a31cfa24-5ac8-4efb-8c61-7dec3544aa32"
 SETTINGS_PAGE = False
 
 
-def get_orders(acc: Account, start_from: str) -> tuple[str | None, list[str]]:
-    """
-    Получает список ордеров на аккаунте.
-
-    :return: Список с заказами.
-    """
-    attempts = 3
-    while attempts:
-        try:
-            result = acc.get_sales(start_from=start_from or None, state="paid")
-            break
-        except:
-            attempts -= 1
-            time.sleep(1)
-    else:
-        raise Exception
-    orders = result[1]
-    old_orders = []
-    for i in orders:
-        parser = BeautifulSoup(i.html, "html.parser")
-
-        time_text = parser.find("div", {"class": "tc-date-left"}).text
-        if any(map(time_text.__contains__, ["сек", "мин", "час", "тол"])):
-            continue
-        old_orders.append(parser.find("div", {"class": "tc-order"}).text)
-    return result[0], old_orders
-
-
 def get_all_old_orders(acc: Account) -> list[str]:
     """
     Получает список все старых ордеров на аккаунте.
@@ -55,14 +26,8 @@ def get_all_old_orders(acc: Account) -> list[str]:
     :param acc: экземпляр аккаунта.
     :return: список старых заказов.
     """
-    start_from = ""
-    old_orders = []
-    while start_from is not None:
-        result = get_orders(acc, start_from)
-        start_from = result[0]
-        old_orders.extend(result[1])
-        time.sleep(1)
-    return old_orders
+    border = datetime.now() - timedelta(days=1)
+    return [f"#{i.id}" for i in acc.iter_sales(state="paid") if i.date <= border]
 
 
 def init_commands(cardinal: Cardinal, *args):
@@ -0,0 +1,89 @@
+"""
+В данном модуле написан асинхронный вариант Telegram бота.
+Обновления получает и фильтрует AsyncTeleBot (в одном потоке с event loop'ом), а сами хэндлеры (синхронные,
+делающие блокирующие запросы к FunPay) выполняются в пуле потоков ограниченного размера.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+
+from telebot import types, asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+
+from tg_bot.bot import TGBot
+
+
+logger = logging.getLogger("TGBot")
+
+
+class AsyncTGBot(TGBot):
+    """
+    Telegram бот на AsyncTeleBot с тем же API регистрации хэндлеров (msg_handler / cbq_handler / file_handler).
+    Для отправки сообщений (из хэндлеров, уведомлений и плагинов) по-прежнему используется self.bot.
+    """
+    def __init__(self, cardinal: Cardinal):
+        super(AsyncTGBot, self).__init__(cardinal)
+        if api_url := self.cardinal.MAIN_CFG["Telegram"].get("apiUrl", fallback="").strip():
+            asyncio_helper.API_URL = f"{api_url.rstrip('/')}/bot{{0}}/{{1}}"
+        self.async_bot = AsyncTeleBot(self.cardinal.MAIN_CFG["Telegram"]["token"], parse_mode="HTML",
+                                      allow_sending_without_reply=True)
+        workers = self.cardinal.MAIN_CFG["Telegram"].getint("asyncWorkers", fallback=10)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="TGHandler")
+
+    async def run_in_executor(self, handler, update: types.Message | types.CallbackQuery):
+        """
+        Выполняет синхронный хэндлер в пуле потоков.
+
+        :param handler: хэндлер.
+        :param update: сообщение / callback.
+        """
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, handler, update)
+        except:
+            logger.error("Произошла ошибка при выполнении хэндлера Telegram бота.")
+            logger.debug("TRACEBACK", exc_info=True)
+
+    def msg_handler(self, handler, **kwargs):
+        """
+        Регистрирует хэндлер, срабатывающий при новом сообщении.
+
+        :param handler: хэндлер.
+        :param kwargs: аргументы для хэндлера.
+        """
+        @self.async_bot.message_handler(**kwargs)
+        async def run_handler(message: types.Message):
+            await self.run_in_executor(handler, message)
+
+    def cbq_handler(self, handler, func, **kwargs):
+        """
+        Регистрирует хэндлер, срабатывающий при новом callback'е.
+
+        :param handler: хэндлер.
+        :param func: функция-фильтр.
+        :param kwargs: аргументы для хэндлера.
+        """
+        @self.async_bot.callback_query_handler(func, **kwargs)
+        async def run_handler(call: types.CallbackQuery):
+            await self.run_in_executor(handler, call)
+
+    def run(self):
+        """
+        Запускает асинхронный поллинг.
+        """
+        self.send_start_notification()
+        if self.cardinal.MAIN_CFG["Telegram"].get("webhookUrl", fallback="").strip():
+            logger.warning("Webhook не поддерживается асинхронным Telegram ботом. Использую поллинг.")
+        try:
+            logger.info(f"$CYANTelegram бот $YELLOW@{self.bot.user.username} $CYANзапущен (async).")
+            asyncio.run(self.async_bot.infinity_polling(logger_level=logging.DEBUG))
+        except:
+            logger.error("Произошла ошибка при получении обновлений Telegram (введен некорректный токен?).")
+            logger.debug("TRACEBACK", exc_info=True)
+        finally:
+            self.executor.shutdown(wait=False)
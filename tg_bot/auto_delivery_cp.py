@@ -15,7 +15,7 @@ from tg_bot.static_keyboards import CLEAR_STATE_BTN
 from telebot.types import InlineKeyboardButton as Button
 from telebot import types
 
-from Utils import cardinal_tools
+from Utils.products_index import ProductsIndex
 
 import itertools
 import random
@@ -32,6 +32,7 @@ def init_auto_delivery_cp(cardinal: Cardinal, *args):
     tg = cardinal.telegram
     bot = tg.bot
     filename_re = re.compile(r"[А-Яа-яЁёA-Za-z0-9_\- ]+")
+    products_index = ProductsIndex()
 
     def check_ad_lot_exists(index: int, message_obj: types.Message, reply_mode: bool = True) -> bool:
         """
@@ -58,14 +59,12 @@ def init_auto_delivery_cp(cardinal: Cardinal, *args):
             return False
         return True
 
-    def check_products_file_exists(index: int, files_list: list[str],
-                                   message_obj: types.Message, reply_mode: bool = True) -> bool:
+    def check_products_file_exists(index: int, message_obj: types.Message, reply_mode: bool = True) -> bool:
         """
-        Проверяет, существует ли файл с товарами с переданным индексом.
+        Проверяет, существует ли файл с товарами с переданным ID.
         Если лота не существует - отправляет сообщение с кнопкой обновления списка файлов с товарами.
 
-        :param index: числовой индекс файла с товарами.
-        :param files_list: список файлов.
+        :param index: ID файла с товарами (см. :class:`Utils.products_index.ProductsIndex`).
         :param message_obj: экземпляр Telegram-сообщения.
         :param reply_mode: режим ответа на переданное сообщение.
             True - отвечает на переданное сообщение,
@@ -73,7 +72,7 @@ def init_auto_delivery_cp(cardinal: Cardinal, *args):
 
         :return: True, если файл существует, False, если нет.
         """
-        if index > len(files_list) - 1:
+        if products_index.get_name(index) is None:
             update_button = types.InlineKeyboardMarkup().add(Button("🔄 Обновить",
                                                                     callback_data=f"{CBT.PRODUCTS_FILES_LIST}:0"))
             if reply_mode:
@@ -194,9 +193,10 @@ $product""")
         if not file_name.endswith(".txt"):
             file_name += ".txt"
 
-        if os.path.exists(f"storage/products/{file_name}"):
-            file_index = os.listdir("storage/products").index(file_name)
-            offset = file_index - 4 if file_index - 4 > 0 else 0
+        if products_index.exists(file_name):
+            file_index = products_index.get_id(file_name)
+            position = products_index.position(file_name)
+            offset = position - 4 if position - 4 > 0 else 0
             keyboard = types.InlineKeyboardMarkup()\
                 .row(Button("◀️ Назад", callback_data=f"{CBT.CATEGORY}:autoDelivery"),
                      Button("➕ Создать другой", callback_data=CBT.CREATE_PRODUCTS_FILE),
@@ -214,8 +214,10 @@ $product""")
                             f"<code>storage/products/{utils.escape(file_name)}</code>.",
                          reply_markup=error_keyboard)
 
-        file_index = os.listdir("storage/products").index(file_name)
-        offset = file_index - 4 if file_index - 4 > 0 else 0
+        products_index.invalidate()
+        file_index = products_index.get_id(file_name)
+        position = products_index.position(file_name)
+        offset = position - 4 if position - 4 > 0 else 0
         keyboard = types.InlineKeyboardMarkup() \
             .row(Button("◀️ Назад", callback_data=f"{CBT.CATEGORY}:autoDelivery"),
                  Button("➕ Создать еще", callback_data=CBT.CREATE_PRODUCTS_FILE),
@@ -264,7 +266,10 @@ $product""")
                                   "\n<code>$order_title</code> - краткое описание заказа (лот, кол-во, сервер и т.д.)."
                                   "\n<code>$order_id</code> - ID заказа (без #)"
                                   "\n<code>$photo=PHOTO ID</code> - фотография (вместо <code>PHOTO ID</code> "
-                                  "впишите ID фотографии, полученный с помощью команды /upload_img)",
+                                  "впишите ID фотографии, полученный с помощью команды /upload_img, или путь "
+                                  "до изображения из папки storage/images, например "
+                                  "<code>$photo=storage/images/image.png</code>; у доп. аккаунтов - из папки "
+                                  "accounts/&lt;имя&gt;/storage/images)",
                                   reply_markup=CLEAR_STATE_BTN)
         tg.set_user_state(c.message.chat.id, result.id, c.from_user.id, CBT.EDIT_LOT_DELIVERY_TEXT,
                           {"lot_index": lot_index, "offset": offset})
@@ -375,6 +380,7 @@ $product""")
             try:
                 with open(f"storage/products/{file_name}", "w", encoding="utf-8"):
                     pass
+                products_index.invalidate()
             except:
                 logger.debug("TRACEBACK", exc_info=True)
                 bot.reply_to(m, f"❌ Произошла ошибка при создании файла "
@@ -542,13 +548,12 @@ $product""")
         """
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
             bot.answer_callback_query(c.id)
             return
 
-        file_name = files[file_index]
-        products_amount = cardinal_tools.count_products(f"storage/products/{file_name}")
+        file_name = products_index.get_name(file_index)
+        products_amount = products_index.count(file_name)
         nl = "\n"
         delivery_objs = [i for i in cardinal.AD_CFG.sections() if
                          cardinal.AD_CFG[i].get("productsFileName") == file_name]
@@ -588,8 +593,8 @@ $product""")
                                                    state["offset"], state["previous_page"])
         tg.clear_state(m.chat.id, m.from_user.id, True)
 
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if file_index > len(files) - 1:
+        file_name = products_index.get_name(file_index)
+        if file_name is None:
 
             if prev_page == 0:
                 update_btn = Button("🔄 Обновить", callback_data=f"{CBT.PRODUCTS_FILES_LIST}:0")
@@ -601,7 +606,6 @@ $product""")
                          reply_markup=error_keyboard)
             return
 
-        file_name = files[file_index]
         products = list(itertools.filterfalse(lambda el: not el, m.text.strip().split("\n")))
 
         if prev_page == 0:
@@ -621,6 +625,7 @@ $product""")
             with open(f"storage/products/{file_name}", "a", encoding="utf-8") as f:
                 f.write("\n")
                 f.write(products_text)
+            products_index.invalidate(file_name)
         except:
             logger.debug("TRACEBACK", exc_info=True)
             keyboard = types.InlineKeyboardMarkup().row(back_btn, try_again_btn)
@@ -642,12 +647,11 @@ $product""")
         """
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
             bot.answer_callback_query(c.id)
             return
 
-        file_name = files[file_index]
+        file_name = products_index.get_name(file_index)
         back_button = types.InlineKeyboardMarkup() \
             .add(types.InlineKeyboardButton("◀️ Назад",
                                             callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{file_index}:{offset}"))
@@ -672,8 +676,7 @@ $product""")
         """
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
             bot.answer_callback_query(c.id)
             return
         bot.edit_message_reply_markup(c.message.chat.id, c.message.id,
@@ -687,12 +690,11 @@ $product""")
 
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
-            tg.answer_callback_query(c.id)
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
+            bot.answer_callback_query(c.id)
             return
 
-        file_name = files[file_index]
+        file_name = products_index.get_name(file_index)
 
         delivery_objs = [i for i in cardinal.AD_CFG.sections() if
                          cardinal.AD_CFG[i].get("productsFileName") == file_name]
@@ -708,6 +710,7 @@ $product""")
 
         try:
             os.remove(f"storage/products/{file_name}")
+            products_index.invalidate()
 
             logger.info(f"Пользователь $MAGENTA@{c.from_user.username} (id: {c.from_user.id})$RESET удалил "
                         f"файл с товарами $YELLOWstorage/products/{file_name}$RESET.")
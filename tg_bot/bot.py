@@ -16,11 +16,16 @@ import string
 import psutil
 import telebot
 import logging
+from threading import Thread
 
 from telebot import types
 
 from tg_bot import utils, static_keyboards as skb, keyboards as kb, CBT
-from Utils import cardinal_tools, update_checker
+from tg_bot.digest import NotificationDigest
+from tg_bot.webhook import WebhookServer
+from FunPayAPI.common.tracing import TRACER
+from Utils import cardinal_tools, update_checker, log_reader
+import Utils.logger
 
 
 logger = logging.getLogger("TGBot")
@@ -29,6 +34,10 @@ logger = logging.getLogger("TGBot")
 class TGBot:
     def __init__(self, cardinal: Cardinal):
         self.cardinal = cardinal
+        # Адрес Bot API можно переопределить (локальный Bot API сервер / тестовый сервер).
+        if api_url := self.cardinal.MAIN_CFG["Telegram"].get("apiUrl", fallback="").strip():
+            telebot.apihelper.API_URL = f"{api_url.rstrip('/')}/bot{{0}}/{{1}}"
+            telebot.apihelper.FILE_URL = f"{api_url.rstrip('/')}/file/bot{{0}}/{{1}}"
         self.bot = telebot.TeleBot(self.cardinal.MAIN_CFG["Telegram"]["token"], parse_mode="HTML",
                                    allow_sending_without_reply=True, num_threads=5)
 
@@ -69,7 +78,7 @@ class TGBot:
             "unban": "удалить пользователя из ЧС",
             "block_list": "получить ЧС",
             "watermark": "изменить вотемарку сообщений",
-            "logs": "получить лог-файл",
+            "logs": "получить лог-файл (/logs N - последние N строк, /logs ЧЧ:ММ-ЧЧ:ММ - промежуток)",
             "del_logs": "удалить старые лог-файлы",
             "about": "информация об этой версии FPC",
             "check_updates": "проверить на наличие обновлений",
@@ -81,6 +90,11 @@ class TGBot:
 
         self.file_handlers = {}
 
+        # Режим сводки: уведомления, пришедшие в течение digestWindow секунд, объединяются в одно сообщение.
+        # 0 - режим сводки выключен.
+        digest_window = self.cardinal.MAIN_CFG["Telegram"].getfloat("digestWindow", fallback=0)
+        self.digest = NotificationDigest(self, digest_window) if digest_window > 0 else None
+
     # User states
     def get_user_state(self, chat_id: int, user_id: int) -> dict | None:
         """
@@ -420,26 +434,63 @@ class TGBot:
 
     def send_logs(self, message: types.Message):
         """
-        Отправляет файл логов.
+        Отправляет сжатый (gzip) лог-файл.
+
+        /logs - весь лог-файл.
+        /logs <N> - последние N строк.
+        /logs <ЧЧ:ММ>[-ЧЧ:ММ] - строки за промежуток времени (до конца файла, если конец не указан).
         """
         if not os.path.exists("logs/log.log"):
             self.bot.send_message(message.chat.id, "❌ Лог-файл не обнаружен.")
-        else:
-            self.bot.send_message(message.chat.id, "Выгружаю лог-файл (это может занять какое-то время)...")
-            try:
-                with open("logs/log.log", "r", encoding="utf-8") as f:
-                    self.bot.send_document(message.chat.id, f)
-            except:
-                self.bot.send_message(message.chat.id, "❌ Не удалось выгрузить лог-файл.")
-                logger.debug("TRACEBACK", exc_info=True)
+            return
+
+        args = message.text.split(maxsplit=1)[1].strip() if len(message.text.split(maxsplit=1)) > 1 else ""
+        try:
+            if not args:
+                mode, params = "full", ()
+            elif args.isdigit():
+                mode, params = "tail", (int(args),)
+            else:
+                start, _, end = args.partition("-")
+                mode, params = "range", (log_reader.parse_time(start), log_reader.parse_time(end) if end else None)
+        except ValueError:
+            self.bot.send_message(message.chat.id, "❌ Неверный формат. Используйте <code>/logs</code>, "
+                                                   "<code>/logs 500</code> или <code>/logs 12:00-13:30</code>.")
+            return
+
+        self.bot.send_message(message.chat.id, "Выгружаю лог-файл (это может занять какое-то время)...")
+        path = f"storage/cache/log_{mode}_{int(time.time())}.log.gz"
+        try:
+            if mode == "full":
+                size = log_reader.compress_log("logs/log.log", path)
+            elif mode == "tail":
+                size = log_reader.export_tail("logs/log.log", path, *params)
+            else:
+                size = log_reader.export_time_range("logs/log.log", path, *params)
+
+            if size > 50 * 1024 * 1024:
+                self.bot.send_message(message.chat.id, "❌ Сжатый лог-файл больше 50МБ и не может быть отправлен. "
+                                                       "Запросите последние N строк или промежуток времени.")
+                return
+            with open(path, "rb") as f:
+                self.bot.send_document(message.chat.id, f)
+        except:
+            self.bot.send_message(message.chat.id, "❌ Не удалось выгрузить лог-файл.")
+            logger.debug("TRACEBACK", exc_info=True)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
 
     def del_logs(self, message: types.Message):
         """
-        Удаляет старые лог-файлы.
+        Удаляет старые (сжатые при ротации) лог-файлы.
+        Открытые хэндлерами файлы и архивы, которые еще сжимаются (рядом лежит исходный файл), не удаляются.
         """
         deleted = 0
+        active = Utils.logger.active_log_files()
         for file in os.listdir("logs"):
-            if not file.endswith(".log"):
+            path = os.path.abspath(f"logs/{file}")
+            if file.endswith(".gz") and path not in active and not os.path.exists(path[:-3]):
                 try:
                     os.remove(f"logs/{file}")
                     deleted += 1
@@ -551,6 +602,17 @@ class TGBot:
         current_time = int(time.time())
         run_time = current_time - self.cardinal.start_time
 
+        polling = ""
+        if self.cardinal.runner:
+            stats = self.cardinal.runner.poll_interval.stats()
+            state = self.cardinal.runner.state.stats()
+            polling = f"""
+    Интервал опроса:  <code>{stats['delay']} сек.</code>
+    Запросов в минуту:  <code>{stats['polls_per_min']}</code>
+    Обнаружение событий:  <code>~{stats['detection_latency'] or '-'} сек.</code>
+    Чатов в памяти Runner'а:  <code>{state['chats']}</code> (<code>{state['bytes'] / 1048576:.1f} / \
+{state['max_bytes'] / 1048576:.0f} MB</code>, вытеснено: <code>{state['evicted']}</code>)"""
+
         ram = psutil.virtual_memory()
         cpu_usage = "\n".join(
             f"    CPU {i}:  <code>{l}%</code>" for i, l in enumerate(psutil.cpu_percent(percpu=True)))
@@ -568,13 +630,15 @@ class TGBot:
 
 <b>Бот:</b>
     Аптайм:  <code>{cardinal_tools.time_to_str(run_time)}</code>
-    Чат:  <code>{msg.chat.id}</code>""")
+    Чат:  <code>{msg.chat.id}</code>{polling}""")
 
     def restart_cardinal(self, msg: types.Message):
         """
         Перезапускает кардинал.
         """
         self.bot.send_message(msg.chat.id, "Перезагружаюсь...")
+        if self.digest:
+            self.digest.flush_all()
         cardinal_tools.restart_program()
 
     def ask_power_off(self, msg: types.Message):
@@ -609,6 +673,8 @@ class TGBot:
         if state == 6:
             self.bot.edit_message_text("Ладно, ладно, выключаюсь...", call.message.chat.id, call.message.id)
             self.bot.answer_callback_query(call.id)
+            if self.digest:
+                self.digest.flush_all()
             cardinal_tools.shut_down()
             return
 
@@ -905,6 +971,8 @@ class TGBot:
         section, option = split[1], split[2]
         self.cardinal.MAIN_CFG[section][option] = str(int(not int(self.cardinal.MAIN_CFG[section][option])))
         self.cardinal.save_config(self.cardinal.MAIN_CFG, "configs/_main.cfg")
+        if option == "autoRaise":
+            self.cardinal.raise_scheduler.wake()
 
         sections = {
             "FunPay": kb.main_settings,
@@ -1096,6 +1164,10 @@ class TGBot:
         :param notification_type: тип уведомления.
         :param photo: фотография (если нужна).
         """
+        with TRACER.span(f"telegram:{notification_type}"):
+            self.__send_notification(text, keyboard, notification_type, photo)
+
+    def __send_notification(self, text: str | None, keyboard, notification_type: str, photo: bytes | None):
         kwargs = {}
         if keyboard is not None:
             kwargs["reply_markup"] = keyboard
@@ -1115,6 +1187,25 @@ class TGBot:
                 logger.debug("TRACEBACK", exc_info=True)
                 continue
 
+    def send_grouped_notification(self, text: str, keyboard=None,
+                                  notification_type: str = utils.NotificationTypes.other,
+                                  group_key: str | None = None, group_title: str | None = None):
+        """
+        Отправляет уведомление с учетом режима сводки.
+        Если режим сводки выключен, уведомление отправляется сразу (в отдельном потоке).
+
+        :param text: текст уведомления.
+        :param keyboard: экземпляр клавиатуры.
+        :param notification_type: тип уведомления.
+        :param group_key: ключ группы уведомлений (ID чата FunPay / ID заказа).
+        :param group_title: заголовок группы в сводке.
+        """
+        if self.digest is None:
+            Thread(target=TRACER.wrap(self.send_notification), args=(text, keyboard, notification_type),
+                   daemon=True).start()
+            return
+        self.digest.add(notification_type, group_key or text, text, keyboard, group_title)
+
     def add_command_to_menu(self, command: str, help_text: str) -> None:
         """
         Добавляет команду в список команд (в кнопке menu).
@@ -1136,9 +1227,9 @@ class TGBot:
         self.__init_commands()
         logger.info("$MAGENTATelegram бот инициализирован.")
 
-    def run(self):
+    def send_start_notification(self):
         """
-        Запускает поллинг.
+        Отправляет уведомление о запуске Telegram бота (изменяется после инициализации FPC).
         """
         self.send_notification("""✅ Telegram-бот запущен!
 
@@ -1150,9 +1241,59 @@ class TGBot:
 
 📋 Если <i>FPC</i> долго не инициализируется - проверьте логи с помощью команды /logs""",
                                notification_type=utils.NotificationTypes.bot_start)
+
+    def run(self):
+        """
+        Запускает поллинг.
+        """
+        self.send_start_notification()
+        if self.cardinal.MAIN_CFG["Telegram"].get("webhookUrl", fallback="").strip() and self.run_webhook():
+            return
         try:
             logger.info(f"$CYANTelegram бот $YELLOW@{self.bot.user.username} $CYANзапущен.")
             self.bot.infinity_polling(logger_level=logging.DEBUG)
         except:
             logger.error("Произошла ошибка при получении обновлений Telegram (введен некорректный токен?).")
             logger.debug("TRACEBACK", exc_info=True)
+
+    def run_webhook(self) -> bool:
+        """
+        Запускает получение обновлений через webhook (встроенный HTTP-сервер).
+
+        :return: False, если webhook не удалось запустить (нужно перейти на поллинг).
+        """
+        cfg = self.cardinal.MAIN_CFG["Telegram"]
+        url = cfg.get("webhookUrl").strip()
+        secret_token = cfg.get("webhookSecret", fallback="").strip() or None
+        server = WebhookServer(self, cfg.get("webhookHost", fallback="127.0.0.1"),
+                               cfg.getint("webhookPort", fallback=8443),
+                               cfg.get("webhookPath", fallback="/telegram"), secret_token,
+                               cfg.getint("webhookWorkers", fallback=5), cfg.getint("webhookQueue", fallback=100))
+        try:
+            server.start()
+            self.bot.set_webhook(url=url, secret_token=secret_token)
+        except:
+            logger.error("Не удалось запустить webhook Telegram бота. Перехожу на поллинг.")
+            logger.debug("TRACEBACK", exc_info=True)
+            server.close()
+            try:
+                self.bot.remove_webhook()
+            except:
+                logger.debug("TRACEBACK", exc_info=True)
+            return False
+
+        # Обновления обрабатываются в пуле потоков сервера, поэтому внутренний пул telebot не нужен.
+        self.bot.threaded = False
+        logger.info(f"$CYANTelegram бот $YELLOW@{self.bot.user.username} $CYANзапущен (webhook: $YELLOW{url}$CYAN).")
+        try:
+            server.serve_forever()
+        except:
+            logger.error("Webhook сервер Telegram бота остановлен из-за ошибки. Перехожу на поллинг.")
+            logger.debug("TRACEBACK", exc_info=True)
+            self.bot.threaded = True
+            try:
+                self.bot.remove_webhook()
+            except:
+                logger.debug("TRACEBACK", exc_info=True)
+            return False
+        return True
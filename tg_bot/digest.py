@@ -0,0 +1,174 @@
+"""
+В данном модуле написан накопитель Telegram уведомлений (режим сводки).
+Уведомления одного типа, пришедшие в течение окна, объединяются в одно сообщение.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from tg_bot.bot import TGBot
+
+from collections import OrderedDict
+from threading import Lock, Timer
+import logging
+import atexit
+import re
+
+
+logger = logging.getLogger("TGBot")
+
+MAX_MESSAGE_LENGTH = 4096
+"""Максимальная длина текста сообщения в Telegram."""
+TAG_RE = re.compile(r"<(/?)([a-zA-Z-]+)[^>]*>")
+
+
+def truncate_html(text: str, limit: int) -> str:
+    """
+    Обрезает HTML-текст до указанной длины, не оставляя оборванных тегов / сущностей и закрывая открытые теги.
+
+    :param text: HTML-текст.
+    :param limit: макс. длина результата.
+
+    :return: обрезанный текст.
+    """
+    if len(text) <= limit:
+        return text
+    suffix = "…"
+    # Запас на закрывающие теги.
+    text = text[:max(limit - len(suffix) - 100, 0)]
+    if text.rfind("<") > text.rfind(">"):
+        text = text[:text.rfind("<")]
+    if text.rfind("&") > text.rfind(";"):
+        text = text[:text.rfind("&")]
+    opened = []
+    for closing, tag in TAG_RE.findall(text):
+        if not closing:
+            opened.append(tag)
+        elif tag in opened:
+            del opened[len(opened) - 1 - opened[::-1].index(tag)]
+    return text + suffix + "".join(f"</{i}>" for i in reversed(opened))
+
+
+class DigestGroup:
+    """
+    Группа уведомлений, относящихся к одному чату FunPay / заказу.
+
+    :param title: заголовок группы (используется, если в сводке несколько групп).
+    """
+    def __init__(self, title: str | None = None):
+        self.title: str | None = title
+        """Заголовок группы."""
+        self.texts: list[str] = []
+        """Тексты уведомлений группы."""
+        self.keyboard = None
+        """Клавиатура последнего уведомления группы."""
+
+
+class NotificationDigest:
+    """
+    Накапливает уведомления и раз в window секунд отправляет по одному сообщению на каждый тип уведомлений.
+
+    :param tg: экземпляр Telegram бота.
+    :param window: окно накопления уведомлений (в секундах).
+    """
+    def __init__(self, tg: TGBot, window: float):
+        self.tg = tg
+        self.window = window
+        self.lock = Lock()
+        # {notification_type: OrderedDict{group_key: DigestGroup}}
+        self.buffers: dict[str, OrderedDict[str, DigestGroup]] = {}
+        # {notification_type: Timer}
+        self.timers: dict[str, Timer] = {}
+        # Накопленные сводки отправляются при завершении программы.
+        atexit.register(self.flush_all)
+
+    def add(self, notification_type: str, group_key: str, text: str, keyboard=None, title: str | None = None):
+        """
+        Добавляет уведомление в сводку.
+
+        :param notification_type: тип уведомления.
+        :param group_key: ключ группы (ID чата FunPay / ID заказа).
+        :param text: текст уведомления.
+        :param keyboard: клавиатура уведомления (в сводке остается клавиатура последнего уведомления).
+        :param title: заголовок группы.
+        """
+        with self.lock:
+            buffer = self.buffers.setdefault(notification_type, OrderedDict())
+            group = buffer.get(group_key)
+            if group is None:
+                group = buffer[group_key] = DigestGroup(title)
+            else:
+                buffer.move_to_end(group_key)
+            group.texts.append(text)
+            group.keyboard = keyboard
+
+            if notification_type not in self.timers:
+                timer = Timer(self.window, self.flush, args=(notification_type,))
+                timer.daemon = True
+                self.timers[notification_type] = timer
+                timer.start()
+
+    def flush(self, notification_type: str):
+        """
+        Отправляет накопленную сводку уведомлений указанного типа.
+
+        :param notification_type: тип уведомления.
+        """
+        with self.lock:
+            self.timers.pop(notification_type, None)
+            buffer = self.buffers.pop(notification_type, None)
+        if not buffer:
+            return
+
+        groups = list(buffer.values())
+        keyboard = groups[-1].keyboard
+        if len(groups) == 1 and len(groups[0].texts) == 1:
+            self.tg.send_notification(groups[0].texts[0], keyboard, notification_type)
+            return
+
+        text = self.build_text(groups)
+        logger.debug(f"Отправляю сводку уведомлений типа {notification_type}: "
+                     f"{sum(len(i.texts) for i in groups)} уведомл. в {len(groups)} групп.")
+        self.tg.send_notification(text, keyboard, notification_type)
+
+    def flush_all(self):
+        """
+        Немедленно отправляет все накопленные сводки (при перезапуске / выключении FPC).
+        """
+        with self.lock:
+            for timer in self.timers.values():
+                timer.cancel()
+            notification_types = list(self.buffers)
+        for notification_type in notification_types:
+            self.flush(notification_type)
+
+    @staticmethod
+    def build_text(groups: list[DigestGroup]) -> str:
+        """
+        Собирает текст сводки. Группы, не влезающие в лимит длины сообщения Telegram, отбрасываются
+        (начиная с самых старых), а их кол-во указывается в конце сообщения. Группа, которая одна длиннее лимита,
+        обрезается.
+
+        :param groups: группы уведомлений (от старых к новым).
+
+        :return: текст сводки.
+        """
+        blocks = []
+        for group in groups:
+            body = "\n\n".join(group.texts)
+            block = f"{group.title}\n{body}" if group.title and len(groups) > 1 else body
+            blocks.append(truncate_html(block, MAX_MESSAGE_LENGTH - 200))
+
+        separator = "\n\n➖➖➖➖➖➖➖➖\n\n"
+        result = []
+        length = 0
+        for block in reversed(blocks):
+            if result and length + len(block) + len(separator) > MAX_MESSAGE_LENGTH - 100:
+                break
+            result.insert(0, block)
+            length += len(block) + len(separator)
+
+        text = separator.join(result)
+        if skipped := len(blocks) - len(result):
+            text = f"{text}\n\n<i>… и еще {skipped} уведомл. (не поместились в сообщение).</i>"
+        return text
@@ -8,7 +8,8 @@ if TYPE_CHECKING:
     from cardinal import Cardinal
     from tg_bot.bot import TGBot
 
-from Utils import config_loader as cfg_loader, exceptions as excs, cardinal_tools
+from Utils import config_loader as cfg_loader, exceptions as excs
+from Utils.products_index import ProductsIndex
 from telebot.types import InlineKeyboardButton as Button
 from tg_bot import utils, keyboards, CBT
 from tg_bot.static_keyboards import CLEAR_STATE_BTN
@@ -94,17 +95,21 @@ def init_uploader(cardinal: Cardinal):
                              custom_path=f"storage/products"):
             return
 
+        products_index = ProductsIndex()
+        products_index.invalidate()
         try:
-            products_count = cardinal_tools.count_products(f"storage/products/{utils.escape(m.document.file_name)}")
+            products_count = products_index.count(m.document.file_name)
         except:
             bot.send_message(m.chat.id, "❌ Произошла ошибка при подсчете товаров.")
             logger.debug("TRACEBACK", exc_info=True)
             return
 
-        file_number = os.listdir("storage/products").index(m.document.file_name)
-
-        keyboard = types.InlineKeyboardMarkup() \
-            .add(Button("✏️ Редактировать файл", callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{file_number}:0"))
+        # Индексируются только .txt файлы: для остальных кнопки редактирования нет.
+        file_number = products_index.get_id(m.document.file_name)
+        keyboard = None
+        if file_number is not None:
+            keyboard = types.InlineKeyboardMarkup() \
+                .add(Button("✏️ Редактировать файл", callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{file_number}:0"))
 
         logger.info(f"Пользователь $MAGENTA@{m.from_user.username} (id: {m.from_user.id})$RESET "
                     f"загрузил в бота файл с товарами $YELLOWstorage/products/{m.document.file_name}$RESET.")
@@ -269,8 +274,7 @@ def init_uploader(cardinal: Cardinal):
         try:
             file_info = tg.bot.get_file(photo.file_id)
             file = tg.bot.download_file(file_info.file_path)
-            image_id = cardinal.account.upload_image(file)
-            result = cardinal.account.send_message(chat_id, None, username, image_id)
+            result = cardinal.account.send_image(chat_id, file, username)
             if not result:
                 tg.bot.reply_to(m, f'❌ Не удалось отправить сообщение в переписку '
                                    f'<a href="https://funpay.com/chat/?node={chat_id}">{username}</a>. '
@@ -310,7 +314,10 @@ def init_uploader(cardinal: Cardinal):
                         f"<b>ID:</b> <code>{image_id}</code>\n\n"
                         f"Используйте этот ID в текстах автовыдачи/автоответа с переменной "
                         f"<code>$photo</code>\n\n"
-                        f"Например: <code>$photo={image_id}</code>")
+                        f"Например: <code>$photo={image_id}</code>\n\n"
+                        f"Также можно указать путь до изображения из папки <code>storage/images</code> (например, "
+                        f"<code>$photo=storage/images/image.png</code>): оно будет выгружено один раз. "
+                        f"У доп. аккаунтов - из папки <code>accounts/&lt;имя&gt;/storage/images</code>.")
 
     tg.cbq_handler(act_upload_products_file, lambda c: c.data == CBT.UPLOAD_PRODUCTS_FILE)
     tg.cbq_handler(act_upload_auto_response_config, lambda c: c.data == "upload_auto_response_config")
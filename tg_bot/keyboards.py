@@ -15,7 +15,7 @@ from tg_bot.utils import NotificationTypes
 
 from FunPayAPI.types import SubCategoryTypes
 
-import Utils
+from Utils.products_index import ProductsIndex
 
 import logging
 import random
@@ -297,17 +297,20 @@ def products_files_list(offset: int) -> types.InlineKeyboardMarkup:
     :param offset: смещение списка файлов.
     """
     keyboard = types.InlineKeyboardMarkup()
-    files = os.listdir("storage/products")[offset:offset + MENU_CFG.PF_BTNS_AMOUNT]
+    index = ProductsIndex()
+    all_files = index.files()
+    files = all_files[offset:offset + MENU_CFG.PF_BTNS_AMOUNT]
     if not files and offset != 0:
         offset = 0
-        files = os.listdir("storage/products")[offset:offset + 5]
+        files = all_files[offset:offset + MENU_CFG.PF_BTNS_AMOUNT]
 
-    for index, name in enumerate(files):
-        amount = Utils.cardinal_tools.count_products(f"storage/products/{name}")
-        keyboard.add(B(f"{amount} шт., {name}", callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{offset + index}:{offset}"))
+    for name in files:
+        amount = index.count(name)
+        keyboard.add(B(f"{amount} шт., {name}",
+                       callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{index.get_id(name)}:{offset}"))
 
     keyboard = utils.add_navigation_buttons(keyboard, offset, MENU_CFG.PF_BTNS_AMOUNT, len(files),
-                                            len(os.listdir("storage/products")), CBT.PRODUCTS_FILES_LIST)
+                                            len(all_files), CBT.PRODUCTS_FILES_LIST)
 
     keyboard.add(B("📦 В настройки автовыдачи", callback_data=f"{CBT.CATEGORY}:autoDelivery")) \
         .add(B("📋 В главное меню", callback_data=CBT.MAIN))
@@ -317,9 +320,9 @@ def products_files_list(offset: int) -> types.InlineKeyboardMarkup:
 def products_file_edit(file_number: int, offset: int, confirmation: bool = False) \
         -> types.InlineKeyboardMarkup:
     """
-    Создает клавиатуру изменения файла с товарами (CBT.EDIT_PRODUCTS_FILE:<file_index>:<offset>).
+    Создает клавиатуру изменения файла с товарами (CBT.EDIT_PRODUCTS_FILE:<file_id>:<offset>).
 
-    :param file_number: номер файла.
+    :param file_number: ID файла (см. :class:`Utils.products_index.ProductsIndex`).
     :param offset: смещение списка файлов с товарами.
     :param confirmation: включить ли в клавиатуру подтверждение удаления файла.
     """
@@ -404,15 +407,22 @@ def edit_lot(cardinal: Cardinal, lot_number: int, offset: int) -> types.InlineKe
         kb.add(B("⛓️ Привязать файл с товарами",
                  callback_data=f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"))
     else:
-        if file_name not in os.listdir("storage/products"):
+        index = ProductsIndex()
+        if not os.path.exists(f"storage/products/{file_name}"):
             with open(f"storage/products/{file_name}", "w", encoding="utf-8"):
                 pass
-        file_number = os.listdir("storage/products").index(file_name)
+            index.invalidate()
+        file_number = index.get_id(file_name)
 
-        kb.row(B("⛓️ Привязать файл с товарами",
-                 callback_data=f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"),
-               B("➕ Добавить товары",
-                 callback_data=f"{CBT.ADD_PRODUCTS_TO_FILE}:{file_number}:{lot_number}:{offset}:1"))
+        if file_number is None:
+            # Файл не .txt: в индексе его нет, добавление товаров через ПУ недоступно.
+            kb.add(B("⛓️ Привязать файл с товарами",
+                     callback_data=f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"))
+        else:
+            kb.row(B("⛓️ Привязать файл с товарами",
+                     callback_data=f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"),
+                   B("➕ Добавить товары",
+                     callback_data=f"{CBT.ADD_PRODUCTS_TO_FILE}:{file_number}:{lot_number}:{offset}:1"))
 
     params = {
         "ad": cardinal.MAIN_CFG["FunPay"].getboolean("autoDelivery"),
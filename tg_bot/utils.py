@@ -6,15 +6,17 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from FunPayAPI.account import Account
+    from telebot.types import InlineKeyboardMarkup
 
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton as Button
+# telebot импортируется только в функциях, работающих с клавиатурами: NotificationTypes, escape и т.д.
+# используются хэндлерами и без Telegram бота.
 import configparser
 import datetime
 import os.path
 import json
 import time
 
-import Utils.cardinal_tools
+from Utils.products_index import ProductsIndex
 
 
 class NotificationTypes:
@@ -179,6 +181,7 @@ def add_navigation_buttons(keyboard_obj: InlineKeyboardMarkup, curr_offset: int,
     :param callback_text: текст callback'а.
     :param extra: доп. данные (будут перечислены через ":")
     """
+    from telebot.types import InlineKeyboardButton as Button
     extra = ":" + ":".join(str(i) for i in extra) if extra else ""
     navigation_buttons = []
     if curr_offset > 0:
@@ -208,7 +211,7 @@ def generate_profile_text(account: Account) -> str:
     return f"""Статистика аккаунта <b><i>{account.username}</i></b>
 
 <b>ID:</b> <code>{account.id}</code>
-<b>Баланс:</b> <code>{account.balance} {account.currency}</code>
+<b>Баланс:</b> <code>{account.total_balance} {account.currency}</code>
 <b>Незавершенных заказов:</b> <code>{account.active_sales}</code>
 
 <i>Обновлено:</i>  <code>{time.strftime('%H:%M:%S', time.localtime(account.last_update))}</code>"""
@@ -226,11 +229,14 @@ def generate_lot_info_text(lot_obj: configparser.SectionProxy) -> str:
         file_path = "<b><u>не привязан.</u></b>"
         products_amount = "<code>∞</code>"
     else:
-        file_path = f"<code>storage/products/{lot_obj.get('productsFileName')}</code>"
-        if not os.path.exists(f"storage/products/{lot_obj.get('productsFileName')}"):
-            with open(f"storage/products/{lot_obj.get('productsFileName')}", "w", encoding="utf-8"):
+        file_name = lot_obj.get('productsFileName')
+        file_path = f"<code>storage/products/{file_name}</code>"
+        index = ProductsIndex()
+        if not os.path.exists(f"storage/products/{file_name}"):
+            with open(f"storage/products/{file_name}", "w", encoding="utf-8"):
                 pass
-        products_amount = Utils.cardinal_tools.count_products(f"storage/products/{lot_obj.get('productsFileName')}")
+            index.invalidate()
+        products_amount = index.count(file_name)
         products_amount = f"<code>{products_amount}</code>"
 
     message = f"""<b>{escape(lot_obj.name)}</b>\n
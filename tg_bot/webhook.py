@@ -0,0 +1,126 @@
+"""
+В данном модуле написан встроенный HTTP-сервер для получения обновлений Telegram через webhook.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from tg_bot.bot import TGBot
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from threading import BoundedSemaphore
+import logging
+import json
+
+from telebot import types
+
+
+logger = logging.getLogger("TGBot")
+
+
+class WebhookServer:
+    """
+    HTTP-сервер, принимающий обновления Telegram и передающий их в пул потоков ограниченного размера.
+    Если очередь обновлений заполнена, серверу отвечает 503 - Telegram повторит отправку обновления позже.
+
+    :param tg: экземпляр Telegram бота.
+    :param host: адрес, на котором слушает сервер.
+    :param port: порт, на котором слушает сервер.
+    :param path: путь, на который Telegram отправляет обновления.
+    :param secret_token: секретный токен (заголовок X-Telegram-Bot-Api-Secret-Token).
+    :param workers: кол-во потоков, обрабатывающих обновления.
+    :param queue_size: макс. кол-во обновлений, ожидающих обработки.
+    """
+    def __init__(self, tg: TGBot, host: str, port: int, path: str, secret_token: str | None = None,
+                 workers: int = 5, queue_size: int = 100):
+        self.tg = tg
+        self.host = host
+        self.port = port
+        self.path = path if path.startswith("/") else f"/{path}"
+        self.secret_token = secret_token or None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="TGWebhook")
+        self.slots = BoundedSemaphore(workers + queue_size)
+        self.server: HTTPServer | None = None
+
+    def process_update(self, update: types.Update):
+        try:
+            self.tg.bot.process_new_updates([update])
+        except:
+            logger.error("Произошла ошибка при обработке обновления Telegram.")
+            logger.debug("TRACEBACK", exc_info=True)
+        finally:
+            self.slots.release()
+
+    def submit(self, raw: bytes) -> int:
+        """
+        Ставит обновление в очередь на обработку.
+
+        :param raw: тело запроса от Telegram.
+
+        :return: HTTP статус-код ответа.
+        """
+        try:
+            update = types.Update.de_json(json.loads(raw.decode("utf-8")))
+        except:
+            logger.debug("TRACEBACK", exc_info=True)
+            return 400
+        if not self.slots.acquire(blocking=False):
+            logger.warning("Очередь обновлений Telegram переполнена. Обновление будет получено повторно.")
+            return 503
+        self.executor.submit(self.process_update, update)
+        return 200
+
+    def create_handler(self):
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != webhook.path:
+                    status = 404
+                elif webhook.secret_token and \
+                        self.headers.get("X-Telegram-Bot-Api-Secret-Token") != webhook.secret_token:
+                    status = 403
+                else:
+                    length = int(self.headers.get("Content-Length", 0))
+                    status = webhook.submit(self.rfile.read(length))
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logger.debug(f"Webhook: {format % args}")
+
+        return Handler
+
+    def start(self):
+        """
+        Создает HTTP-сервер (возбуждает исключение, если порт занят).
+        """
+        self.server = HTTPServer((self.host, self.port), self.create_handler())
+        logger.info(f"$CYANWebhook сервер Telegram бота запущен на $YELLOW{self.host}:{self.port}{self.path}$CYAN.")
+
+    def serve_forever(self):
+        """
+        Обрабатывает входящие запросы до вызова :meth:`stop`.
+        """
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.executor.shutdown(wait=False)
+
+    def stop(self):
+        """
+        Останавливает обработку запросов (вызывать только из другого потока, если запущен :meth:`serve_forever`).
+        """
+        if self.server:
+            self.server.shutdown()
+
+    def close(self):
+        """
+        Закрывает сокет сервера, если :meth:`serve_forever` не был запущен.
+        """
+        if self.server:
+            self.server.server_close()
+        self.executor.shutdown(wait=False)